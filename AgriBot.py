@@ -1,25 +1,32 @@
 # AgriBot.py
 import os
 import time
+import json
 import base64
-import requests
 import streamlit as st
-import speech_recognition as sr
 from langdetect import detect
 from groq import Groq
 from dotenv import load_dotenv, find_dotenv
-import io
 from typing import List, Dict
 from gtts import gTTS
 
 # --- Import authentication, project bot, and utils ---
 from project_bot import render_project_bot
+from llm_client import post_json, stream_lines
+from chat_store import load_chat_page, append_messages, load_chat_summary, save_chat_summary
+from chat_context import build_context, needs_summary, update_summary
+from answer_cache import get_answer_cache
+from speech import get_speech_recognizer
+from model_warmup import get_model_warmup
 from utils import (
-    apply_custom_css, t, get_kannada_audio_bytes,
+    apply_custom_css, t, get_kannada_audio_key, load_kannada_audio,
     check_login, render_sidebar,
     translate_to_english, translate_back
 )
 
+# Start loading the disease model in the background on the server's first request
+get_model_warmup()
+
 # -----------------------------
 # Main App Logic
 # -----------------------------
@@ -44,9 +51,11 @@ DEFAULT_MODEL = "llama-3.3-70b-versatile"
 OPENAI_API_BASE = os.getenv("OPENAI_API_BASE", DEFAULT_BASE)
 MODEL = os.getenv("OPENAI_MODEL", DEFAULT_MODEL)
 RETRIES = int(os.getenv("API_RETRIES", 2))
+CHAT_PAGE_SIZE = int(os.getenv("CHAT_PAGE_SIZE", 20))
+CHAT_PROMPT_TOKENS = int(os.getenv("CHAT_PROMPT_TOKENS", 2000))
+STREAM_RESPONSES = os.getenv("STREAM_RESPONSES", "1") == "1"
 
 client = Groq(api_key=GROQ_KEY)
-r = sr.Recognizer()
 
 # -----------------------------
 # Firebase session data
@@ -61,26 +70,38 @@ user_token = st.session_state.user['idToken']
 # -----------------------------
 if "messages" not in st.session_state:
     try:
-        chat_history = db.child("user_chats").child(user_id).get(token=user_token).val()
-        st.session_state.messages = chat_history if chat_history else []
+        # Newest page only; older pages are fetched on demand
+        chat_history, first_index, next_index = load_chat_page(db, user_id, user_token, page_size=CHAT_PAGE_SIZE)
+        st.session_state.messages = chat_history
+        st.session_state.chat_first_index = first_index
+        st.session_state.chat_next_index = next_index
     except Exception as e:
         print(f"Error loading chat history: {e}")
         st.session_state.messages = []
+        st.session_state.chat_first_index = 0
+        st.session_state.chat_next_index = 0
+
+if "chat_summary" not in st.session_state:
+    try:
+        st.session_state.chat_summary = load_chat_summary(db, user_id, user_token)
+    except Exception as e:
+        print(f"Error loading chat summary: {e}")
+        st.session_state.chat_summary = None
+
+if "chat_render_window" not in st.session_state:
+    st.session_state.chat_render_window = CHAT_PAGE_SIZE
 
 if "last_audio_hash" not in st.session_state:
     st.session_state.last_audio_hash = None
-if "audio_bytes_for_message" not in st.session_state:
-    st.session_state.audio_bytes_for_message = {}
+# Only audio-store keys live in the session; the bytes sit in the shared, size-capped TTS store
+if "audio_keys_for_message" not in st.session_state:
+    st.session_state.audio_keys_for_message = {}
 
 # -----------------------------
 # API Call with Chat History
 # -----------------------------
-def call_chat_api(message_history: List[Dict[str, str]], max_retries: int = RETRIES) -> str:
-    if not API_KEY:
-        raise EnvironmentError("Missing API key in .env")
-
-    # STRICT AGRICULTURE SYSTEM PROMPT
-    system_prompt = """
+# STRICT AGRICULTURE SYSTEM PROMPT
+SYSTEM_PROMPT = """
 You are an expert agriculture and farming assistant for Indian farmers, especially in Karnataka.
 
 STRICT RULES:
@@ -93,23 +114,102 @@ STRICT RULES:
 4. Answer in Kannada if the user speaks Kannada, otherwise in English.
 """
 
-    messages_payload = [{"role": "system", "content": system_prompt}]
-    messages_payload.extend(message_history[-10:])
+def build_chat_request(message_history: List[Dict[str, str]], stream: bool = False, context_free: bool = False):
+    """Returns (url, headers, payload) for an OpenAI-compatible /chat/completions call.
+
+    With `context_free`, only the last message is sent and the running summary is left out,
+    so the answer is safe to share through the answer cache.
+    """
+    if not API_KEY:
+        raise EnvironmentError("Missing API key in .env")
+
+    if context_free:
+        message_history, summary = message_history[-1:], None
+    else:
+        summary = st.session_state.get("chat_summary")
+    messages_payload, _, prompt_tokens = build_context(SYSTEM_PROMPT, message_history, CHAT_PROMPT_TOKENS, summary)
+    st.session_state.last_prompt_tokens = prompt_tokens
 
     url = OPENAI_API_BASE.rstrip("/") + "/chat/completions"
     headers = {"Authorization": f"Bearer {API_KEY}", "Content-Type": "application/json"}
     payload = {"model": MODEL, "messages": messages_payload, "temperature": 0.3, "max_tokens": 700}
+    if stream:
+        payload["stream"] = True
+    return url, headers, payload
 
-    last_error = None
-    for attempt in range(1, max_retries + 1):
-        try:
-            resp = requests.post(url, headers=headers, json=payload, timeout=40)
-            if resp.status_code == 200:
-                return resp.json()["choices"][0]["message"]["content"].strip()
-        except Exception as e:
-            last_error = str(e)
-            time.sleep(1 * attempt)
-    raise RuntimeError(f"API failed: {last_error}")
+def call_chat_api(message_history: List[Dict[str, str]], max_retries: int = RETRIES, context_free: bool = False) -> str:
+    url, headers, payload = build_chat_request(message_history, context_free=context_free)
+    data = post_json(url, headers, payload, max_retries=max_retries)
+    return data["choices"][0]["message"]["content"].strip()
+
+def summarize_chat(previous_summary: str, transcript: str) -> str:
+    prompt = (
+        "Update the running summary of this farming conversation. Keep crops, locations, "
+        "problems and advice already given. Under 120 words, same language as the conversation.\n\n"
+        f"Current summary:\n{previous_summary or '(none)'}\n\nNew turns:\n{transcript}"
+    )
+    url = OPENAI_API_BASE.rstrip("/") + "/chat/completions"
+    headers = {"Authorization": f"Bearer {API_KEY}", "Content-Type": "application/json"}
+    payload = {"model": MODEL, "messages": [{"role": "user", "content": prompt}], "temperature": 0.2, "max_tokens": 250}
+    data = post_json(url, headers, payload, max_retries=RETRIES)
+    return data["choices"][0]["message"]["content"]
+
+def refresh_chat_summary():
+    """Summarizes turns that no longer fit the prompt budget, every few dropped messages."""
+    messages = st.session_state.messages
+    first_index = st.session_state.get("chat_first_index", 0)
+    summary = st.session_state.get("chat_summary")
+    _, start, _ = build_context(SYSTEM_PROMPT, messages, CHAT_PROMPT_TOKENS, summary)
+    dropped_upto = first_index + start
+    if not needs_summary(summary, dropped_upto):
+        return
+    covered = (summary or {}).get("upto", 0)
+    new_messages = messages[max(covered - first_index, 0):start]
+    summary = update_summary(summary, new_messages, dropped_upto, summarize_chat)
+    st.session_state.chat_summary = summary
+    save_chat_summary(db, user_id, user_token, summary)
+
+def stream_chat_api(message_history: List[Dict[str, str]], context_free: bool = False):
+    """Yields answer text deltas from a server-sent-events (stream: true) completion."""
+    url, headers, payload = build_chat_request(message_history, stream=True, context_free=context_free)
+    with stream_lines(url, headers, payload, max_retries=RETRIES) as lines:
+        for line in lines:
+            if not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+            chunk = json.loads(data)
+            choices = chunk.get("choices") or []
+            if not choices:
+                continue
+            delta = choices[0].get("delta", {}).get("content")
+            if delta:
+                yield delta
+
+def render_streamed_answer(message_history: List[Dict[str, str]], placeholder, context_free: bool = False) -> str:
+    """Renders a streamed answer into `placeholder` and records time-to-first-token."""
+    start = time.perf_counter()
+    first_token_at = None
+    parts = []
+    placeholder.markdown(f"_{t('Thinking…', lang)}_")
+    for delta in stream_chat_api(message_history, context_free=context_free):
+        if first_token_at is None:
+            first_token_at = time.perf_counter()
+        parts.append(delta)
+        placeholder.markdown("".join(parts) + "▌")
+
+    answer = "".join(parts).strip()
+    if not answer:
+        raise RuntimeError("Stream ended without any content")
+    placeholder.markdown(answer)
+
+    ttft = first_token_at - start
+    total = time.perf_counter() - start
+    prompt_tokens = st.session_state.get("last_prompt_tokens")
+    st.session_state.chat_latency = {"ttft": round(ttft, 2), "total": round(total, 2), "prompt_tokens": prompt_tokens}
+    print(f"Chat stream: ttft={ttft:.2f}s total={total:.2f}s prompt_tokens~{prompt_tokens} chars={len(answer)}")
+    return answer
 
 # -----------------------------
 # Page Title
@@ -121,20 +221,44 @@ st.markdown(f"<h3 style='text-align:center;'>{t('Powered by AI', lang)}</h3>", u
 # -----------------------------
 # Display Chat Messages
 # -----------------------------
-message_counter = 0
 if st.session_state.messages is None:
     st.session_state.messages = []
 
-for msg in st.session_state.messages:
+def load_earlier_messages():
+    """Widens the render window, fetching the next older page when memory runs out."""
+    st.session_state.chat_render_window += CHAT_PAGE_SIZE
+    if st.session_state.chat_render_window <= len(st.session_state.messages):
+        return
+    first_index = st.session_state.get("chat_first_index", 0)
+    try:
+        older, first_index, _ = load_chat_page(
+            db, user_id, user_token, before_index=first_index, page_size=CHAT_PAGE_SIZE
+        )
+    except Exception as e:
+        print(f"Error loading earlier messages: {e}")
+        return
+    st.session_state.messages = older + st.session_state.messages
+    st.session_state.chat_first_index = first_index
+
+# Only a bounded window is drawn, so rerun cost does not grow with history
+visible_count = min(st.session_state.chat_render_window, len(st.session_state.messages))
+hidden_count = len(st.session_state.messages) - visible_count
+if hidden_count > 0 or st.session_state.get("chat_first_index", 0) > 0:
+    st.button(f"⬆️ {t('Load earlier messages', lang)}", key="load_earlier_btn", on_click=load_earlier_messages)
+
+message_counter = st.session_state.get("chat_first_index", 0) + hidden_count
+for msg in st.session_state.messages[hidden_count:]:
     message_counter += 1
     msg_key = f"msg_{message_counter}"
     avatar = "🌱" if msg["role"] == "assistant" else "🧑‍🌾"
     with st.chat_message(msg["role"], avatar=avatar):
         st.markdown(msg["content"])
-        if msg_key in st.session_state.audio_bytes_for_message:
-            audio_bytes = st.session_state.audio_bytes_for_message[msg_key]
+        if msg_key in st.session_state.audio_keys_for_message:
             if st.button(f"🔊 {t('Play Kannada', lang)}", key=f"play_btn_{msg_key}"):
-                st.audio(audio_bytes, format="audio/mp3", autoplay=True)
+                audio_key = st.session_state.audio_keys_for_message[msg_key]
+                audio_bytes = load_kannada_audio(audio_key, msg["content"])
+                if audio_bytes:
+                    st.audio(audio_bytes, format="audio/mp3", autoplay=True)
 
 # -----------------------------
 # Input Section (Text + Voice)
@@ -152,11 +276,9 @@ if audio_bytes_obj:
         st.session_state.last_audio_hash = current_audio_hash
         st.info(t("Processing voice input...", lang))
         try:
-            wav_file = io.BytesIO(audio_data_bytes)
-            with sr.AudioFile(wav_file) as source:
-                audio_data = r.record(source)
-            user_input_voice = r.recognize_google(audio_data, language="kn-IN")
-        except Exception:
+            user_input_voice = get_speech_recognizer().transcribe(audio_data_bytes, language="kn-IN")
+        except Exception as e:
+            print(f"ASR Error: {e}")
             st.error(t("Sorry, I could not understand the audio.", lang))
 
 # -----------------------------
@@ -170,16 +292,48 @@ if user_input:
     except:
         orig_lang = "en"
 
+    # Only a truly empty conversation (no loaded history, no stored summary) is answered
+    # without context, so only then can the answer be shared with other users
+    cacheable = (
+        not st.session_state.messages
+        and st.session_state.get("chat_first_index", 0) == 0
+        and not st.session_state.get("chat_summary")
+    )
+    answer_cache = get_answer_cache()
+
     st.session_state.messages.append({"role": "user", "content": user_input})
     message_counter += 1
 
     with st.chat_message("user", avatar="🧑‍🌾"):
         st.markdown(user_input)
 
-    with st.spinner(t("Thinking…", lang)):
+    with st.chat_message("assistant", avatar="🌱"):
+        answer_placeholder = st.empty()
         try:
             history = st.session_state.messages
-            answer = call_chat_api(history)
+            answer = answer_cache.get(user_input, orig_lang) if cacheable else None
+            cache_hit = answer is not None
+            answer_start = time.perf_counter()
+            if cache_hit:
+                answer_placeholder.markdown(answer)
+                st.session_state.chat_latency = {"ttft": 0.0, "total": 0.0, "prompt_tokens": 0}
+            elif STREAM_RESPONSES:
+                try:
+                    answer = render_streamed_answer(history, answer_placeholder, context_free=cacheable)
+                except Exception as stream_e:
+                    # Fall back to the blocking request below
+                    print(f"Chat stream failed, falling back: {stream_e}")
+            if answer is None:
+                with st.spinner(t("Thinking…", lang)):
+                    start = time.perf_counter()
+                    answer = call_chat_api(history, context_free=cacheable)
+                    total = round(time.perf_counter() - start, 2)
+                    st.session_state.chat_latency = {
+                        "ttft": total, "total": total, "prompt_tokens": st.session_state.get("last_prompt_tokens")
+                    }
+                answer_placeholder.markdown(answer)
+            if cacheable and not cache_hit:
+                answer_cache.put(user_input, orig_lang, answer, latency=time.perf_counter() - answer_start)
             final_answer = answer
 
             st.session_state.messages.append({"role": "assistant", "content": final_answer})
@@ -187,24 +341,44 @@ if user_input:
             assistant_msg_key = f"msg_{message_counter}"
 
             if orig_lang == "kn":
-                audio_bytes = get_kannada_audio_bytes(final_answer)
-                if audio_bytes:
-                    st.session_state.audio_bytes_for_message[assistant_msg_key] = audio_bytes
+                audio_key = get_kannada_audio_key(final_answer)
+                if audio_key:
+                    st.session_state.audio_keys_for_message[assistant_msg_key] = audio_key
 
+            # Append only the new user/assistant pair
+            new_turn = st.session_state.messages[-2:]
+            next_index = st.session_state.get("chat_next_index", 0)
             try:
-                db.child("user_chats").child(user_id).set(st.session_state.messages, token=user_token)
+                st.session_state.chat_next_index = append_messages(db, user_id, user_token, next_index, new_turn)
             except Exception:
                 try:
                     st.session_state.user = auth.refresh(st.session_state.user['refreshToken'])
                     user_token = st.session_state.user['idToken']
-                    db.child("user_chats").child(user_id).set(st.session_state.messages, token=user_token)
+                    st.session_state.chat_next_index = append_messages(db, user_id, user_token, next_index, new_turn)
                 except Exception as refresh_e:
                     st.error(f"Error saving chat. Please log out and log back in. {refresh_e}")
+
+            # Fold turns that fell out of the prompt budget into the running summary
+            try:
+                refresh_chat_summary()
+            except Exception as summary_e:
+                print(f"Error updating chat summary: {summary_e}")
             st.rerun()
 
         except Exception as e:
             st.error(f"Error: {e}")
 
+# -----------------------------
+# Shared Answer Cache Metrics
+# -----------------------------
+cache_stats = get_answer_cache().stats()
+if cache_stats["hits"] + cache_stats["misses"]:
+    with st.sidebar:
+        st.caption(
+            f"{t('Answer cache', lang)}: {cache_stats['hit_rate']:.0%} {t('hit rate', lang)} · "
+            f"{cache_stats['saved_seconds']}s {t('saved', lang)} · {cache_stats['entries']} {t('entries', lang)}"
+        )
+
 # -----------------------------
 # Render Floating Project Bot
 # -----------------------------
@@ -0,0 +1,261 @@
+# answer_cache.py
+"""
+Process-wide cache of chat answers for frequently asked, context-free questions.
+
+Questions are normalized and embedded as hashed word and character n-gram
+features, so "What is the best fertilizer for ragi?" and "fertilizer for
+Ragi" land on the same entry. Entries are kept per language with a TTL and
+LRU eviction.
+
+Similarity alone never decides a hit. Questions that name different
+crops, diseases or pests, or contain different numbers, are near-identical
+as vectors ("urea dose for paddy" vs "... for maize"). The cache is shared
+by all users, so a hit also requires the two questions to have exactly the
+same content words (content_signature): known crops, diseases and inputs
+by canonical name, Kannada ones with their case endings ("ರಾಗಿಗೆ") matched
+by stem, and every other non-filler word by a light English stem. A word
+the entity list does not know (a crop such as "brinjal") still has to
+match, so the list is not the only guard.
+"""
+import os
+import re
+import time
+import zlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import streamlit as st
+
+ANSWER_CACHE_DIM = 1024
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", 0.82))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", 7 * 24 * 3600))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", 1000))
+
+_PUNCTUATION = re.compile(r"[!-/:-@\[-`{-~।॥“”‘’…]+")
+
+
+def normalize_question(text):
+    """Lowercases, drops punctuation and collapses whitespace."""
+    text = _PUNCTUATION.sub(" ", text.lower())
+    return " ".join(text.split())
+
+
+# Question filler that should not decide similarity ("what is the best ... for ragi")
+_STOPWORDS = {
+    "a", "an", "the", "is", "are", "does", "do", "can", "should", "what", "which", "how",
+    "for", "of", "in", "on", "to", "and", "with", "my", "me", "i", "best",
+}
+
+
+# canonical entity: spellings that mean it (English and Kannada)
+ENTITY_SYNONYMS = {
+    # Crops
+    "rice": ["rice", "paddy", "ಭತ್ತ", "ಅಕ್ಕಿ"], "maize": ["maize", "corn", "ಮೆಕ್ಕೆಜೋಳ"],
+    "ragi": ["ragi", "finger millet", "ರಾಗಿ"], "jowar": ["jowar", "sorghum", "ಜೋಳ"],
+    "bajra": ["bajra", "pearl millet", "ಸಜ್ಜೆ"], "wheat": ["wheat", "ಗೋಧಿ"],
+    "sugarcane": ["sugarcane", "ಕಬ್ಬು"], "groundnut": ["groundnut", "peanut", "ಶೇಂಗಾ", "ಕಡಲೆಕಾಯಿ"],
+    "cotton": ["cotton", "ಹತ್ತಿ"], "coconut": ["coconut", "ತೆಂಗು"], "arecanut": ["arecanut", "areca", "ಅಡಿಕೆ"],
+    "coffee": ["coffee", "ಕಾಫಿ"], "tea": ["tea"], "banana": ["banana", "bananas", "ಬಾಳೆ"], "mango": ["mango", "mangoes", "ಮಾವು"],
+    "tomato": ["tomato", "tomatoes", "ಟೊಮೆಟೊ"], "potato": ["potato", "potatoes", "ಆಲೂಗಡ್ಡೆ"],
+    "onion": ["onion", "onions", "ಈರುಳ್ಳಿ"],
+    "chilli": ["chilli", "chillies", "chili", "ಮೆಣಸಿನಕಾಯಿ"], "turmeric": ["turmeric", "ಅರಿಶಿನ"],
+    "sunflower": ["sunflower", "ಸೂರ್ಯಕಾಂತಿ"], "soybean": ["soybean", "soya"], "jute": ["jute"],
+    "chickpea": ["chickpea", "bengal gram", "ಕಡಲೆ"], "pigeon pea": ["pigeon pea", "pigeon peas", "tur", "red gram", "ತೊಗರಿ"],
+    "black gram": ["black gram", "urad", "ಉದ್ದು"], "green gram": ["green gram", "mung bean", "moong", "ಹೆಸರು"],
+    "lentil": ["lentil"], "kidney beans": ["kidney beans", "rajma"], "moth beans": ["moth beans"],
+    "grapes": ["grapes", "grape", "ದ್ರಾಕ್ಷಿ"], "pomegranate": ["pomegranate", "ದಾಳಿಂಬೆ"], "papaya": ["papaya", "ಪಪ್ಪಾಯಿ"],
+    "watermelon": ["watermelon"], "muskmelon": ["muskmelon"], "apple": ["apple"], "orange": ["orange"],
+    "cardamom": ["cardamom", "ಏಲಕ್ಕಿ"], "pepper": ["pepper", "ಕಾಳುಮೆಣಸು"], "cashew": ["cashew", "ಗೋಡಂಬಿ"],
+    # Diseases and pests
+    "brown spot": ["brown spot"], "leaf blast": ["leaf blast"], "blast": ["blast"], "sheath blight": ["sheath blight"],
+    "blight": ["blight"], "rust": ["rust"], "wilt": ["wilt"], "mildew": ["mildew"], "leaf curl": ["leaf curl"],
+    "stem borer": ["stem borer"], "bollworm": ["bollworm"], "armyworm": ["armyworm", "fall armyworm"],
+    "aphid": ["aphid", "aphids"], "whitefly": ["whitefly", "whiteflies"], "brown planthopper": ["brown planthopper", "bph"],
+    # Inputs whose doses differ
+    "urea": ["urea"], "dap": ["dap"], "potash": ["potash", "mop"], "zinc": ["zinc"],
+    # Qualifiers that change the answer
+    "organic": ["organic", "organically", "natural", "ಸಾವಯವ"],
+}
+_ENTITY_LOOKUP = {
+    tuple(spelling.split()): canonical
+    for canonical, spellings in ENTITY_SYNONYMS.items()
+    for spelling in spellings
+}
+_MAX_ENTITY_WORDS = max(len(words) for words in _ENTITY_LOOKUP)
+_NUMBER = re.compile(r"\d")
+_KANNADA = re.compile(r"[\u0c80-\u0cff]")
+# Kannada nouns take case endings (ಭತ್ತಕ್ಕೆ, ರಾಗಿಗೆ) and drop a final "ು" before them (ಕಬ್ಬು -> ಕಬ್ಬಿಗೆ),
+# so single-word Kannada spellings are matched as stems, longest first
+_KANNADA_STEMS = sorted(
+    ((spelling.removesuffix("\u0cc1"), canonical)
+     for canonical, spellings in ENTITY_SYNONYMS.items()
+     for spelling in spellings if _KANNADA.search(spelling) and " " not in spelling),
+    key=lambda item: -len(item[0]),
+)
+_ENGLISH_SUFFIXES = ("ment", "ion", "ing", "es", "s")
+
+
+def _kannada_entity(word):
+    for stem, canonical in _KANNADA_STEMS:
+        if word.startswith(stem):
+            return canonical
+    return None
+
+
+def _stem(word):
+    """Light English stemming, so "treat"/"treatment" and "prevent"/"prevention" compare equal."""
+    if _KANNADA.search(word) or len(word) <= 4:
+        return word
+    for suffix in _ENGLISH_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            return word[:-len(suffix)]
+    return word
+
+
+def _scan(normalized):
+    """Yields (canonical entity or None, word) per token; multi-word entities first, longest match first."""
+    words = normalized.split()
+    i = 0
+    while i < len(words):
+        for size in range(min(_MAX_ENTITY_WORDS, len(words) - i), 0, -1):
+            canonical = _ENTITY_LOOKUP.get(tuple(words[i:i + size]))
+            if canonical:
+                yield canonical, " ".join(words[i:i + size])
+                i += size
+                break
+        else:
+            yield (_kannada_entity(words[i]) if _KANNADA.search(words[i]) else None), words[i]
+            i += 1
+
+
+def entity_signature(normalized):
+    """Crops, diseases, pests, inputs (canonical names) and number tokens in a normalized question.
+
+    Longest match first, so "leaf blast" is one entity and not also "blast".
+    """
+    return frozenset(
+        canonical or word for canonical, word in _scan(normalized)
+        if canonical or _NUMBER.search(word)
+    )
+
+
+def content_signature(normalized):
+    """Canonical entities plus the stems of all other non-filler words; questions must match it exactly."""
+    return frozenset(
+        canonical or _stem(word) for canonical, word in _scan(normalized)
+        if canonical or word not in _STOPWORDS
+    )
+
+
+def embed(normalized, dim=ANSWER_CACHE_DIM, n=3):
+    """L2-normalized hashed feature vector (float32) of content words and their char n-grams.
+
+    Whole words dominate, so swapping the crop or disease changes the vector a
+    lot; the n-grams (weighted 2 per word in total) soften spelling variants.
+    """
+    vec = np.zeros(dim, dtype=np.float32)
+    words = [w for w in normalized.split() if w not in _STOPWORDS] or normalized.split()
+    for word in words:
+        vec[zlib.crc32(f"w:{word}".encode("utf-8")) % dim] += 1.0
+        padded = f" {word} "
+        grams = [padded[i:i + n] for i in range(max(1, len(padded) - n + 1))]
+        for gram in grams:
+            vec[zlib.crc32(gram.encode("utf-8")) % dim] += 2.0 / len(grams)
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+class SemanticAnswerCache:
+    def __init__(self, threshold=ANSWER_CACHE_THRESHOLD, ttl=ANSWER_CACHE_TTL, max_entries=ANSWER_CACHE_MAX_ENTRIES):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}    # lang -> OrderedDict[normalized question -> entry]
+        self._matrix = {}     # lang -> (keys, stacked vectors), rebuilt after changes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    def _purge_expired(self, lang, now):
+        entries = self._entries.get(lang)
+        if not entries:
+            return
+        expired = [key for key, entry in entries.items() if now - entry["created"] > self.ttl]
+        for key in expired:
+            del entries[key]
+        if expired:
+            self._matrix.pop(lang, None)
+
+    def _lookup_matrix(self, lang):
+        if lang not in self._matrix:
+            entries = self._entries[lang]
+            keys = list(entries.keys())
+            vectors = np.stack([entries[key]["vector"] for key in keys]) if keys else None
+            signatures = [entries[key]["signature"] for key in keys]
+            self._matrix[lang] = (keys, vectors, signatures)
+        return self._matrix[lang]
+
+    def get(self, question, lang):
+        """Returns the cached answer for a similar question in `lang`, or None."""
+        normalized = normalize_question(question)
+        if not normalized:
+            return None
+        with self._lock:
+            now = time.time()
+            self._purge_expired(lang, now)
+            entries = self._entries.get(lang)
+            key = normalized if entries and normalized in entries else None
+            if key is None and entries:
+                keys, vectors, signatures = self._lookup_matrix(lang)
+                signature = content_signature(normalized)
+                scores = vectors @ embed(normalized)
+                # Only questions with exactly the same content words (and so crops/diseases/numbers) may match
+                scores[[cached != signature for cached in signatures]] = -1.0
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    key = keys[best]
+            if key is None:
+                self.misses += 1
+                return None
+            entries.move_to_end(key)
+            entry = entries[key]
+            self.hits += 1
+            self.saved_seconds += entry["latency"]
+            return entry["answer"]
+
+    def put(self, question, lang, answer, latency=0.0):
+        """Stores `answer`; `latency` is what a future hit saves."""
+        normalized = normalize_question(question)
+        if not normalized or not answer:
+            return
+        with self._lock:
+            entries = self._entries.setdefault(lang, OrderedDict())
+            entries[normalized] = {
+                "vector": embed(normalized),
+                "signature": content_signature(normalized),
+                "answer": answer,
+                "created": time.time(),
+                "latency": latency,
+            }
+            entries.move_to_end(normalized)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+            self._matrix.pop(lang, None)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "saved_seconds": round(self.saved_seconds, 1),
+            "entries": sum(len(entries) for entries in self._entries.values()),
+        }
+
+
+@st.cache_resource
+def get_answer_cache():
+    """The cache instance shared by every Streamlit session in this process."""
+    return SemanticAnswerCache()
@@ -0,0 +1,43 @@
+# benchmarks/bench_batch_predict.py
+"""
+Throughput of batched vs one-by-one disease classification on CPU.
+
+    python -m benchmarks.bench_batch_predict --images 32 --batch-size 16
+"""
+import time
+import argparse
+
+from disease_model import is_crop_image, predict_image, predict_batch
+from benchmarks.common import synthetic_leaf_images, load_model_or_standin
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batched vs one-by-one paddy disease prediction")
+    parser.add_argument("--images", type=int, default=32)
+    parser.add_argument("--batch-size", type=int, default=16)
+    args = parser.parse_args()
+
+    model, is_real = load_model_or_standin()
+    imgs = [img for img in synthetic_leaf_images(args.images) if is_crop_image(img)]
+    print(f"model: {'FinalTest_inceptionv3.h5' if is_real else 'random stand-in'}, images: {len(imgs)}")
+
+    # Warm-up so graph tracing is not counted
+    predict_image(model, imgs[0])
+    predict_batch(model, imgs[:args.batch_size], batch_size=args.batch_size)
+
+    start = time.perf_counter()
+    single = [predict_image(model, img) for img in imgs]
+    one_by_one = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched = predict_batch(model, imgs, batch_size=args.batch_size)
+    batch_time = time.perf_counter() - start
+
+    agree = sum(a[0] == b[0] for a, b in zip(single, batched))
+    print(f"one-by-one: {len(imgs) / one_by_one:7.2f} images/sec ({one_by_one:.2f}s)")
+    print(f"batched:    {len(imgs) / batch_time:7.2f} images/sec ({batch_time:.2f}s, batch size {args.batch_size})")
+    print(f"speed-up:   {one_by_one / batch_time:.2f}x, label agreement {agree}/{len(imgs)}")
+
+
+if __name__ == "__main__":
+    main()
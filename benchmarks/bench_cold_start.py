@@ -0,0 +1,68 @@
+# benchmarks/bench_cold_start.py
+"""
+Cold first-scan latency of the disease model, with and without the warm-up pass.
+
+    python -m benchmarks.bench_cold_start --runs 3
+
+Each run is a fresh interpreter, so TensorFlow import and graph tracing are
+really cold. "first scan" is what the first user of a process waits for once
+the model is loaded: without warm-up it includes the first-call trace.
+"""
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+import numpy as np
+
+
+def run_worker(warm):
+    from disease_model import predict_image
+    from model_warmup import ModelWarmup
+    from benchmarks.common import synthetic_leaf_images, load_model_or_standin
+
+    img = synthetic_leaf_images(1, size=(640, 480), seed=3)[0]
+    warmup = ModelWarmup(loader=lambda: load_model_or_standin()[0])
+    if warm:
+        warmup.wait()
+        model = warmup.model
+    else:
+        start = time.perf_counter()
+        import tensorflow  # noqa: F401
+        warmup.timings["import_s"] = time.perf_counter() - start
+        start = time.perf_counter()
+        model = load_model_or_standin()[0]
+        warmup.timings["load_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    predict_image(model, img)
+    first = time.perf_counter() - start
+    start = time.perf_counter()
+    predict_image(model, img)
+    steady = time.perf_counter() - start
+    return {**warmup.timings, "first_scan_s": first, "steady_scan_s": steady}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Disease model cold-start benchmark")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--worker", choices=["cold", "warm"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker == "warm")))
+        return
+
+    for mode in ("cold", "warm"):
+        reports = []
+        for _ in range(args.runs):
+            cmd = [sys.executable, "-m", "benchmarks.bench_cold_start", "--worker", mode]
+            out = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+            reports.append(json.loads(out.strip().splitlines()[-1]))
+        keys = [k for k in ("import_s", "load_s", "warmup_s", "first_scan_s", "steady_scan_s") if k in reports[0]]
+        print(f"{mode:5s} " + "  ".join(f"{k.removesuffix('_s')} {np.median([r[k] for r in reports]):6.2f}s" for k in keys))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# benchmarks/bench_crop_suitability.py
+"""
+Latency of the local crop ranking (top 3 and the full catalog) and a sanity check on known profiles.
+
+    python -m benchmarks.bench_crop_suitability --queries 10000
+"""
+import time
+import argparse
+
+import numpy as np
+
+from crop_suitability import CROPS, CROP_RANGES, feature_vector, rank_crops, explain
+
+
+def midpoint(crop):
+    return feature_vector(*[(lo + hi) / 2 for lo, hi in CROP_RANGES[crop]])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crop suitability ranking micro-benchmark")
+    parser.add_argument("--queries", type=int, default=10000)
+    args = parser.parse_args()
+
+    # A soil profile in the middle of a crop's ranges should rank that crop first
+    misses = [crop for crop in CROPS if rank_crops(midpoint(crop), top=1)[0][0] != crop]
+    print(f"self-ranking: {len(CROPS) - len(misses)}/{len(CROPS)} {misses or ''}")
+
+    rng = np.random.default_rng(0)
+    low = np.array([0, 5, 5, 8, 14, 3.5, 20])
+    high = np.array([140, 145, 205, 44, 100, 9.9, 300])
+    queries = rng.uniform(low, high, size=(args.queries, len(low)))
+
+    for label, top in (("top 3", 3), ("all crops", None)):
+        times = []
+        for x in queries:
+            start = time.perf_counter()
+            ranked = rank_crops(x, top=top)
+            times.append(time.perf_counter() - start)
+        us = np.asarray(times) * 1e6
+        print(f"{label:10s} p50 {np.percentile(us, 50):7.1f} us  p99 {np.percentile(us, 99):7.1f} us  ({len(ranked)} results)")
+
+    start = time.perf_counter()
+    for x in queries[:1000]:
+        for crop, _ in rank_crops(x, top=3):
+            explain(crop, x)
+    print(f"top 3 + local reasons {(time.perf_counter() - start) / 1000 * 1e6:7.1f} us per query")
+
+
+if __name__ == "__main__":
+    main()
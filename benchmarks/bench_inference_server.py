@@ -0,0 +1,121 @@
+# benchmarks/bench_inference_server.py
+"""
+Throughput and latency under concurrent clients: in-process predict vs the micro-batching server.
+
+    python -m benchmarks.bench_inference_server --clients 1 2 4 8 16 32
+
+"direct" is today's behaviour: every client thread calls the model in its own
+process. "server" starts inference_server.py in a subprocess and every
+client thread scans through RemoteDiseaseModel. Without
+FinalTest_inceptionv3.h5 a random stand-in model is saved to a temp file and
+served instead.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+def run_clients(model, imgs, clients, requests_per_client):
+    from disease_model import predict_image
+
+    def client(i):
+        latencies = []
+        for j in range(requests_per_client):
+            start = time.perf_counter()
+            predict_image(model, imgs[(i + j) % len(imgs)])
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        latencies = [lat for lats in pool.map(client, range(clients)) for lat in lats]
+    wall = time.perf_counter() - start
+    return {
+        "clients": clients,
+        "images_per_sec": len(latencies) / wall,
+        "p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "p95_ms": float(np.percentile(latencies, 95) * 1000),
+    }
+
+
+def run_direct_worker(model_path, clients_list, requests_per_client):
+    from disease_model import load_keras_model, warm_up
+    from benchmarks.common import synthetic_leaf_images
+    imgs = synthetic_leaf_images(8, size=(640, 480), seed=5)
+    model = load_keras_model(model_path)
+    warm_up(model)
+    return [run_clients(model, imgs, c, requests_per_client) for c in clients_list]
+
+
+def wait_for_server(model, timeout=300):
+    from inference_server import InferenceError
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            return model.health()
+        except InferenceError:
+            time.sleep(0.5)
+    raise SystemExit("inference server did not come up")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inference server concurrency benchmark")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--requests", type=int, default=4, help="scans per client")
+    parser.add_argument("--max-batch", type=int, default=16)
+    parser.add_argument("--max-wait-ms", type=float, default=10)
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--direct-worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.direct_worker:
+        print(json.dumps(run_direct_worker(args.direct_worker, args.clients, args.requests)))
+        return
+
+    from disease_model import MODEL_PATH
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = MODEL_PATH
+        if not os.path.exists(model_path):
+            from benchmarks.common import build_standin_model
+            model_path = os.path.join(tmp, "standin.h5")
+            build_standin_model().save(model_path)
+            print("model: random stand-in")
+
+        cmd = [sys.executable, "-m", "benchmarks.bench_inference_server", "--direct-worker", model_path,
+               "--requests", str(args.requests), "--clients", *map(str, args.clients)]
+        out = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+        direct = json.loads(out.strip().splitlines()[-1])
+
+        env = dict(os.environ, DISEASE_MODEL_PATH=model_path, INFERENCE_BACKEND="keras")
+        server = subprocess.Popen(
+            [sys.executable, "inference_server.py", "--port", str(args.port),
+             "--max-batch", str(args.max_batch), "--max-wait-ms", str(args.max_wait_ms)],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            from inference_server import RemoteDiseaseModel
+            from benchmarks.common import synthetic_leaf_images
+            remote = RemoteDiseaseModel(f"http://127.0.0.1:{args.port}")
+            wait_for_server(remote)
+            imgs = synthetic_leaf_images(8, size=(640, 480), seed=5)
+            served = [run_clients(remote, imgs, c, args.requests) for c in args.clients]
+            stats = remote.health()
+        finally:
+            server.terminate()
+            server.wait()
+
+    print(f"{'clients':>7}  {'direct img/s':>12} {'p95 ms':>8}  {'server img/s':>12} {'p95 ms':>8}")
+    for d, s in zip(direct, served):
+        print(f"{d['clients']:7d}  {d['images_per_sec']:12.2f} {d['p95_ms']:8.0f}  {s['images_per_sec']:12.2f} {s['p95_ms']:8.0f}")
+    print(f"server batches: {stats['batches']}, mean batch {stats['mean_batch']}, rejected {stats['rejected']}")
+
+
+if __name__ == "__main__":
+    main()
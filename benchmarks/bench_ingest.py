@@ -0,0 +1,110 @@
+# benchmarks/bench_ingest.py
+"""
+Decode latency and peak memory per scan: full-resolution ingestion vs load_image.
+
+    python -m benchmarks.bench_ingest --megapixels 12 48
+
+Each measurement runs in a fresh process, so peak RSS includes Pillow's
+native buffers (tracemalloc does not see them). The test photos are
+phone-like JPEGs with an EXIF orientation tag.
+"""
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import subprocess
+
+import numpy as np
+from PIL import Image
+
+from disease_model import IMG_SIZE, is_crop_image, load_image, preprocess_image
+
+
+def phone_jpeg(megapixels, seed=0):
+    """Leaf-like photo with smooth structure plus noise, rotated by EXIF (Orientation=6)."""
+    rng = np.random.default_rng(seed)
+    w = int((megapixels * 1e6 * 4 / 3) ** 0.5)
+    h = int(w * 3 / 4)
+    small = rng.integers(0, 255, size=(h // 64, w // 64, 3), dtype=np.uint8)
+    small[..., 1] = np.maximum(small[..., 1], 120)
+    img = Image.fromarray(small, "RGB").resize((w, h), Image.BILINEAR)
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    buffer = io.BytesIO()
+    img.save(buffer, "JPEG", quality=90, exif=exif)
+    return buffer.getvalue()
+
+
+def ingest_reference(data):
+    """The page before: full decode, no EXIF handling, float64 preprocessing."""
+    img = Image.open(io.BytesIO(data)).convert("RGB")
+    ok = is_crop_image(img)
+    img_array = np.expand_dims(np.array(img.resize(IMG_SIZE)) / 255.0, axis=0)
+    return ok, img_array, img.size
+
+
+def ingest_bounded(data):
+    img = load_image(data)
+    ok = is_crop_image(img)
+    return ok, preprocess_image(img), img.size
+
+
+def _rss_mib():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_worker(variant, path):
+    with open(path, "rb") as f:
+        data = f.read()
+    fn = ingest_reference if variant == "reference" else ingest_bounded
+    fn(phone_jpeg(0.3, seed=1))  # import/warm code paths on a small image first
+    rss_before = _rss_mib()
+    start = time.perf_counter()
+    ok, tensor, size = fn(data)
+    first = time.perf_counter() - start
+    peak = _rss_mib() - rss_before
+    times = []
+    for _ in range(3):
+        start = time.perf_counter()
+        fn(data)
+        times.append(time.perf_counter() - start)
+    return {"variant": variant, "ms": min(first, *times) * 1000, "peak_mib": peak, "crop": ok,
+            "dtype": str(tensor.dtype), "size": size, "jpeg_mib": len(data) / 2**20}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Image ingestion benchmark")
+    parser.add_argument("--megapixels", type=float, nargs="+", default=[12, 48])
+    parser.add_argument("--worker", choices=["reference", "bounded"], help=argparse.SUPPRESS)
+    parser.add_argument("--jpeg", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.jpeg)))
+        return
+
+    for mp in args.megapixels:
+        reports = {}
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "photo.jpg")
+            with open(path, "wb") as f:
+                f.write(phone_jpeg(mp))
+            for variant in ("reference", "bounded"):
+                cmd = [sys.executable, "-m", "benchmarks.bench_ingest", "--worker", variant, "--jpeg", path]
+                out = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+                reports[variant] = json.loads(out.strip().splitlines()[-1])
+        ref, new = reports["reference"], reports["bounded"]
+        print(
+            f"{mp:>4.0f} MP ({ref['jpeg_mib']:.1f} MiB JPEG)  "
+            f"full decode {ref['ms']:7.1f} ms +{ref['peak_mib']:6.0f} MiB {ref['dtype']} {tuple(ref['size'])} | "
+            f"bounded {new['ms']:6.1f} ms +{new['peak_mib']:5.0f} MiB {new['dtype']} {tuple(new['size'])} | "
+            f"crop verdict {'same' if ref['crop'] == new['crop'] else 'DIFFERENT'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
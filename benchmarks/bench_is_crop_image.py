@@ -0,0 +1,105 @@
+# benchmarks/bench_is_crop_image.py
+"""
+Latency, peak memory and decision parity of is_crop_image vs the original full-resolution version.
+
+    python -m benchmarks.bench_is_crop_image --megapixels 12 48
+"""
+import time
+import argparse
+import tracemalloc
+
+import numpy as np
+import cv2
+from PIL import Image
+
+from disease_model import is_crop_image
+
+
+def is_crop_image_reference(img):
+    """The original implementation: four inRange masks and extra passes over the full image."""
+    img_array = np.array(img)
+    img_hsv = cv2.cvtColor(img_array, cv2.COLOR_RGB2HSV)
+    green_mask = cv2.inRange(img_hsv, np.array([20, 15, 15]), np.array([95, 255, 255]))
+    yellow_mask = cv2.inRange(img_hsv, np.array([8, 15, 15]), np.array([40, 255, 255]))
+    plant_mask = cv2.bitwise_or(green_mask, yellow_mask)
+    if np.sum(plant_mask > 0) / plant_mask.size < 0.08:
+        return False
+    gray_mask = cv2.inRange(img_hsv, np.array([0, 0, 30]), np.array([180, 60, 230]))
+    if np.sum(gray_mask > 0) / gray_mask.size > 0.40:
+        return False
+    skin_mask = cv2.inRange(img_hsv, np.array([0, 15, 60]), np.array([25, 180, 255]))
+    if np.sum(skin_mask > 0) / skin_mask.size > 0.12:
+        return False
+    brightness = img_hsv[:, :, 2]
+    if np.sum(brightness > 235) / brightness.size > 0.45:
+        return False
+    if np.sum(brightness < 25) / brightness.size > 0.55:
+        return False
+    return True
+
+
+def reference_set(size=(1600, 1200), seed=1):
+    """Leaf-like, gray, skin, bright, dark and mixed scenes, several well inside each rule."""
+    rng = np.random.default_rng(seed)
+    w, h = size
+    scenes = {
+        "leaf": (70, 150, 40), "yellow_leaf": (190, 170, 60), "brown_leaf": (120, 80, 30),
+        "gray_wall": (128, 128, 130), "skin": (220, 170, 140), "paper": (250, 250, 248),
+        "night": (8, 10, 8), "sky": (120, 170, 235),
+    }
+    imgs = []
+    for name, rgb in scenes.items():
+        for variant in range(4):
+            arr = np.empty((h, w, 3), dtype=np.int16)
+            arr[:] = rgb
+            # Blend in a patch of leaf color so some scenes sit between rules
+            patch = int(h * 0.15 * variant)
+            arr[:patch] = (70, 150, 40)
+            arr += rng.integers(-20, 21, size=arr.shape, dtype=np.int16)
+            imgs.append((f"{name}_{variant}", Image.fromarray(np.clip(arr, 0, 255).astype(np.uint8), "RGB")))
+    return imgs
+
+
+def measure(fn, img, repeats=3):
+    fn(img)
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(img)
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fn(img)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(times), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="is_crop_image micro-benchmark")
+    parser.add_argument("--megapixels", type=float, nargs="+", default=[12, 48])
+    args = parser.parse_args()
+
+    refs = reference_set()
+    mismatches = [name for name, img in refs if is_crop_image(img) != is_crop_image_reference(img)]
+    print(f"decision parity: {len(refs) - len(mismatches)}/{len(refs)} {mismatches or ''}")
+
+    rng = np.random.default_rng(0)
+    for mp in args.megapixels:
+        w = int((mp * 1e6 * 4 / 3) ** 0.5)
+        h = int(w * 3 / 4)
+        arr = np.empty((h, w, 3), dtype=np.uint8)
+        arr[..., 0] = rng.integers(40, 140, size=(h, w), dtype=np.uint8)
+        arr[..., 1] = rng.integers(110, 200, size=(h, w), dtype=np.uint8)
+        arr[..., 2] = rng.integers(20, 80, size=(h, w), dtype=np.uint8)
+        img = Image.fromarray(arr, "RGB")
+        del arr
+        old_t, old_mem = measure(is_crop_image_reference, img)
+        new_t, new_mem = measure(is_crop_image, img)
+        print(
+            f"{mp:>5.0f} MP  original {old_t * 1000:8.1f} ms {old_mem / 2**20:8.1f} MiB peak | "
+            f"thumbnail {new_t * 1000:7.1f} ms {new_mem / 2**20:6.2f} MiB peak | {old_t / new_t:5.1f}x faster"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+# benchmarks/bench_pipeline.py
+"""
+Per-stage latency of the disease-detection pipeline, outside Streamlit.
+
+    python -m benchmarks.bench_pipeline --out bench.json
+    python -m benchmarks.bench_pipeline --compare bench.json          # after a change
+    python -m benchmarks.bench_pipeline --images-dir data/leaves --lang English
+
+Stages follow the Disease Detector page: decode (load_image), validate
+(is_crop_image), preprocess, predict (one forward pass per image),
+treatment (TreatmentStore) and tts (tts_cache.synthesize). The LLM and gTTS
+are stubbed with a fixed simulated latency. The real caches in front of
+them are exercised: a miss per new disease/band, then hits. Without
+FinalTest_inceptionv3.h5 a random stand-in model is used. Results
+(p50/p95/max per stage, throughput, peak RSS, git commit) can be saved as
+JSON. --compare prints per-stage deltas against a saved run and exits 1 on
+a p50 regression above --tolerance.
+"""
+import os
+import sys
+import json
+import time
+import tempfile
+import argparse
+import platform
+import resource
+import subprocess
+from types import SimpleNamespace
+
+import numpy as np
+
+STAGES = ("decode", "validate", "preprocess", "predict", "treatment", "tts")
+
+
+class StubLLM:
+    """Stands in for the Groq client: canned bullet answer after `latency` seconds."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, messages, **kwargs):
+        time.sleep(self.latency)
+        content = "\n".join(f"• Step {i} for {messages[-1]['content'][:40]}" for i in range(1, 5))
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def _rss_mib():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def summarize(samples):
+    if not samples:
+        return {"n": 0}
+    ms = np.asarray(samples) * 1000
+    return {
+        "n": len(samples),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "max_ms": round(float(ms.max()), 3),
+        "total_s": round(float(ms.sum()) / 1000, 3),
+    }
+
+
+def run_pipeline(images, lang, llm_latency, tts_latency, tmp):
+    # Cache locations are read at import time, so point them at the temp dir first
+    os.environ["TTS_CACHE_DIR"] = os.path.join(tmp, "tts")
+    import tts_cache
+    from disease_model import load_image, is_crop_image, preprocess_image, decode_prediction, warm_up
+    from treatment_store import TreatmentStore, format_treatment
+    from benchmarks.common import load_model_or_standin
+
+    def fake_chunk(text, lang, slow):
+        time.sleep(tts_latency)
+        return b"ID3" + text.encode("utf-8")
+
+    tts_cache._synthesize_chunk = fake_chunk
+    treatments = TreatmentStore(StubLLM(llm_latency), runtime_path=os.path.join(tmp, "treatments.json"))
+
+    model, is_real = load_model_or_standin()
+    warm_up(model)
+
+    timings = {stage: [] for stage in STAGES}
+    diseases = {}
+    rss_before = _rss_mib()
+    started = time.perf_counter()
+    for _, data in images:
+        start = time.perf_counter()
+        img = load_image(data)
+        timings["decode"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        valid = is_crop_image(img)
+        timings["validate"].append(time.perf_counter() - start)
+        if not valid:
+            continue
+
+        start = time.perf_counter()
+        batch = preprocess_image(img)
+        timings["preprocess"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        class_probs, severity = model.predict_on_batch(batch)
+        disease, scale = decode_prediction(class_probs[0], severity[0])
+        timings["predict"].append(time.perf_counter() - start)
+        diseases[disease] = diseases.get(disease, 0) + 1
+        if disease == "Healthy Plant":
+            continue
+
+        start = time.perf_counter()
+        lines = treatments.get(disease, lang, scale)
+        _, audio_text = format_treatment(lines)
+        timings["treatment"].append(time.perf_counter() - start)
+
+        if lang == "Kannada":
+            start = time.perf_counter()
+            tts_cache.synthesize(audio_text, lang="kn")
+            timings["tts"].append(time.perf_counter() - start)
+    wall = time.perf_counter() - started
+
+    return {
+        "model": "real" if is_real else "random stand-in",
+        "images": len(images),
+        "valid": len(timings["predict"]),
+        "diseases": diseases,
+        "wall_s": round(wall, 3),
+        "images_per_sec": round(len(images) / wall, 2),
+        "peak_rss_mib": round(_rss_mib(), 1),
+        "pipeline_rss_mib": round(_rss_mib() - rss_before, 1),
+        "stages": {stage: summarize(samples) for stage, samples in timings.items()},
+    }
+
+
+def compare(current, baseline, tolerance):
+    """Prints per-stage p50 deltas; returns the stages that regressed by more than `tolerance`."""
+    regressed = []
+    print(f"\nvs {baseline.get('commit') or 'baseline'}:")
+    for stage in STAGES:
+        new, old = current["stages"].get(stage, {}), baseline["stages"].get(stage, {})
+        if not new.get("n") or not old.get("n"):
+            continue
+        change = (new["p50_ms"] - old["p50_ms"]) / old["p50_ms"] if old["p50_ms"] else 0.0
+        flag = ""
+        # Sub-millisecond stages are too noisy to gate on
+        if change > tolerance and new["p50_ms"] - old["p50_ms"] > 1.0:
+            regressed.append(stage)
+            flag = "  REGRESSION"
+        print(f"  {stage:10s} p50 {old['p50_ms']:9.2f} -> {new['p50_ms']:9.2f} ms ({change:+.0%}){flag}")
+    print(f"  throughput {baseline['images_per_sec']} -> {current['images_per_sec']} img/s")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage disease pipeline benchmark")
+    parser.add_argument("--images", type=int, default=24, help="synthetic images when --images-dir is not given")
+    parser.add_argument("--images-dir", help="reference images (jpg/png) to use instead of synthetic ones")
+    parser.add_argument("--size", type=int, nargs=2, default=[2000, 1500], metavar=("W", "H"))
+    parser.add_argument("--lang", choices=["English", "Kannada"], default="Kannada")
+    parser.add_argument("--llm-latency-ms", type=float, default=1500)
+    parser.add_argument("--tts-latency-ms", type=float, default=400)
+    parser.add_argument("--out", help="write the results as JSON")
+    parser.add_argument("--compare", help="JSON from an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p50 slowdown per stage")
+    args = parser.parse_args()
+
+    from benchmarks.common import synthetic_jpegs, reference_jpegs
+    images = reference_jpegs(args.images_dir) if args.images_dir else synthetic_jpegs(args.images, tuple(args.size))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        report = run_pipeline(images, args.lang, args.llm_latency_ms / 1000, args.tts_latency_ms / 1000, tmp)
+    report.update({
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "backend": os.getenv("DISEASE_BACKEND", "keras"),
+        "lang": args.lang,
+        "stub_latency_ms": {"llm": args.llm_latency_ms, "tts": args.tts_latency_ms},
+    })
+
+    print(f"model: {report['model']}, images: {report['images']} ({report['valid']} crop), lang: {args.lang}")
+    print(f"{'stage':10s} {'n':>4} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'total s':>8}")
+    for stage, s in report["stages"].items():
+        if s["n"]:
+            print(f"{stage:10s} {s['n']:4d} {s['p50_ms']:9.2f} {s['p95_ms']:9.2f} {s['max_ms']:9.2f} {s['total_s']:8.2f}")
+    print(f"throughput {report['images_per_sec']} img/s, peak RSS {report['peak_rss_mib']} MiB")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"wrote {args.out}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        sys.exit(1 if compare(report, baseline, args.tolerance) else 0)
+
+
+if __name__ == "__main__":
+    main()
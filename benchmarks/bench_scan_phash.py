@@ -0,0 +1,63 @@
+# benchmarks/bench_scan_phash.py
+"""
+Picks (or rejects) a SCAN_CACHE_PHASH_DISTANCE from real leaf photos.
+
+    python -m benchmarks.bench_scan_phash --images path/to/leaf/photos
+
+Every photo in the folder is assumed to be a different picture. For each
+distance, it prints the share of distinct pairs whose dHashes are that
+close (false matches), and the share of photos that are still matched after
+JPEG recompression and downscaling (true matches). A usable distance has no
+false matches and a high true-match rate.
+"""
+import io
+import os
+import argparse
+import itertools
+
+import numpy as np
+from PIL import Image
+
+from disease_model import load_image
+from scan_cache import perceptual_hash
+
+
+def recompressed(img, quality, scale):
+    buf = io.BytesIO()
+    img.resize((max(1, int(img.width * scale)), max(1, int(img.height * scale)))).save(buf, "JPEG", quality=quality)
+    return Image.open(io.BytesIO(buf.getvalue()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="dHash false/true match rates on a folder of distinct photos")
+    parser.add_argument("--images", required=True, help="folder of distinct leaf photos (jpg/png)")
+    parser.add_argument("--quality", type=int, default=60, help="JPEG quality of the re-upload")
+    parser.add_argument("--scale", type=float, default=0.7, help="downscale of the re-upload")
+    parser.add_argument("--max-distance", type=int, default=10)
+    args = parser.parse_args()
+
+    paths = sorted(
+        os.path.join(args.images, name) for name in os.listdir(args.images)
+        if name.lower().endswith((".jpg", ".jpeg", ".png"))
+    )
+    imgs = [load_image(path) for path in paths]
+    hashed = [(img, perceptual_hash(img)) for img in imgs]
+    hashed = [(img, h) for img, h in hashed if h is not None]
+    print(f"{len(paths)} photos, {len(hashed)} with enough contrast to hash")
+
+    hashes = [h for _, h in hashed]
+    pairs = list(itertools.combinations(range(len(hashes)), 2))
+    pair_distances = np.array([(hashes[i] ^ hashes[j]).bit_count() for i, j in pairs])
+    reupload = [perceptual_hash(recompressed(img, args.quality, args.scale)) for img, _ in hashed]
+    reupload_distances = np.array([(h ^ r).bit_count() if r is not None else 65 for (_, h), r in zip(hashed, reupload)])
+
+    print(f"{'distance':>8} {'false pairs':>12} {'photos hit':>11} {'re-uploads':>11}")
+    for distance in range(args.max_distance + 1):
+        close = pair_distances <= distance
+        photos_hit = {photo for pair, c in zip(pairs, close) if c for photo in pair}
+        print(f"{distance:8d} {close.mean():12.4%} {len(photos_hit) / len(hashes):11.1%} "
+              f"{(reupload_distances <= distance).mean():11.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# benchmarks/bench_tflite.py
+"""
+Accuracy parity, latency and RSS of the Keras vs TFLite disease backends on CPU.
+
+    python -m benchmarks.bench_tflite --quantization dynamic --threads 1
+
+Conversion and each backend run in their own subprocess, so peak RSS is
+measured separately.
+Without FinalTest_inceptionv3.h5 a random stand-in model is used, which
+checks the conversion path but not real accuracy.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import subprocess
+
+import numpy as np
+
+from disease_tflite import TFLITE_THREADS
+
+
+def _rss_mib():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_worker(backend, tflite_path, threads, n_images, batch_size, quantization):
+    from disease_model import is_crop_image, predict_batch
+    from benchmarks.common import synthetic_leaf_images, load_model_or_standin
+
+    imgs = [img for img in synthetic_leaf_images(n_images, size=(640, 480), seed=7) if is_crop_image(img)]
+    if backend == "convert":
+        from disease_tflite import convert_to_tflite
+        keras_model, is_real = load_model_or_standin()
+        calib = (np.asarray(img.resize((224, 224)), dtype=np.float32) / 255.0 for img in imgs[:16])
+        convert_to_tflite(keras_model, tflite_path, quantization, calib)
+        return {"backend": backend, "tflite_mib": os.path.getsize(tflite_path) / 2**20}
+
+    rss_before = _rss_mib()
+    if backend == "tflite":
+        from disease_tflite import TFLiteDiseaseModel
+        model, is_real = TFLiteDiseaseModel(tflite_path, num_threads=threads), None
+    else:
+        model, is_real = load_model_or_standin()
+
+    predict_batch(model, imgs[:1], batch_size=1)  # warm-up
+    single = []
+    for img in imgs:
+        start = time.perf_counter()
+        predict_batch(model, [img], batch_size=1)
+        single.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    results = predict_batch(model, imgs, batch_size=batch_size)
+    batch_time = time.perf_counter() - start
+    return {
+        "backend": backend,
+        "real_model": is_real,
+        "p50_ms": float(np.percentile(single, 50) * 1000),
+        "p95_ms": float(np.percentile(single, 95) * 1000),
+        "batch_images_per_sec": len(imgs) / batch_time,
+        "rss_model_mib": _rss_mib() - rss_before,
+        "peak_rss_mib": _rss_mib(),
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keras vs TFLite disease backend comparison")
+    parser.add_argument("--quantization", choices=["none", "dynamic", "int8"], default="dynamic")
+    parser.add_argument("--threads", type=int, default=TFLITE_THREADS)
+    parser.add_argument("--images", type=int, default=24)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--severity-tolerance", type=float, default=0.5)
+    parser.add_argument("--worker", choices=["convert", "keras", "tflite"], help=argparse.SUPPRESS)
+    parser.add_argument("--tflite-path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.tflite_path, args.threads, args.images, args.batch_size, args.quantization)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tflite_path = os.path.join(tmp, f"model_{args.quantization}.tflite")
+        reports = {}
+        for backend in ("convert", "keras", "tflite"):
+            cmd = [sys.executable, "-m", "benchmarks.bench_tflite", "--worker", backend, "--tflite-path", tflite_path,
+                   "--quantization", args.quantization, "--threads", str(args.threads),
+                   "--images", str(args.images), "--batch-size", str(args.batch_size)]
+            out = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+            reports[backend] = json.loads(out.strip().splitlines()[-1])
+
+    keras_res, lite_res = reports["keras"]["results"], reports["tflite"]["results"]
+    agree = sum(a[0] == b[0] for a, b in zip(keras_res, lite_res))
+    sev_diff = max((abs(a[1] - b[1]) for a, b in zip(keras_res, lite_res)), default=0.0)
+    print(f"model: {'real' if reports['keras']['real_model'] else 'random stand-in'}, quantization: {args.quantization}, "
+          f"threads: {args.threads}, tflite size: {reports['convert']['tflite_mib']:.1f} MiB")
+    for name in ("keras", "tflite"):
+        r = reports[name]
+        print(f"{name:7s} p50 {r['p50_ms']:7.1f} ms  p95 {r['p95_ms']:7.1f} ms  batch {r['batch_images_per_sec']:6.2f} img/s  "
+              f"model RSS +{r['rss_model_mib']:6.0f} MiB  peak RSS {r['peak_rss_mib']:6.0f} MiB")
+    ok = agree == len(keras_res) and sev_diff <= args.severity_tolerance
+    print(f"parity: labels {agree}/{len(keras_res)}, max severity diff {sev_diff:.3f} (tolerance {args.severity_tolerance}) -> {'OK' if ok else 'FAIL'}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
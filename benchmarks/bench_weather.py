@@ -0,0 +1,145 @@
+# benchmarks/bench_weather.py
+"""
+Weather service against a local OpenWeather stub: cell sharing, stale serving and the circuit breaker.
+
+    python -m benchmarks.bench_weather --users 500
+    python -m benchmarks.bench_weather --serve --port 8790    # stub only; then
+    WEATHER_API_URL=http://127.0.0.1:8790 OPENWEATHER_API_KEY=stub streamlit run AgriBot.py
+
+The stub answers /weather like OpenWeather's current-weather endpoint after
+--latency-ms. Its failure mode can be switched at runtime by POSTing to
+/mode with a body of "ok", "error" (HTTP 500) or "hang" (sleeps past the
+client timeout).
+"""
+import json
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import requests
+
+from weather import WeatherService, CircuitBreaker, snap
+
+
+class StubState:
+    def __init__(self, latency):
+        self.latency = latency
+        self.mode = "ok"
+        self.calls = 0
+        self.lock = threading.Lock()
+
+
+def make_handler(state):
+    class StubHandler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, body):
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            with state.lock:
+                state.calls += 1
+            if state.mode == "hang":
+                time.sleep(30)
+            time.sleep(state.latency)
+            if state.mode == "error":
+                self._send(500, {"cod": 500, "message": "stub failure"})
+                return
+            self._send(200, {
+                "cod": 200,
+                "main": {"temp": 27.4, "humidity": 58},
+                "rain": {"1h": 0.2},
+                "weather": [{"description": "scattered clouds", "icon": "03d"}],
+            })
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            state.mode = self.rfile.read(length).decode("utf-8").strip() or "ok"
+            self._send(200, {"mode": state.mode})
+
+    return StubHandler
+
+
+def start_stub(port, latency):
+    state = StubState(latency)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+def set_mode(url, mode):
+    requests.post(f"{url}/mode", data=mode, timeout=5)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Weather service benchmark against a stub upstream")
+    parser.add_argument("--serve", action="store_true", help="only run the stub server")
+    parser.add_argument("--port", type=int, default=8790)
+    parser.add_argument("--latency-ms", type=float, default=150)
+    parser.add_argument("--users", type=int, default=500, help="simulated users around Bengaluru")
+    args = parser.parse_args()
+
+    server, state = start_stub(args.port, args.latency_ms / 1000)
+    url = f"http://127.0.0.1:{args.port}"
+    if args.serve:
+        print(f"stub weather API on {url} (POST ok/error/hang to {url}/mode)")
+        threading.Event().wait()
+
+    # 1. Cell sharing: users scattered within ~30 km of the city center
+    rng = np.random.default_rng(0)
+    points = rng.normal((12.97, 77.59), 0.12, size=(args.users, 2))
+    service = WeatherService(api_key="stub", api_url=url, timeout=2)
+    latencies = [timed(lambda: service.get(lat, lon))[1] for lat, lon in points]
+    cells = {snap(lat, lon) for lat, lon in points}
+    print(f"{args.users} users -> {len(cells)} cells, {state.calls} upstream calls "
+          f"(raw-coordinate keys would make {args.users})")
+    hits = [ms for ms in latencies if ms < args.latency_ms / 2]
+    print(f"  cached lookup p50 {np.percentile(hits, 50):.3f} ms, miss p50 {np.percentile([ms for ms in latencies if ms >= args.latency_ms / 2], 50):.0f} ms")
+
+    # 2. Stale-while-revalidate: expired readings are served at once, one refresh per cell
+    service.ttl = 0
+    calls_before = state.calls
+    stale = [timed(lambda: service.get(*points[0])) for _ in range(20)]
+    time.sleep(args.latency_ms / 1000 * 3)
+    print(f"stale lookups: {stale[0][0]['source']}, p50 {np.percentile([ms for _, ms in stale], 50):.3f} ms, "
+          f"{state.calls - calls_before} background refresh for 20 lookups")
+
+    # 3. Circuit breaker: a failing upstream is called WEATHER_BREAKER_FAILURES times, then skipped
+    breaker = CircuitBreaker(failures=3, cooldown=2)
+    service = WeatherService(api_key="stub", api_url=url, timeout=1, breaker=breaker)
+    service.get(*points[0])
+    service.ttl = 0
+    set_mode(url, "hang")
+    calls_before = state.calls
+    new_cells = rng.uniform((8, 70), (30, 90), size=(50, 2))
+    results = [timed(lambda: service.get(lat, lon)) for lat, lon in new_cells]
+    print(f"hanging upstream, 50 new cells: {state.calls - calls_before} upstream calls, breaker {breaker.state}, "
+          f"first {results[0][1]:.0f} ms, last {results[-1][1]:.2f} ms ({results[-1][0]['source']})")
+    reading, ms = timed(lambda: service.get(*points[0]))
+    print(f"  known cell while open: {reading['source']} reading, {ms:.2f} ms")
+
+    set_mode(url, "ok")
+    time.sleep(breaker.cooldown)
+    reading, ms = timed(lambda: service.get(*new_cells[0]))
+    print(f"after cooldown: trial call {reading['source']} in {ms:.0f} ms, breaker {breaker.state}")
+    print(f"stats: {service.stats()}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# benchmarks/common.py
+"""Shared fixtures for the offline benchmarks (run them from the repo root with `python -m`)."""
+import io
+import os
+import glob
+
+import numpy as np
+from PIL import Image
+
+from disease_model import MODEL_PATH, IMG_SIZE, class_labels, load_keras_model
+
+
+def synthetic_leaf_images(n=32, size=(1024, 768), seed=0):
+    """Noisy green/brown 'leaf' photos that pass is_crop_image, plus a few gray non-crop ones."""
+    rng = np.random.default_rng(seed)
+    w, h = size
+    imgs = []
+    for i in range(n):
+        if i % 8 == 7:
+            base = np.full((h, w, 3), 128, dtype=np.int16)          # gray: rejected
+        else:
+            base = np.empty((h, w, 3), dtype=np.int16)
+            base[..., 0] = rng.integers(40, 140)
+            base[..., 1] = rng.integers(110, 200)
+            base[..., 2] = rng.integers(20, 80)
+        noise = rng.integers(-25, 26, size=(h, w, 3), dtype=np.int16)
+        imgs.append(Image.fromarray(np.clip(base + noise, 0, 255).astype(np.uint8), "RGB"))
+    return imgs
+
+
+def synthetic_jpegs(n=32, size=(2000, 1500), seed=0, quality=90):
+    """The synthetic_leaf_images set encoded as phone-style JPEG bytes; every other one is EXIF-rotated."""
+    jpegs = []
+    for i, img in enumerate(synthetic_leaf_images(n, size, seed)):
+        exif = Image.Exif()
+        if i % 2:
+            exif[0x0112] = 6  # Orientation: rotate 90 CW
+        buffer = io.BytesIO()
+        img.save(buffer, "JPEG", quality=quality, exif=exif)
+        jpegs.append((f"synthetic_{i:03d}.jpg", buffer.getvalue()))
+    return jpegs
+
+
+def reference_jpegs(directory):
+    """(name, bytes) for every jpg/jpeg/png under `directory`, sorted by path."""
+    paths = sorted(p for ext in ("jpg", "jpeg", "png") for p in glob.glob(os.path.join(directory, f"**/*.{ext}"), recursive=True))
+    images = []
+    for path in paths:
+        with open(path, "rb") as f:
+            images.append((os.path.relpath(path, directory), f.read()))
+    return images
+
+
+def build_standin_model(seed=0):
+    """Randomly initialized InceptionV3 with the same class + severity heads as the real model."""
+    import tensorflow as tf
+    tf.keras.utils.set_random_seed(seed)
+    base = tf.keras.applications.InceptionV3(include_top=False, weights=None, input_shape=IMG_SIZE + (3,), pooling="avg")
+    class_head = tf.keras.layers.Dense(len(class_labels), activation="softmax", name="disease")(base.output)
+    severity_head = tf.keras.layers.Dense(1, name="severity")(base.output)
+    return tf.keras.Model(base.input, [class_head, severity_head])
+
+
+def load_model_or_standin(model_path=MODEL_PATH):
+    """Returns (model, is_real); falls back to the stand-in when the .h5 file is absent."""
+    model = load_keras_model(model_path)
+    if model is not None:
+        return model, True
+    return build_standin_model(), False
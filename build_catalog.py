@@ -0,0 +1,119 @@
+# build_catalog.py
+"""
+Builds locales/catalog_kn.json from every literal t("...") call in the app,
+every literal translate("...") in the modules that take a translate function
+(crop_map, crop_suitability), and the fixed data those modules translate.
+
+    python build_catalog.py            # translate new strings, keep existing ones
+    python build_catalog.py --check    # exit 1 if the catalog is missing strings
+
+Existing translations are reused, so the file can be hand-reviewed and
+only new strings hit the translator. Strings the translator could not
+handle are listed under "untranslated" and retried on the next build. The
+catalog version is bumped whenever its content changes.
+"""
+import os
+import ast
+import sys
+import json
+import glob
+import hashlib
+import argparse
+
+from disk_cache import atomic_write
+from i18n import CATALOG_PATH, load_catalog
+
+SOURCE_FILES = ["AgriBot.py", "utils.py", "project_bot.py"] + sorted(glob.glob(os.path.join("pages", "*.py")))
+TRANSLATE_FILES = ["crop_map.py", "crop_suitability.py"]
+BATCH_SIZE = 50
+
+
+def collect_literals(paths, func):
+    """Returns the set of string literals passed as the first argument to `func()` in `paths`."""
+    found = set()
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            tree = ast.parse(f.read(), filename=path)
+        for node in ast.walk(tree):
+            if (
+                isinstance(node, ast.Call)
+                and isinstance(node.func, ast.Name)
+                and node.func.id == func
+                and node.args
+                and isinstance(node.args[0], ast.Constant)
+                and isinstance(node.args[0].value, str)
+            ):
+                found.add(node.args[0].value)
+    return found
+
+
+def data_strings():
+    """Fixed data that is translated at runtime: map crop lists, feature names and ranked crop names."""
+    from crop_map import FAMOUS_CROPS, KARNATAKA_DISTRICT_CROPS
+    from crop_suitability import CROPS, FEATURE_NAMES
+    return (
+        set(FAMOUS_CROPS.values())
+        | {data["crops"] for data in KARNATAKA_DISTRICT_CROPS.values()}
+        | set(FEATURE_NAMES.values())
+        | set(CROPS)
+    )
+
+
+def collect_strings():
+    return sorted(collect_literals(SOURCE_FILES, "t") | collect_literals(TRANSLATE_FILES, "translate") | data_strings())
+
+
+def translate_batch(texts):
+    from deep_translator import GoogleTranslator
+    translator = GoogleTranslator(source="en", target="kn")
+    results = []
+    for start in range(0, len(texts), BATCH_SIZE):
+        results.extend(translator.translate_batch(texts[start:start + BATCH_SIZE]))
+    return results
+
+
+def build(path=CATALOG_PATH):
+    version, existing = load_catalog(path)
+    previous_hash = None
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            previous_hash = json.load(f).get("source_hash")
+    strings = collect_strings()
+    missing = [s for s in strings if s not in existing]
+    if missing:
+        print(f"Translating {len(missing)} new strings...")
+        try:
+            for source, translated in zip(missing, translate_batch(missing)):
+                if translated:
+                    existing[source] = translated
+        except Exception as e:
+            print(f"Translator unavailable, keeping {len(missing)} strings untranslated: {e}")
+
+    catalog = {s: existing[s] for s in strings if s in existing}
+    untranslated = [s for s in strings if s not in existing]
+    source_hash = hashlib.sha256(json.dumps(catalog, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+    if source_hash != previous_hash:
+        version = (version or 0) + 1
+
+    # The app loads this file at import: never leave it half-written
+    atomic_write(path, json.dumps(
+        {"version": version, "source_hash": source_hash, "strings": catalog, "untranslated": untranslated},
+        ensure_ascii=False, indent=1, sort_keys=True,
+    ))
+    print(f"Wrote {len(catalog)}/{len(strings)} strings to {path} (version {version})")
+    return len(untranslated)
+
+
+def check(path=CATALOG_PATH):
+    _, existing = load_catalog(path)
+    missing = [s for s in collect_strings() if s not in existing]
+    for s in missing:
+        print(f"missing: {s!r}")
+    return len(missing)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--check", action="store_true", help="only report strings missing from the catalog")
+    args = parser.parse_args()
+    sys.exit(1 if (check() if args.check else build()) else 0)
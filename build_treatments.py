@@ -0,0 +1,102 @@
+# build_treatments.py
+"""
+Builds locales/treatments.json: advice for every disease, language and severity band.
+
+    python build_treatments.py                     # generate missing entries, keep existing ones
+    python build_treatments.py --check             # exit 1 if any combination is missing
+    python build_treatments.py --audio             # only pre-render Kannada TTS for the file
+    python build_treatments.py --sign-off "NAME"   # record the agronomist who reviewed the file
+
+Existing entries are kept as they are, so the file can be reviewed and edited
+by hand. Only missing combinations are sent to the LLM (GROQ_API_KEY).
+Generated advice is not authoritative: adding entries clears "reviewed_by",
+and the app treats the file as reviewed only once it is signed off again.
+"""
+import os
+import sys
+import json
+import argparse
+
+from disk_cache import atomic_write
+from treatment_store import (
+    TREATMENTS_PATH, BANDS, all_keys, entry_key, load_treatments,
+    generate_treatment, prerender_audio,
+)
+
+
+def missing_keys(entries):
+    return [(d, l, b) for d, l, b in all_keys() if entry_key(d, l, b) not in entries]
+
+
+def build(path=TREATMENTS_PATH):
+    from groq import Groq
+    from dotenv import load_dotenv
+    load_dotenv()
+    client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+
+    reviewed_by, entries = load_treatments(path)
+    for disease, lang, band in missing_keys(entries):
+        print(f"Generating {disease} / {lang} / {band}...")
+        try:
+            lines = generate_treatment(client, disease, lang, band)
+        except Exception as e:
+            print(f"  failed: {e}")
+            continue
+        if lines:
+            entries[entry_key(disease, lang, band)] = lines
+            reviewed_by = None  # new advice needs a new review
+
+    write(path, entries, reviewed_by)
+    missing = missing_keys(entries)
+    print(f"Wrote {len(all_keys()) - len(missing)}/{len(all_keys())} entries to {path}"
+          f"{'' if reviewed_by else ' (not reviewed yet)'}")
+    render_audio(path)
+    return len(missing)
+
+
+def write(path, entries, reviewed_by):
+    band_order = [band for band, _ in BANDS]
+    nested = {}
+    for disease, lang, band in sorted(all_keys(), key=lambda k: (k[0], k[1], band_order.index(k[2]))):
+        lines = entries.get(entry_key(disease, lang, band))
+        if lines:
+            nested.setdefault(disease, {}).setdefault(lang, {})[band] = lines
+
+    atomic_write(path, json.dumps({"version": 2, "reviewed_by": reviewed_by, "treatments": nested}, ensure_ascii=False, indent=2) + "\n")
+
+
+def sign_off(reviewer, path=TREATMENTS_PATH):
+    _, entries = load_treatments(path)
+    write(path, entries, reviewer)
+    print(f"Signed off {len(entries)} entries in {path} as reviewed by {reviewer}")
+    return 0
+
+
+def render_audio(path=TREATMENTS_PATH):
+    _, entries = load_treatments(path)
+    for disease, lang, band in all_keys():
+        prerender_audio(lang, entries.get(entry_key(disease, lang, band)))
+
+
+def check(path=TREATMENTS_PATH):
+    reviewed_by, entries = load_treatments(path)
+    if not reviewed_by:
+        print(f"{path} has not been signed off")
+    missing = missing_keys(entries)
+    for disease, lang, band in missing:
+        print(f"missing: {disease} / {lang} / {band}")
+    return len(missing) + (0 if reviewed_by else 1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--check", action="store_true", help="only report missing combinations")
+    parser.add_argument("--audio", action="store_true", help="only pre-render Kannada TTS")
+    parser.add_argument("--sign-off", metavar="NAME", help="mark the file as reviewed by NAME")
+    args = parser.parse_args()
+    if args.sign_off:
+        sys.exit(sign_off(args.sign_off))
+    if args.audio:
+        render_audio()
+        sys.exit(0)
+    sys.exit(1 if (check() if args.check else build()) else 0)
@@ -0,0 +1,61 @@
+# chat_context.py
+"""
+Token-budgeted prompt building for the Agri-Bot chat.
+
+Recent turns are packed newest-first into a fixed prompt budget. Turns that
+fall out of the budget are folded into a running summary, which is carried
+in the system prompt and only refreshed every few dropped messages.
+"""
+
+MESSAGE_OVERHEAD = 4   # role/format tokens per chat message
+SUMMARY_STEP = 6       # refresh the summary once this many new messages are dropped
+
+
+def estimate_tokens(text):
+    """Offline token estimate: ~4 ASCII chars per token, ~1 token per Kannada/other char."""
+    if not text:
+        return 0
+    ascii_chars = len(text.encode("ascii", "ignore"))
+    return ascii_chars // 4 + (len(text) - ascii_chars) + 1
+
+
+def select_recent(history, budget):
+    """Returns (start, tokens): history[start:] is the longest suffix that fits `budget`.
+
+    The newest message is always kept, even if it alone exceeds the budget.
+    """
+    used = 0
+    start = len(history)
+    for i in range(len(history) - 1, -1, -1):
+        cost = estimate_tokens(history[i]["content"]) + MESSAGE_OVERHEAD
+        if start < len(history) and used + cost > budget:
+            break
+        used += cost
+        start = i
+    return start, used
+
+
+def build_context(system_prompt, history, budget, summary=None):
+    """Returns (messages_payload, start, prompt_tokens) for one completion request."""
+    system_text = system_prompt
+    if summary and summary.get("text"):
+        system_text += "\n\nSummary of the earlier conversation:\n" + summary["text"]
+    system_tokens = estimate_tokens(system_text) + MESSAGE_OVERHEAD
+
+    start, used = select_recent(history, budget - system_tokens)
+    messages = [{"role": "system", "content": system_text}]
+    messages.extend({"role": m["role"], "content": m["content"]} for m in history[start:])
+    return messages, start, system_tokens + used
+
+
+def needs_summary(summary, dropped_upto):
+    """True when enough messages below absolute index `dropped_upto` are not yet summarized."""
+    covered = (summary or {}).get("upto", 0)
+    return dropped_upto - covered >= SUMMARY_STEP
+
+
+def update_summary(summary, new_messages, upto, summarize_fn):
+    """Folds `new_messages` into the running summary via `summarize_fn(previous, transcript)`."""
+    previous = (summary or {}).get("text", "")
+    transcript = "\n".join(f"{m['role']}: {m['content']}" for m in new_messages)
+    return {"text": summarize_fn(previous, transcript).strip(), "upto": upto}
@@ -0,0 +1,93 @@
+# chat_store.py
+"""
+Chat history persistence for `user_chats/<uid>`.
+
+Messages are stored under integer child keys ("0", "1", ...), which is the
+same shape Firebase uses for the plain list older clients `set()` in one go,
+so both formats load the same way. New turns are written with a single
+`update()` of just the new keys instead of re-uploading the whole list.
+"""
+
+CHAT_NODE = "user_chats"
+
+
+def _normalize(raw):
+    """Turns a stored node (list, dict or None) into (messages, next_index, has_gaps)."""
+    if not raw:
+        return [], 0, False
+    if isinstance(raw, dict):
+        indexed = []
+        for key, value in raw.items():
+            try:
+                indexed.append((int(key), value))
+            except (TypeError, ValueError):
+                continue
+        indexed.sort(key=lambda item: item[0])
+    else:
+        indexed = list(enumerate(raw))
+
+    messages = [msg for _, msg in indexed if msg]
+    next_index = indexed[-1][0] + 1 if indexed else 0
+    return messages, next_index, len(messages) != next_index
+
+
+def load_chat_history(db, user_id, token, compact=True):
+    """Returns (messages, next_index). Gapped logs are folded back into a dense list."""
+    raw = db.child(CHAT_NODE).child(user_id).get(token=token).val()
+    messages, next_index, has_gaps = _normalize(raw)
+    if has_gaps and compact:
+        next_index = compact_chat_history(db, user_id, token, messages)
+    return messages, next_index
+
+
+def load_chat_page(db, user_id, token, before_index=None, page_size=20):
+    """Returns (messages, first_index, next_index) for one page of history.
+
+    Fetches the newest `page_size` keys below `before_index` (or the newest
+    page overall) with an ordered/limited key query, so only that page
+    crosses the wire. `first_index` is the cursor for the next older page,
+    0 once nothing older is left; `next_index` is where the next append goes.
+    """
+    if before_index is not None and before_index <= 0:
+        return [], 0, 0
+    query = db.child(CHAT_NODE).child(user_id).order_by_key()
+    if before_index is not None:
+        query = query.end_at(str(before_index - 1))
+    raw = query.limit_to_last(page_size).get(token=token).val()
+
+    if isinstance(raw, dict):
+        indexed = sorted((int(k), v) for k, v in raw.items() if str(k).isdigit() and v)
+    else:
+        indexed = [(i, v) for i, v in enumerate(raw or []) if v]
+    if not indexed:
+        return [], 0, 0
+    return [msg for _, msg in indexed], indexed[0][0], indexed[-1][0] + 1
+
+
+def append_messages(db, user_id, token, start_index, new_messages):
+    """Writes only `new_messages` at keys start_index.. and returns the next free index."""
+    updates = {str(start_index + i): msg for i, msg in enumerate(new_messages)}
+    if updates:
+        db.child(CHAT_NODE).child(user_id).update(updates, token=token)
+    return start_index + len(new_messages)
+
+
+def compact_chat_history(db, user_id, token, messages=None):
+    """Rewrites the node as one dense list snapshot and returns the next free index."""
+    if messages is None:
+        raw = db.child(CHAT_NODE).child(user_id).get(token=token).val()
+        messages, _, _ = _normalize(raw)
+    db.child(CHAT_NODE).child(user_id).set(list(messages), token=token)
+    return len(messages)
+
+
+SUMMARY_NODE = "user_chat_summary"
+
+
+def load_chat_summary(db, user_id, token):
+    """Returns the stored running summary ({"text", "upto"}) or None."""
+    return db.child(SUMMARY_NODE).child(user_id).get(token=token).val() or None
+
+
+def save_chat_summary(db, user_id, token, summary):
+    db.child(SUMMARY_NODE).child(user_id).set(summary, token=token)
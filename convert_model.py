@@ -0,0 +1,48 @@
+# convert_model.py
+"""
+One-time conversion of FinalTest_inceptionv3.h5 to a quantized TFLite model.
+
+    python convert_model.py                                  # dynamic-range quantization
+    python convert_model.py --quantization int8 --calibration-dir data/leaves
+
+Run the app with DISEASE_BACKEND=tflite to use the result.
+"""
+import os
+import sys
+import glob
+import argparse
+
+import numpy as np
+from PIL import Image
+
+from disease_model import MODEL_PATH, IMG_SIZE, load_keras_model
+from disease_tflite import TFLITE_MODEL_PATH, convert_to_tflite
+
+
+def calibration_images(directory, limit=200):
+    paths = sorted(p for ext in ("jpg", "jpeg", "png") for p in glob.glob(os.path.join(directory, f"**/*.{ext}"), recursive=True))
+    for path in paths[:limit]:
+        with Image.open(path) as img:
+            yield np.asarray(img.convert("RGB").resize(IMG_SIZE), dtype=np.float32) / 255.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert the paddy disease model to TFLite")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--out", default=TFLITE_MODEL_PATH)
+    parser.add_argument("--quantization", choices=["none", "dynamic", "int8"], default="dynamic")
+    parser.add_argument("--calibration-dir", help="leaf images for int8 calibration")
+    args = parser.parse_args()
+
+    model = load_keras_model(args.model)
+    if model is None:
+        sys.exit(f"Model file not found at {args.model}")
+    if args.quantization == "int8" and not args.calibration_dir:
+        sys.exit("--calibration-dir is required for int8")
+    images = calibration_images(args.calibration_dir) if args.calibration_dir else None
+    path = convert_to_tflite(model, args.out, args.quantization, images)
+    print(f"Wrote {path} ({os.path.getsize(path) / 2**20:.1f} MiB, {args.quantization})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+# crop_map.py
+"""
+The "Crop Map" tab: major crops by state, and per district for Karnataka.
+
+The Folium map is the same for every user in a language, so it is built
+once per (language, MAP_VERSION) instead of on every rerun. MAP_VERSION is
+a hash of the marker data, so editing the data invalidates the cache by
+itself. Built maps are kept in the process (get_map) and as HTML files
+under CROP_MAP_CACHE_DIR. A restart, or a new replica, therefore skips
+the Kannada translation of every popup. A map where any popup fell back to
+English (translator down) is never written to disk or published. It is
+only kept in the process for CROP_MAP_RETRY_SECONDS, then rebuilt.
+
+If CROP_MAP_STATIC_DIR is set to Streamlit's static folder (with
+server.enableStaticServing = true), the map is also written there under a
+content-hashed name. The page then embeds a URL instead of the HTML. The
+browser caches the file, and each rerun sends only the iframe tag.
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+
+import streamlit as st
+
+from disk_cache import atomic_write
+
+CROP_MAP_CACHE_DIR = os.getenv("CROP_MAP_CACHE_DIR", os.path.join(".cache", "maps"))
+CROP_MAP_STATIC_DIR = os.getenv("CROP_MAP_STATIC_DIR")          # e.g. "static"; unset = inline HTML
+CROP_MAP_STATIC_URL = os.getenv("CROP_MAP_STATIC_URL", "/app/static")
+CROP_MAP_RETRY_SECONDS = float(os.getenv("CROP_MAP_RETRY_SECONDS", 300))
+CROP_MAP_HEIGHT = 600
+
+FAMOUS_CROPS = { "Punjab": "Wheat 🌾", "Haryana": "Rice 🌾", "Uttar Pradesh": "Sugarcane 🍬", "Bihar": "Maize 🌽", "West Bengal": "Rice 🌾", "Odisha": "Rice 🌾", "Maharashtra": "Cotton ☁️", "Gujarat": "Groundnut 🥜", "Kerala": "Coconut 🥥", "Tamil Nadu": "Rice 🌾", "Madhya Pradesh": "Soybean 🌱", "Andhra Pradesh": "Chillies 🌶️", "Telangana": "Cotton ☁️", "Rajasthan": "Bajra 🌾", "Assam": "Tea 🍃" }
+STATE_COORDS = { "Punjab": (31.15, 75.34), "Haryana": (29.06, 76.08), "Uttar Pradesh": (26.84, 80.94), "Bihar": (25.59, 85.13), "West Bengal": (22.57, 88.36), "Odisha": (20.27, 85.84), "Maharashtra": (19.07, 72.88), "Gujarat": (22.30, 70.80), "Karnataka": (14.52, 75.72), "Kerala": (10.85, 76.27), "Tamil Nadu": (13.08, 80.27), "Madhya Pradesh": (23.25, 77.41), "Andhra Pradesh": (15.91, 79.74), "Telangana": (17.39, 78.49), "Rajasthan": (26.91, 75.79), "Assam": (26.20, 92.93) }
+
+# Every Karnataka district in the Crop Recommender's district list
+KARNATAKA_DISTRICT_CROPS = {
+    # South/Cauvery Basin
+    "Mandya": {"coords": (12.53, 76.90), "crops": "Sugarcane, Paddy, Coconut"},
+    "Mysuru": {"coords": (12.30, 76.65), "crops": "Ragi, Turmeric, Paddy"},
+    "Chamarajanagara": {"coords": (11.93, 77.12), "crops": "Turmeric, Banana, Maize"},
+    "Bengaluru Urban": {"coords": (12.97, 77.59), "crops": "Ragi, Rice, Vegetables"},
+    "Bengaluru Rural": {"coords": (13.00, 77.40), "crops": "Ragi, Mango, Pulses"},
+    "Ramanagara": {"coords": (12.75, 77.26), "crops": "Sericulture, Ragi, Coconut"},
+    "Kolar": {"coords": (13.13, 78.13), "crops": "Tomato, Groundnut, Pulses"},
+    "Chikkaballapura": {"coords": (13.43, 77.72), "crops": "Groundnut, Grapes, Ragi"},
+    # Malnad/Coastal
+    "Kodagu": {"coords": (12.33, 75.74), "crops": "Coffee, Cardamom, Paddy"},
+    "Chikkamagaluru": {"coords": (13.31, 75.77), "crops": "Coffee, Arecanut, Paddy"},
+    "Hassan": {"coords": (13.01, 76.10), "crops": "Coffee, Potato, Paddy"},
+    "Shivamogga": {"coords": (13.92, 75.56), "crops": "Arecanut, Paddy, Maize"},
+    "Dakshina Kannada": {"coords": (12.91, 74.85), "crops": "Arecanut, Coconut, Rice"},
+    "Udupi": {"coords": (13.34, 74.74), "crops": "Coconut, Rice, Arecanut"},
+    "Uttara Kannada": {"coords": (14.65, 74.61), "crops": "Cashew, Paddy, Spice"},
+    # North/Central Karnataka
+    "Davanagere": {"coords": (14.46, 75.92), "crops": "Paddy, Maize, Cotton"},
+    "Chitradurga": {"coords": (14.22, 76.40), "crops": "Groundnut, Jowar, Maize"},
+    "Tumakuru": {"coords": (13.34, 77.10), "crops": "Coconut, Ragi, Groundnut"},
+    "Ballari": {"coords": (15.14, 76.92), "crops": "Paddy, Cotton, Jowar"},
+    "Koppal": {"coords": (15.35, 76.08), "crops": "Paddy, Cotton, Tur Dal"},
+    "Raichur": {"coords": (16.21, 77.34), "crops": "Paddy, Cotton, Jowar"},
+    # Hyderabad-Karnataka Region (Kalyana Karnataka)
+    "Kalaburagi": {"coords": (17.33, 76.83), "crops": "Red Gram (Tur), Jowar, Maize"},
+    "Yadgir": {"coords": (16.76, 77.13), "crops": "Red Gram (Tur), Cotton, Jowar"},
+    "Bidar": {"coords": (17.91, 77.51), "crops": "Red Gram (Tur), Jowar, Sugarcane"},
+    # Belagavi Region
+    "Belagavi": {"coords": (15.85, 74.50), "crops": "Sugarcane, Jowar, Groundnut"},
+    "Dharwad": {"coords": (15.46, 75.00), "crops": "Jowar, Wheat, Bengal Gram"},
+    "Haveri": {"coords": (14.79, 75.45), "crops": "Maize, Cotton, Paddy"},
+    "Gadag": {"coords": (15.35, 75.62), "crops": "Jowar, Cotton, Groundnut"},
+    "Bagalkote": {"coords": (16.18, 75.66), "crops": "Jowar, Bajra, Sugarcane"},
+    "Vijayapura": {"coords": (16.82, 75.71), "crops": "Jowar, Sunflower, Grapes"},
+}
+
+MAP_VERSION = hashlib.sha256(
+    json.dumps([FAMOUS_CROPS, STATE_COORDS, KARNATAKA_DISTRICT_CROPS], ensure_ascii=False, sort_keys=True).encode("utf-8")
+).hexdigest()[:12]
+
+
+def build_map(lang, translate_fn):
+    """(HTML document of the map with popups in `lang`, texts left in English).
+
+    translate_fn(text, lang) returns the translation, or None when it is unavailable.
+    """
+    import folium
+    from folium.plugins import MarkerCluster
+
+    fallbacks = []
+
+    def translate(text, lang):
+        translated = translate_fn(text, lang)
+        if translated is None:
+            fallbacks.append(text)
+            return text
+        return translated
+
+    # Initialize Map centered roughly on India
+    m = folium.Map(location=[22.97, 78.65], zoom_start=5)
+    marker_cluster = MarkerCluster().add_to(m)
+
+    # 1. General state markers
+    for state, crop in FAMOUS_CROPS.items():
+        coords = STATE_COORDS.get(state)
+        if coords:
+            popup = f"<b>{state}</b><br>{translate('Famous Crop', lang)}: {translate(crop, lang)}"
+            folium.Marker(
+                location=coords,
+                popup=popup,
+                tooltip=f"{state}: {crop}",
+                icon=folium.Icon(color='green', icon='leaf')
+            ).add_to(marker_cluster)
+
+    # 2. Karnataka district markers
+    for district, data in KARNATAKA_DISTRICT_CROPS.items():
+        popup = f"<b>Karnataka: {district}</b><br>{translate('Major Crops', lang)}: {translate(data['crops'], lang)}"
+        folium.Marker(
+            location=data["coords"],
+            popup=popup,
+            tooltip=f"Karnataka: {district} - {data['crops']}",
+            icon=folium.Icon(color='blue', icon='map-pin')
+        ).add_to(marker_cluster)
+
+    return m.get_root().render(), fallbacks
+
+
+def load_or_build(lang, translate_fn):
+    """(map HTML, complete) from the disk cache, built on a miss; only complete maps are stored."""
+    path = os.path.join(CROP_MAP_CACHE_DIR, f"crop_map-{MAP_VERSION}-{lang}.html")
+    try:
+        with open(path, encoding="utf-8") as f:
+            return f.read(), True
+    except OSError:
+        pass
+    html, fallbacks = build_map(lang, translate_fn)
+    if fallbacks:
+        print(f"Crop map ({lang}) not cached: {len(fallbacks)} untranslated texts")
+        return html, False
+    try:
+        atomic_write(path, html)
+    except OSError as e:
+        print(f"Crop map cache write failed: {e}")
+    return html, True
+
+
+def publish(lang, html, static=True):
+    """{"html", "digest", "url"}; "url" is set when the map is served as a static file."""
+    digest = hashlib.sha256(html.encode("utf-8")).hexdigest()[:16]
+    url = None
+    if static and CROP_MAP_STATIC_DIR:
+        name = f"crop_map-{lang}-{digest}.html"
+        try:
+            path = os.path.join(CROP_MAP_STATIC_DIR, name)
+            if not os.path.exists(path):
+                atomic_write(path, html)
+            url = f"{CROP_MAP_STATIC_URL}/{name}"
+        except OSError as e:
+            print(f"Crop map static write failed: {e}")
+    return {"html": html, "digest": digest, "url": url}
+
+
+class MapStore:
+    """Built maps per (lang, version); incomplete ones expire after CROP_MAP_RETRY_SECONDS."""
+
+    def __init__(self, retry_seconds=CROP_MAP_RETRY_SECONDS):
+        self.retry_seconds = retry_seconds
+        self._maps = {}   # (lang, version) -> (map dict, expires or None)
+        self._lock = threading.Lock()
+
+    def get(self, lang, translate_fn, version=MAP_VERSION):
+        with self._lock:
+            entry = self._maps.get((lang, version))
+            if entry is not None and (entry[1] is None or time.monotonic() < entry[1]):
+                return entry[0]
+            html, complete = load_or_build(lang, translate_fn)
+            crop_map = publish(lang, html, static=complete)
+            self._maps[(lang, version)] = (crop_map, None if complete else time.monotonic() + self.retry_seconds)
+            return crop_map
+
+
+@st.cache_resource
+def get_map_store():
+    """The built maps shared by every Streamlit session in this process."""
+    return MapStore()
+
+
+def get_map(lang, translate_fn=None):
+    """{"html", "digest", "url"} for `lang`; translate_fn(text, lang) returns None when a translation is unavailable."""
+    return get_map_store().get(lang, translate_fn or (lambda text, lang: text))
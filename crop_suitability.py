@@ -0,0 +1,131 @@
+# crop_suitability.py
+"""
+Local crop-suitability scoring for the Crop Recommender.
+
+Each crop has an ideal range per feature (N, P, K, temperature, humidity,
+pH, rainfall), close to the per-crop spread in the public "Crop
+Recommendation" soil dataset, plus a few Karnataka staples. A feature
+inside its range scores 1. Outside it, the score falls off as a Gaussian
+of the distance in units of FEATURE_TOLERANCE. A crop's score is the
+weighted geometric mean over features, so the whole catalog is ranked in
+one NumPy pass and the ranking is reproducible. The LLM is only used,
+optionally and in the background, to phrase the reasons (explain_async).
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+FEATURES = ("n", "p", "k", "temp", "humidity", "ph", "rainfall")
+FEATURE_NAMES = {
+    "n": "nitrogen", "p": "phosphorus", "k": "potassium", "temp": "temperature",
+    "humidity": "humidity", "ph": "pH", "rainfall": "rainfall",
+}
+# Distance outside the range that costs one standard deviation
+FEATURE_TOLERANCE = np.array([20.0, 15.0, 15.0, 3.0, 10.0, 0.5, 40.0])
+FEATURE_WEIGHTS = np.array([1.0, 1.0, 1.0, 1.0, 1.0, 1.5, 1.0])
+
+# crop: (lo, hi) per feature in FEATURES order
+CROP_RANGES = {
+    "Rice":         ((60, 99), (35, 60), (35, 45), (20, 27), (80, 85), (5.0, 7.9), (180, 300)),
+    "Maize":        ((60, 100), (35, 60), (15, 25), (18, 27), (55, 75), (5.5, 7.0), (60, 110)),
+    "Chickpea":     ((20, 60), (55, 80), (75, 85), (17, 21), (14, 20), (6.0, 8.9), (65, 95)),
+    "Kidney Beans": ((0, 40), (55, 80), (15, 25), (15, 25), (18, 25), (5.5, 6.0), (60, 150)),
+    "Pigeon Peas":  ((0, 40), (55, 80), (15, 25), (18, 37), (30, 70), (4.5, 7.5), (90, 200)),
+    "Moth Beans":   ((0, 40), (35, 60), (15, 25), (24, 32), (40, 65), (3.5, 9.9), (30, 75)),
+    "Mung Bean":    ((0, 40), (35, 60), (15, 25), (27, 30), (80, 90), (6.2, 7.2), (36, 60)),
+    "Black Gram":   ((20, 60), (55, 80), (15, 25), (25, 35), (60, 70), (6.5, 7.8), (60, 75)),
+    "Lentil":       ((0, 40), (55, 80), (15, 25), (18, 30), (60, 70), (5.9, 6.9), (35, 55)),
+    "Pomegranate":  ((0, 40), (5, 30), (35, 45), (18, 25), (85, 95), (5.5, 7.2), (100, 115)),
+    "Banana":       ((80, 120), (70, 95), (45, 55), (25, 30), (75, 85), (5.5, 6.5), (90, 120)),
+    "Mango":        ((0, 40), (15, 40), (25, 35), (27, 36), (45, 55), (4.5, 7.0), (90, 100)),
+    "Grapes":       ((0, 40), (120, 145), (195, 205), (8, 42), (80, 84), (5.5, 6.5), (65, 75)),
+    "Watermelon":   ((80, 120), (5, 30), (45, 55), (24, 27), (80, 90), (6.0, 7.0), (40, 60)),
+    "Muskmelon":    ((80, 120), (5, 30), (45, 55), (27, 30), (90, 95), (6.0, 6.8), (20, 30)),
+    "Apple":        ((0, 40), (120, 145), (195, 205), (21, 24), (90, 95), (5.5, 6.5), (100, 125)),
+    "Orange":       ((0, 40), (5, 30), (5, 15), (10, 35), (90, 95), (6.0, 8.0), (100, 120)),
+    "Papaya":       ((31, 70), (46, 70), (45, 55), (23, 44), (90, 95), (6.5, 7.0), (40, 250)),
+    "Coconut":      ((0, 40), (5, 30), (25, 35), (25, 30), (90, 100), (5.5, 6.5), (130, 225)),
+    "Cotton":       ((100, 140), (35, 60), (15, 25), (22, 26), (75, 85), (5.8, 8.0), (60, 100)),
+    "Jute":         ((60, 100), (35, 60), (35, 45), (23, 27), (70, 90), (6.0, 7.5), (150, 200)),
+    "Coffee":       ((80, 120), (15, 40), (25, 35), (23, 28), (50, 70), (6.0, 7.5), (115, 200)),
+    "Ragi":         ((40, 70), (20, 40), (20, 40), (20, 30), (50, 70), (5.0, 8.2), (50, 100)),
+    "Sugarcane":    ((100, 150), (40, 70), (40, 80), (20, 35), (65, 85), (6.0, 8.0), (150, 250)),
+    "Groundnut":    ((15, 30), (40, 60), (30, 50), (22, 30), (50, 70), (6.0, 7.5), (50, 100)),
+    "Jowar":        ((70, 110), (30, 50), (30, 50), (25, 32), (40, 60), (6.0, 7.5), (40, 100)),
+}
+
+CROPS = list(CROP_RANGES)
+_RANGES = np.array([CROP_RANGES[crop] for crop in CROPS], dtype=np.float64)  # (crops, features, 2)
+LOWER, UPPER = _RANGES[..., 0], _RANGES[..., 1]
+_WEIGHT_SUM = FEATURE_WEIGHTS.sum()
+
+_reason_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="crop-reason")
+
+
+def feature_vector(n, p, k, temp, humidity, ph, rainfall):
+    return np.array([n, p, k, temp, humidity, ph, rainfall], dtype=np.float64)
+
+
+def _deviations(x):
+    """Signed distance outside each crop's range in tolerance units (negative = too low), shape (crops, features)."""
+    return (np.minimum(x - LOWER, 0) + np.maximum(x - UPPER, 0)) / FEATURE_TOLERANCE
+
+
+def score_all(x):
+    """Suitability in [0, 1] for every crop in CROPS order."""
+    d = _deviations(x)
+    return np.exp(-0.5 * (d * d) @ FEATURE_WEIGHTS / _WEIGHT_SUM)
+
+
+def rank_crops(x, top=None):
+    """[(crop, score)] best first; all crops unless `top` is given."""
+    scores = score_all(x)
+    order = np.argsort(-scores, kind="stable")
+    if top is not None:
+        order = order[:top]
+    return [(CROPS[i], float(scores[i])) for i in order]
+
+
+def explain(crop, x, limit=2, translate=None):
+    """Short local reason: features in range, and the worst-fitting ones with their direction.
+
+    `translate(text) -> text` is applied to each fixed phrase, never to the assembled sentence.
+    """
+    translate = translate or (lambda text: text)
+    d = _deviations(x)[CROPS.index(crop)]
+    good = [translate(FEATURE_NAMES[f]) for f, dev in zip(FEATURES, d) if dev == 0]
+    worst = [i for i in np.argsort(-np.abs(d))[:limit] if d[i] != 0]
+    issues = [f"{translate(FEATURE_NAMES[FEATURES[i]])} {translate('low') if d[i] < 0 else translate('high')}" for i in worst]
+    if not issues:
+        return translate("All factors in the ideal range")
+    if not good:
+        return f"{translate('Closest available match')}; {', '.join(issues)}"
+    return f"{translate('Ideal')} {', '.join(good)}; {', '.join(issues)}"
+
+
+def _llm_reasons(client, crops, x, location, lang):
+    soil = ", ".join(f"{FEATURE_NAMES[f]}={v:g}" for f, v in zip(FEATURES, x))
+    prompt = (
+        f"Soil and weather: {soil}. Location: {location}. For each crop below write one short reason "
+        f"(max 15 words) why it suits these conditions. Format exactly:\n"
+        + "\n".join(f"{crop} - [reason]" for crop in crops)
+    )
+    if lang == "Kannada":
+        prompt += " Write the reasons in Kannada, keep the crop names in English."
+    chat = client.chat.completions.create(
+        messages=[{"role": "user", "content": prompt}],
+        model="llama-3.3-70b-versatile",
+        temperature=0.3,
+        max_tokens=200,
+    )
+    reasons = {}
+    for line in chat.choices[0].message.content.split("\n"):
+        name, sep, reason = line.strip().lstrip("1234567890.-*• ").partition(" - ")
+        if sep and name.strip() in crops:
+            reasons[name.strip()] = reason.strip()
+    return reasons
+
+
+def explain_async(client, crops, x, location, lang):
+    """Future of {crop: reason} written by the LLM; the ranking itself never waits for it."""
+    return _reason_pool.submit(_llm_reasons, client, list(crops), x, location, lang)
@@ -0,0 +1,241 @@
+# disease_model.py
+"""
+Paddy disease model helpers shared by the Disease Detector page and offline tools.
+
+Nothing here imports Streamlit, so the same validation, preprocessing and
+prediction code runs in scripts and benchmarks.
+"""
+import io
+import os
+from collections import Counter
+
+import numpy as np
+import cv2
+from PIL import Image, ImageOps
+
+MODEL_PATH = os.getenv("DISEASE_MODEL_PATH", "FinalTest_inceptionv3.h5")
+IMG_SIZE = (224, 224)
+BATCH_SIZE = int(os.getenv("DISEASE_BATCH_SIZE", 16))
+DISEASE_BACKEND = os.getenv("DISEASE_BACKEND", "keras")  # keras | tflite | remote
+
+class_labels = {0: "Brown Spot", 1: "Healthy Plant", 2: "Leaf Blast", 3: "Sheath Blight"}
+
+
+def load_keras_model(model_path=MODEL_PATH):
+    """Loads the two-headed (class + severity) InceptionV3 model, or returns None if missing."""
+    if not os.path.exists(model_path):
+        return None
+    import tensorflow as tf
+    custom_objects = {"mse": tf.keras.losses.MeanSquaredError()}
+    return tf.keras.models.load_model(model_path, custom_objects=custom_objects)
+
+
+def import_backend(backend=DISEASE_BACKEND):
+    """Imports the runtime `backend` loads with: TensorFlow, a TFLite interpreter, or the HTTP client."""
+    if backend == "tflite":
+        from disease_tflite import _interpreter_class
+        _interpreter_class()
+    elif backend == "remote":
+        import inference_server  # noqa: F401
+    else:
+        import tensorflow  # noqa: F401
+
+
+def load_disease_model(backend=DISEASE_BACKEND, model_path=MODEL_PATH):
+    """Loads the model for the selected inference backend; None if it cannot be loaded."""
+    if backend == "tflite":
+        from disease_tflite import load_tflite_model
+        return load_tflite_model(lambda: load_keras_model(model_path))
+    if backend == "remote":
+        from inference_server import load_remote_model
+        return load_remote_model()
+    return load_keras_model(model_path)
+
+
+# ========================================
+# IMAGE INGESTION
+# ========================================
+
+# Largest side kept after decoding: enough for validation (256), the model (224) and the preview
+INGEST_MAX_SIDE = int(os.getenv("INGEST_MAX_SIDE", 512))
+PREVIEW_MAX_SIDE = int(os.getenv("PREVIEW_MAX_SIDE", 400))
+
+
+def load_image(source, max_side=INGEST_MAX_SIDE):
+    """
+    Decodes an upload (bytes or file object) straight to a bounded RGB image.
+    JPEGs use draft mode, so libjpeg decodes at 1/2, 1/4 or 1/8 scale and the
+    full-resolution bitmap is never built. EXIF orientation is applied.
+    """
+    img = Image.open(io.BytesIO(source) if isinstance(source, bytes) else source)
+    img.draft("RGB", (max_side, max_side))
+    img = ImageOps.exif_transpose(img)
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    img.thumbnail((max_side, max_side), Image.BILINEAR)
+    return img
+
+
+def preview_jpeg(img, max_side=PREVIEW_MAX_SIDE, quality=80):
+    """Small JPEG for on-page display, instead of sending the original upload to the browser."""
+    preview = img.copy()
+    preview.thumbnail((max_side, max_side), Image.BILINEAR)
+    buffer = io.BytesIO()
+    preview.save(buffer, "JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+# ========================================
+# CROP VALIDATION FUNCTION
+# ========================================
+
+VALIDATION_MAX_SIDE = int(os.getenv("VALIDATION_MAX_SIDE", 256))
+
+# One bit per HSV range test; a pixel's bits are looked up per channel and ANDed
+_PLANT, _GRAY, _SKIN, _BRIGHT, _DARK = 1, 2, 4, 8, 16
+
+
+def _range_lut(ranges, size=256):
+    """uint8 lookup table: for each channel value, the OR of bits whose [lo, hi] range holds it."""
+    lut = np.zeros(size, dtype=np.uint8)
+    for bit, lo, hi in ranges:
+        lut[lo:hi + 1] |= bit
+    return lut
+
+
+_ALL_BITS = _PLANT | _GRAY | _SKIN | _BRIGHT | _DARK
+_H_LUT = _range_lut([
+    (_PLANT, 8, 95),       # green 20-95 or yellow 8-40 (same S/V bounds)
+    (_GRAY, 0, 180),
+    (_SKIN, 0, 25),
+    (_BRIGHT | _DARK, 0, 255),
+])
+_S_LUT = _range_lut([
+    (_PLANT, 15, 255),
+    (_GRAY, 0, 60),
+    (_SKIN, 15, 180),
+    (_BRIGHT | _DARK, 0, 255),
+])
+_V_LUT = _range_lut([
+    (_PLANT, 15, 255),
+    (_GRAY, 30, 230),
+    (_SKIN, 60, 255),
+    (_BRIGHT, 236, 255),   # brightness > 235
+    (_DARK, 0, 24),        # brightness < 25
+])
+
+
+def _thumbnail(img, max_side=VALIDATION_MAX_SIDE):
+    """Nearest-neighbour downscale: samples real pixels, so color ratios stay unbiased."""
+    w, h = img.size
+    scale = max_side / max(w, h)
+    if scale >= 1:
+        return img
+    return img.resize((max(1, round(w * scale)), max(1, round(h * scale))), Image.NEAREST)
+
+
+def color_ratios(img, max_side=VALIDATION_MAX_SIDE):
+    """Fraction of plant/gray/skin/very-bright/very-dark pixels, from one fused pass over a thumbnail."""
+    img_hsv = cv2.cvtColor(np.asarray(_thumbnail(img, max_side).convert("RGB")), cv2.COLOR_RGB2HSV)
+    bits = _H_LUT[img_hsv[..., 0]] & _S_LUT[img_hsv[..., 1]] & _V_LUT[img_hsv[..., 2]]
+    counts = np.bincount(bits.ravel(), minlength=_ALL_BITS + 1)
+    total = bits.size
+    codes = np.arange(_ALL_BITS + 1)
+    return {
+        name: counts[(codes & bit) != 0].sum() / total
+        for name, bit in (("plant", _PLANT), ("gray", _GRAY), ("skin", _SKIN), ("bright", _BRIGHT), ("dark", _DARK))
+    }
+
+
+def is_crop_image(img):
+    """
+    Simple check: Is this a crop/plant image or something else?
+    Returns: True if crop/plant, False if not
+    """
+    ratios = color_ratios(img)
+
+    # Check 1: At least 8% of the image should be plant-colored (green, yellow, brown)
+    if ratios["plant"] < 0.08:
+        return False
+
+    # Check 2: Is it too metallic/gray? (bikes, cars, buildings)
+    if ratios["gray"] > 0.40:
+        return False
+
+    # Check 3: Is it a person? (skin tone detection)
+    if ratios["skin"] > 0.12:
+        return False
+
+    # Check 4: Is it too bright? (paper, walls, sky)
+    if ratios["bright"] > 0.45:
+        return False
+
+    # Check 5: Is it too dark? (night photos, black objects)
+    if ratios["dark"] > 0.55:
+        return False
+
+    return True
+
+# ========================================
+# END OF VALIDATION FUNCTION
+# ========================================
+
+
+def to_model_batch(imgs):
+    """Stacks images into one (N, 224, 224, 3) float32 array scaled to [0, 1], without float64 temporaries."""
+    batch = np.empty((len(imgs), *IMG_SIZE, 3), dtype=np.float32)
+    for i, img in enumerate(imgs):
+        batch[i] = np.asarray(img.resize(IMG_SIZE))
+    batch *= np.float32(1 / 255)
+    return batch
+
+
+def preprocess_image(img):
+    return to_model_batch([img])
+
+
+def decode_prediction(class_probs, severity):
+    """Maps one row of model output to (disease, severity on the 0-9 scale)."""
+    disease = class_labels.get(int(np.argmax(class_probs)), "Unknown")
+    scale = float(np.ravel(severity)[0])
+    if disease == "Healthy Plant":
+        scale = 0.0
+    return disease, round(scale, 2)
+
+
+def predict_image(model, img):
+    # predict_on_batch shares the traced function warmed by warm_up() and skips predict()'s per-call setup
+    class_probs, severity = model.predict_on_batch(preprocess_image(img))
+    return decode_prediction(class_probs[0], severity[0])
+
+
+def predict_batch(model, imgs, batch_size=BATCH_SIZE):
+    """Classifies many PIL images with one forward pass per `batch_size` chunk."""
+    results = []
+    for start in range(0, len(imgs), batch_size):
+        chunk = imgs[start:start + batch_size]
+        class_probs, severity = model.predict_on_batch(to_model_batch(chunk))
+        results.extend(decode_prediction(class_probs[i], severity[i]) for i in range(len(chunk)))
+    return results
+
+
+def warm_up(model):
+    """One dummy 224x224 forward pass, so graph tracing happens before the first real scan."""
+    model.predict_on_batch(np.zeros((1, *IMG_SIZE, 3), dtype=np.float32))
+
+
+def summarize_plot(results):
+    """Plot-level summary from per-image (disease, severity) results."""
+    if not results:
+        return {"images": 0, "infected": 0, "infected_pct": 0.0, "main_disease": None, "mean_severity": 0.0, "counts": {}}
+    counts = Counter(disease for disease, _ in results)
+    infected = [(d, s) for d, s in results if d not in ("Healthy Plant", "Unknown")]
+    main_disease = Counter(d for d, _ in infected).most_common(1)[0][0] if infected else "Healthy Plant"
+    return {
+        "images": len(results),
+        "infected": len(infected),
+        "infected_pct": round(100.0 * len(infected) / len(results), 1),
+        "main_disease": main_disease,
+        "mean_severity": round(float(np.mean([s for _, s in infected])), 2) if infected else 0.0,
+        "counts": dict(counts),
+    }
@@ -0,0 +1,129 @@
+# disease_tflite.py
+"""
+TFLite inference backend for the two-headed paddy disease model.
+
+The Keras .h5 model is converted once (dynamic-range or int8 quantization)
+and run with the TFLite interpreter. The builtin op resolver applies the
+XNNPACK delegate on CPU. TFLiteDiseaseModel mimics the two Keras calls
+used in disease_model (`predict` and `predict_on_batch`), so the same
+predict_image / predict_batch code runs on either backend.
+"""
+import os
+import threading
+
+import numpy as np
+
+from disease_model import IMG_SIZE, class_labels
+
+TFLITE_MODEL_PATH = os.getenv("TFLITE_MODEL_PATH", "FinalTest_inceptionv3.tflite")
+TFLITE_QUANTIZATION = os.getenv("TFLITE_QUANTIZATION", "dynamic")  # none | dynamic | int8
+
+
+def available_cpus():
+    """CPUs this process may run on (cpu_count() ignores affinity/cgroup pinning)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+# More threads than usable CPUs makes XNNPACK's spinning thread pool much slower
+TFLITE_THREADS = int(os.getenv("TFLITE_THREADS", available_cpus()))
+
+
+def convert_to_tflite(keras_model, out_path=TFLITE_MODEL_PATH, quantization=TFLITE_QUANTIZATION, calibration_images=None):
+    """Converts `keras_model` to a .tflite file and returns its path.
+
+    int8 quantizes weights and activations (inputs/outputs stay float32) and
+    needs `calibration_images`, an iterable of HxWx3 float32 arrays in [0, 1].
+    """
+    import tempfile
+    import tensorflow as tf
+    # Go through a SavedModel: from_keras_model trips over Keras 3 BatchNorm variables
+    with tempfile.TemporaryDirectory() as saved_model_dir:
+        if hasattr(keras_model, "export"):
+            keras_model.export(saved_model_dir)
+        else:
+            tf.saved_model.save(keras_model, saved_model_dir)
+        converter = tf.lite.TFLiteConverter.from_saved_model(saved_model_dir)
+        _configure_quantization(converter, quantization, calibration_images)
+        tflite_bytes = converter.convert()
+
+    with open(out_path, "wb") as f:
+        f.write(tflite_bytes)
+    return out_path
+
+
+def _configure_quantization(converter, quantization, calibration_images):
+    import tensorflow as tf
+    if quantization in ("dynamic", "int8"):
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if quantization == "int8":
+        if calibration_images is None:
+            raise ValueError("int8 quantization needs calibration images")
+
+        def representative_dataset():
+            for arr in calibration_images:
+                yield [np.expand_dims(arr.astype(np.float32), 0)]
+
+        converter.representative_dataset = representative_dataset
+    elif quantization not in ("none", "dynamic"):
+        raise ValueError(f"Unknown quantization '{quantization}'")
+
+
+def _interpreter_class():
+    """Prefers the standalone LiteRT/tflite-runtime wheels, which avoid importing all of TensorFlow."""
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+
+class TFLiteDiseaseModel:
+    def __init__(self, model_path=TFLITE_MODEL_PATH, num_threads=TFLITE_THREADS):
+        self.interpreter = _interpreter_class()(model_path=model_path, num_threads=num_threads)
+        self._input_index = self.interpreter.get_input_details()[0]["index"]
+        # Outputs are not ordered reliably; tell the heads apart by width
+        outputs = self.interpreter.get_output_details()
+        self._class_index = next(o["index"] for o in outputs if o["shape"][-1] == len(class_labels))
+        self._severity_index = next(o["index"] for o in outputs if o["shape"][-1] == 1)
+        self._batch_size = None
+        self._lock = threading.Lock()  # an interpreter is not thread-safe
+
+    def _resize(self, batch_size):
+        if batch_size != self._batch_size:
+            self.interpreter.resize_tensor_input(self._input_index, [batch_size, *IMG_SIZE, 3])
+            self.interpreter.allocate_tensors()
+            self._batch_size = batch_size
+
+    def predict_on_batch(self, batch):
+        batch = np.asarray(batch, dtype=np.float32)
+        with self._lock:
+            self._resize(len(batch))
+            self.interpreter.set_tensor(self._input_index, batch)
+            self.interpreter.invoke()
+            return [
+                self.interpreter.get_tensor(self._class_index).copy(),
+                self.interpreter.get_tensor(self._severity_index).copy(),
+            ]
+
+    def predict(self, batch, verbose=0):
+        return self.predict_on_batch(batch)
+
+
+def load_tflite_model(keras_loader, model_path=TFLITE_MODEL_PATH, quantization=TFLITE_QUANTIZATION, num_threads=TFLITE_THREADS):
+    """Returns a TFLiteDiseaseModel, converting from `keras_loader()` once if the file is missing."""
+    if not os.path.exists(model_path):
+        if quantization == "int8":
+            # int8 needs calibration data: build it offline with convert_model.py
+            return None
+        keras_model = keras_loader()
+        if keras_model is None:
+            return None
+        convert_to_tflite(keras_model, model_path, quantization)
+    return TFLiteDiseaseModel(model_path, num_threads)
@@ -0,0 +1,87 @@
+# disk_cache.py
+"""
+File helpers shared by the on-disk caches (TTS audio, guides, maps, i18n, treatments).
+
+atomic_write() writes to a temp file created with tempfile.mkstemp next to
+the target and renames it into place. Readers never see a partial file, and
+writers in other threads or processes (several Streamlit replicas on one
+volume) never share a temp name.
+
+DiskLRU keeps one file per key under a directory, sharded by the first two
+characters of the key. Eviction is least-recently-used first by entry count,
+total size, or both; file mtime is the LRU clock and is refreshed on every
+read.
+"""
+import os
+import tempfile
+import threading
+
+TMP_SUFFIX = ".tmp"
+
+
+def atomic_write(path, data):
+    """Writes `data` (str as UTF-8, or bytes) to `path` through a unique temp file and os.replace."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f"{os.path.basename(path)}.", suffix=TMP_SUFFIX)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data.encode("utf-8") if isinstance(data, str) else data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class DiskLRU:
+    def __init__(self, directory, suffix, max_entries=None, max_bytes=None):
+        self.directory = directory
+        self.suffix = suffix
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._evict_lock = threading.Lock()
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}{self.suffix}")
+
+    def read(self, key):
+        """Bytes stored under `key`, or None; marks the entry as recently used."""
+        path = self.path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+            return data
+        except OSError:
+            return None
+
+    def write(self, key, data):
+        atomic_write(self.path(key), data)
+        with self._evict_lock:
+            self.evict()
+
+    def evict(self):
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith(TMP_SUFFIX):
+                    continue  # another writer's file in flight
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        count, total = len(files), sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if (self.max_entries is None or count <= self.max_entries) and (self.max_bytes is None or total <= self.max_bytes):
+                break
+            try:
+                os.remove(path)
+                count -= 1
+                total -= size
+            except OSError:
+                pass
@@ -0,0 +1,274 @@
+# guide_cache.py
+"""
+Persistent cache of generated crop guides (and other long LLM texts).
+
+Entries are keyed by their inputs (crop, state, district, month, lang) and
+stored one JSON file each under GUIDE_CACHE_DIR, behind an in-memory copy, so
+they survive restarts and are shared by every session. A fresh entry is
+returned as is. For GUIDE_CACHE_MAX_STALE_HOURS past the TTL, the stale entry
+is still returned (stale-while-revalidate) while one background refresh per
+key regenerates it. Anything older counts as a miss and is generated inline.
+The disk store keeps at most GUIDE_CACHE_MAX_ENTRIES files, dropping the
+least recently used (file mtime) first. Only one generation per key runs at
+a time; a lookup that misses while one is in flight waits for it.
+
+Prefetcher warms guides and market outlooks for freshly recommended crops
+on a shared bounded pool, at most GUIDE_PREFETCH_PER_USER jobs per user at
+once. Starting a new prefetch for a user cancels their queued jobs.
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import streamlit as st
+
+from disk_cache import DiskLRU
+
+GUIDE_CACHE_DIR = os.getenv("GUIDE_CACHE_DIR", os.path.join(".cache", "guides"))
+GUIDE_CACHE_TTL_HOURS = float(os.getenv("GUIDE_CACHE_TTL_HOURS", 24 * 7))
+GUIDE_CACHE_MAX_STALE_HOURS = float(os.getenv("GUIDE_CACHE_MAX_STALE_HOURS", 24 * 60))
+GUIDE_CACHE_MAX_ENTRIES = int(os.getenv("GUIDE_CACHE_MAX_ENTRIES", 2000))
+GUIDE_CACHE_MEMORY_ENTRIES = int(os.getenv("GUIDE_CACHE_MEMORY_ENTRIES", 200))
+MARKET_CACHE_DIR = os.getenv("MARKET_CACHE_DIR", os.path.join(".cache", "market"))
+MARKET_CACHE_TTL_HOURS = float(os.getenv("MARKET_CACHE_TTL_HOURS", 6))
+MARKET_CACHE_MAX_STALE_HOURS = float(os.getenv("MARKET_CACHE_MAX_STALE_HOURS", 18))
+GUIDE_PREFETCH_WORKERS = int(os.getenv("GUIDE_PREFETCH_WORKERS", 4))
+GUIDE_PREFETCH_PER_USER = int(os.getenv("GUIDE_PREFETCH_PER_USER", 2))
+
+_refresh_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="guide-refresh")
+
+
+def cache_key(*parts):
+    return hashlib.sha256("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+
+
+class GuideCache:
+    def __init__(self, directory=GUIDE_CACHE_DIR, ttl_hours=GUIDE_CACHE_TTL_HOURS,
+                 max_stale_hours=GUIDE_CACHE_MAX_STALE_HOURS, max_entries=GUIDE_CACHE_MAX_ENTRIES,
+                 memory_entries=GUIDE_CACHE_MEMORY_ENTRIES):
+        self._disk = DiskLRU(directory, ".json", max_entries=max_entries)
+        self.ttl = ttl_hours * 3600
+        self.max_stale = max_stale_hours * 3600
+        self.memory_entries = memory_entries
+        self._memory = OrderedDict()   # key -> {"text", "created"}, most recently used last
+        self._inflight = {}   # key -> Future of the generation running for it
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.joined = 0
+        self.refreshes = 0
+        self.prefetched = 0
+        self.errors = 0
+
+    # -----------------
+    # Disk Store
+    # -----------------
+    def _read(self, key):
+        data = self._disk.read(key)
+        try:
+            return json.loads(data) if data is not None else None
+        except ValueError:
+            return None
+
+    def _write(self, key, entry):
+        self._disk.write(key, json.dumps(entry, ensure_ascii=False))
+
+    # -----------------
+    # Memory Tier
+    # -----------------
+    def _remember(self, key, entry):
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                return entry
+        entry = self._read(key)
+        if entry is not None:
+            self._remember(key, entry)
+        return entry
+
+    # -----------------
+    # Public API
+    # -----------------
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def put(self, key, text):
+        entry = {"text": text, "created": time.time()}
+        self._remember(key, entry)
+        try:
+            self._write(key, entry)
+        except OSError as e:
+            print(f"Guide cache write failed: {e}")
+
+    def _is_fresh(self, entry):
+        return entry is not None and time.time() - entry["created"] <= self.ttl
+
+    def _generate(self, key, generate):
+        """Runs `generate` and stores the result, or waits for the generation already running for `key`."""
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+        if not owner:
+            self._count("joined")
+            return future.result()
+        try:
+            text = generate()
+            if text:
+                self.put(key, text)
+            future.set_result(text)
+            return text
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    def _refresh(self, key, generate):
+        try:
+            self._generate(key, generate)
+            self._count("refreshes")
+        except Exception as e:
+            self._count("errors")
+            print(f"Guide refresh failed: {e}")
+
+    def refresh_async(self, key, generate):
+        """Regenerates `key` in the background unless a generation for it is already running."""
+        with self._lock:
+            if key in self._inflight:
+                return
+        _refresh_pool.submit(self._refresh, key, generate)
+
+    def warm(self, key, generate):
+        """Generates `key` unless a fresh entry exists; does not count as a lookup."""
+        if self._is_fresh(self._lookup(key)):
+            return
+        self._generate(key, generate)
+        self._count("prefetched")
+
+    def is_ready(self, key):
+        return self._is_fresh(self._lookup(key))
+
+    def peek(self, key):
+        """Cached text regardless of age (None if absent); does not touch the counters."""
+        entry = self._lookup(key)
+        return entry["text"] if entry else None
+
+    def get(self, key, generate):
+        """Text for `key`: cached (refreshed in the background once stale), else `generate()`.
+
+        Exceptions from `generate` on a miss propagate and nothing is cached.
+        """
+        entry = self._lookup(key)
+        age = time.time() - entry["created"] if entry else None
+        if entry is not None and age <= self.ttl:
+            self._count("hits")
+            return entry["text"]
+        if entry is not None and age <= self.ttl + self.max_stale:
+            self._count("stale_hits")
+            self.refresh_async(key, generate)
+            return entry["text"]
+        self._count("misses")
+        try:
+            return self._generate(key, generate)
+        except Exception:
+            self._count("errors")
+            raise
+
+    def stats(self):
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.stale_hits) / lookups, 3) if lookups else 0.0,
+            "joined": self.joined,
+            "refreshes": self.refreshes,
+            "prefetched": self.prefetched,
+            "errors": self.errors,
+            "memory_entries": len(self._memory),
+        }
+
+
+class Prefetcher:
+    """Warms cache entries in the background with a per-user concurrency limit."""
+
+    def __init__(self, workers=GUIDE_PREFETCH_WORKERS, per_user=GUIDE_PREFETCH_PER_USER):
+        self.per_user = per_user
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="guide-prefetch")
+        self._users = {}   # user -> {"generation", "queue", "running"}
+        self._lock = threading.Lock()
+
+    def start(self, user, jobs):
+        """Replaces `user`'s prefetch with `jobs` ([(cache, key, generate)]); returns the generation."""
+        with self._lock:
+            state = self._users.setdefault(user, {"generation": 0, "queue": deque(), "running": 0})
+            state["generation"] += 1
+            state["queue"] = deque(jobs)
+            self._launch(user, state)
+            return state["generation"]
+
+    def cancel(self, user):
+        """Drops `user`'s queued jobs; jobs already talking to the LLM finish and are cached."""
+        with self._lock:
+            state = self._users.get(user)
+            if state:
+                state["generation"] += 1
+                state["queue"].clear()
+
+    def pending(self, user):
+        with self._lock:
+            state = self._users.get(user)
+            return len(state["queue"]) + state["running"] if state else 0
+
+    def _launch(self, user, state):
+        # Caller holds self._lock
+        while state["queue"] and state["running"] < self.per_user:
+            cache, key, generate = state["queue"].popleft()
+            state["running"] += 1
+            self._pool.submit(self._run, user, state["generation"], cache, key, generate)
+
+    def _run(self, user, generation, cache, key, generate):
+        try:
+            if self._users[user]["generation"] == generation:
+                cache.warm(key, generate)
+        except Exception as e:
+            print(f"Prefetch failed: {e}")
+        finally:
+            with self._lock:
+                state = self._users[user]
+                state["running"] -= 1
+                self._launch(user, state)
+
+
+@st.cache_resource
+def get_guide_cache():
+    """The guide cache shared by every Streamlit session in this process."""
+    return GuideCache()
+
+
+@st.cache_resource
+def get_market_cache():
+    """Market outlooks: same store, shorter freshness window."""
+    return GuideCache(MARKET_CACHE_DIR, ttl_hours=MARKET_CACHE_TTL_HOURS, max_stale_hours=MARKET_CACHE_MAX_STALE_HOURS)
+
+
+@st.cache_resource
+def get_prefetcher():
+    return Prefetcher()
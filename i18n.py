@@ -0,0 +1,125 @@
+# i18n.py
+"""
+Kannada UI string catalog.
+
+`locales/catalog_kn.json` is produced by `python build_catalog.py`, which
+collects every literal `t("...")` in the app and batch-translates it once.
+It is loaded at import into a plain dict. Strings that are not in the
+catalog (bounded data such as policy titles, crop names or weather
+descriptions) are translated live once and remembered in a runtime cache
+of at most I18N_RUNTIME_MAX_ENTRIES strings, least recently used dropped
+first. New translations are appended to a JSON-lines file, which is
+compacted once it holds twice that many lines.
+
+A failed live translation is not cached as a translation: the English text
+is returned, and the string is retried after I18N_RETRY_SECONDS.
+"""
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+
+from disk_cache import atomic_write
+
+CATALOG_PATH = os.getenv("I18N_CATALOG_PATH", os.path.join("locales", "catalog_kn.json"))
+RUNTIME_CACHE_PATH = os.getenv("I18N_RUNTIME_CACHE", os.path.join(".cache", "i18n_runtime_kn.jsonl"))
+I18N_RUNTIME_MAX_ENTRIES = int(os.getenv("I18N_RUNTIME_MAX_ENTRIES", 5000))
+I18N_RETRY_SECONDS = float(os.getenv("I18N_RETRY_SECONDS", 300))
+
+_lock = threading.Lock()
+
+
+def _load_json(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def load_catalog(path=CATALOG_PATH):
+    """Returns (version, strings) from a built catalog file, or (None, {})."""
+    data = _load_json(path)
+    return data.get("version"), dict(data.get("strings", {}))
+
+
+def load_runtime(path=RUNTIME_CACHE_PATH, max_entries=I18N_RUNTIME_MAX_ENTRIES):
+    """Returns (entries, lines) from the runtime log; later lines win, oldest entries beyond the bound are dropped."""
+    entries = OrderedDict()
+    lines = 0
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    source, translated = json.loads(line)
+                except (ValueError, TypeError):
+                    continue  # torn last line after a crash
+                entries.pop(source, None)
+                entries[source] = translated
+                lines += 1
+    except OSError:
+        pass
+    while len(entries) > max_entries:
+        entries.popitem(last=False)
+    return entries, lines
+
+
+CATALOG_VERSION, _catalog = load_catalog()
+_runtime, _log_lines = load_runtime()
+_failed = {}   # text -> monotonic time of the last failed live translation
+
+
+def _compact_runtime():
+    global _log_lines
+    atomic_write(RUNTIME_CACHE_PATH, "".join(
+        json.dumps([source, translated], ensure_ascii=False) + "\n" for source, translated in _runtime.items()
+    ))
+    _log_lines = len(_runtime)
+
+
+def _append_runtime(source, translated):
+    # Caller holds _lock
+    global _log_lines
+    os.makedirs(os.path.dirname(RUNTIME_CACHE_PATH) or ".", exist_ok=True)
+    with open(RUNTIME_CACHE_PATH, "a", encoding="utf-8") as f:
+        f.write(json.dumps([source, translated], ensure_ascii=False) + "\n")
+    _log_lines += 1
+    if _log_lines > 2 * I18N_RUNTIME_MAX_ENTRIES:
+        _compact_runtime()
+
+
+def translate_kannada(text, translate_fn):
+    """Catalog, runtime cache, then `translate_fn(text)`; None when no translation is available."""
+    hit = _catalog.get(text)
+    if hit is not None:
+        return hit
+    with _lock:
+        hit = _runtime.get(text)
+        if hit is not None:
+            _runtime.move_to_end(text)
+            return hit
+        failed_at = _failed.get(text)
+    if failed_at is not None and time.monotonic() - failed_at < I18N_RETRY_SECONDS:
+        return None
+    translated = translate_fn(text)
+    with _lock:
+        if not translated:
+            if len(_failed) >= I18N_RUNTIME_MAX_ENTRIES:
+                _failed.clear()
+            _failed[text] = time.monotonic()
+            return None
+        _failed.pop(text, None)
+        _runtime[text] = translated
+        while len(_runtime) > I18N_RUNTIME_MAX_ENTRIES:
+            _runtime.popitem(last=False)
+        try:
+            _append_runtime(text, translated)
+        except OSError as e:
+            print(f"i18n runtime cache write failed: {e}")
+    return translated
+
+
+def lookup_kannada(text, translate_fn):
+    """Kannada for `text`, or `text` itself when no translation is available."""
+    return translate_kannada(text, translate_fn) or text
@@ -0,0 +1,246 @@
+# inference_server.py
+"""
+Out-of-process disease inference with dynamic micro-batching.
+
+    python inference_server.py                # serves on INFERENCE_HOST:INFERENCE_PORT
+    DISEASE_BACKEND=remote streamlit run AgriBot.py
+
+One worker process owns the model, so Streamlit replicas do not each hold a
+copy. Concurrent requests queue per image. A single batching thread takes up
+to INFERENCE_MAX_BATCH images, waiting at most INFERENCE_MAX_WAIT_MS for
+more after the first arrives, and runs one forward pass. When more than
+INFERENCE_QUEUE_LIMIT images are pending, the server answers 503 instead of
+queueing without bound.
+
+Wire format: POST /predict with N raw 224x224x3 uint8 images back to back.
+The reply is JSON {"class_probs": [[...]], "severity": [[...]]}.
+GET /health reports readiness and batching stats.
+RemoteDiseaseModel is the client. It has the predict_on_batch call used by
+disease_model, so the page code is the same for every backend.
+"""
+import os
+import json
+import time
+import threading
+from concurrent.futures import Future
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import requests
+
+from disease_model import IMG_SIZE
+
+INFERENCE_HOST = os.getenv("INFERENCE_HOST", "127.0.0.1")
+INFERENCE_PORT = int(os.getenv("INFERENCE_PORT", 8765))
+INFERENCE_URL = os.getenv("INFERENCE_URL", f"http://{INFERENCE_HOST}:{INFERENCE_PORT}")
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "keras")  # model backend inside the server
+INFERENCE_MAX_BATCH = int(os.getenv("INFERENCE_MAX_BATCH", 16))
+INFERENCE_MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", 10))
+INFERENCE_QUEUE_LIMIT = int(os.getenv("INFERENCE_QUEUE_LIMIT", 64))
+INFERENCE_INTRA_THREADS = int(os.getenv("INFERENCE_INTRA_THREADS", 0))  # 0 = TensorFlow default
+INFERENCE_INTER_THREADS = int(os.getenv("INFERENCE_INTER_THREADS", 0))
+INFERENCE_TIMEOUT = float(os.getenv("INFERENCE_TIMEOUT", 30))
+
+IMAGE_BYTES = IMG_SIZE[0] * IMG_SIZE[1] * 3
+
+
+class InferenceError(RuntimeError):
+    """Raised by the client when the server is unreachable, overloaded or fails."""
+
+
+# -----------------
+# Micro-batching
+# -----------------
+class MicroBatcher:
+    def __init__(self, model, max_batch=INFERENCE_MAX_BATCH, max_wait_ms=INFERENCE_MAX_WAIT_MS,
+                 queue_limit=INFERENCE_QUEUE_LIMIT):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue_limit = queue_limit
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self.stats = {"requests": 0, "images": 0, "batches": 0, "rejected": 0}
+        threading.Thread(target=self._loop, name="micro-batcher", daemon=True).start()
+
+    def submit(self, images):
+        """Queues uint8 HxWx3 images; returns one Future per image, or None when over the queue limit."""
+        futures = [Future() for _ in images]
+        with self._cond:
+            if len(self._pending) + len(images) > self.queue_limit:
+                self.stats["rejected"] += 1
+                return None
+            self._pending.extend(zip(images, futures))
+            self.stats["requests"] += 1
+            self._cond.notify()
+        return futures
+
+    def _take_batch(self):
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+            # Hold the first image at most max_wait while the batch fills up
+            deadline = time.monotonic() + self.max_wait
+            while len(self._pending) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            return [self._pending.popleft() for _ in range(min(self.max_batch, len(self._pending)))]
+
+    def _loop(self):
+        while True:
+            items = self._take_batch()
+            batch = np.stack([img for img, _ in items]).astype(np.float32) / 255.0
+            try:
+                class_probs, severity = self.model.predict_on_batch(batch)
+                class_probs, severity = np.asarray(class_probs), np.asarray(severity)
+            except Exception as e:
+                for _, future in items:
+                    future.set_exception(e)
+                continue
+            self.stats["batches"] += 1
+            self.stats["images"] += len(items)
+            for i, (_, future) in enumerate(items):
+                future.set_result((class_probs[i], severity[i]))
+
+    def snapshot(self):
+        with self._cond:
+            stats = dict(self.stats, queued=len(self._pending))
+        stats["mean_batch"] = round(stats["images"] / stats["batches"], 2) if stats["batches"] else 0.0
+        return stats
+
+
+# -----------------
+# HTTP Server
+# -----------------
+class InferenceHandler(BaseHTTPRequestHandler):
+    batcher = None  # set by serve()
+
+    def _reply(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != "/health":
+            return self._reply(404, {"error": "not found"})
+        self._reply(200, {"status": "ready", **self.batcher.snapshot()})
+
+    def do_POST(self):
+        if self.path != "/predict":
+            return self._reply(404, {"error": "not found"})
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if not body or len(body) % IMAGE_BYTES:
+            return self._reply(400, {"error": f"body must be N x {IMAGE_BYTES} bytes"})
+        images = np.frombuffer(body, dtype=np.uint8).reshape(-1, *IMG_SIZE, 3)
+        futures = self.batcher.submit(list(images))
+        if futures is None:
+            return self._reply(503, {"error": "inference queue full"}, {"Retry-After": "1"})
+        try:
+            outputs = [future.result(timeout=INFERENCE_TIMEOUT) for future in futures]
+        except Exception as e:
+            return self._reply(500, {"error": str(e)})
+        self._reply(200, {
+            "class_probs": [probs.tolist() for probs, _ in outputs],
+            "severity": [sev.tolist() for _, sev in outputs],
+        })
+
+    def log_message(self, format, *args):
+        pass  # one line per scan is too noisy; /health has the counters
+
+
+def configure_threads(intra=INFERENCE_INTRA_THREADS, inter=INFERENCE_INTER_THREADS):
+    """Applies TensorFlow thread-pool sizes; must run before the first op executes."""
+    if not (intra or inter):
+        return
+    import tensorflow as tf
+    if intra:
+        tf.config.threading.set_intra_op_parallelism_threads(intra)
+    if inter:
+        tf.config.threading.set_inter_op_parallelism_threads(inter)
+
+
+def serve(host=INFERENCE_HOST, port=INFERENCE_PORT, backend=INFERENCE_BACKEND, **batcher_options):
+    from disease_model import MODEL_PATH, load_disease_model, warm_up
+    if backend == "keras":
+        configure_threads()
+    model = load_disease_model(backend)
+    if model is None:
+        raise SystemExit(f"Model file not found at {MODEL_PATH}")
+    # Trace the smallest and largest batch shapes up front so no request pays for it
+    warm_up(model)
+    batcher = MicroBatcher(model, **batcher_options)
+    model.predict_on_batch(np.zeros((batcher.max_batch, *IMG_SIZE, 3), dtype=np.float32))
+
+    InferenceHandler.batcher = batcher
+    server = ThreadingHTTPServer((host, port), InferenceHandler)
+    server.daemon_threads = True
+    print(f"Disease inference server ({backend}) on http://{host}:{port}")
+    server.serve_forever()
+
+
+# -----------------
+# Client
+# -----------------
+class RemoteDiseaseModel:
+    def __init__(self, url=INFERENCE_URL, timeout=INFERENCE_TIMEOUT):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self._session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=32)
+        self._session.mount("http://", adapter)
+
+    def health(self):
+        try:
+            return self._session.get(f"{self.url}/health", timeout=self.timeout).json()
+        except (requests.RequestException, ValueError) as e:
+            raise InferenceError(f"Inference server unreachable: {e}")
+
+    def predict_on_batch(self, batch):
+        # Inputs are uint8 pixels / 255, so rounding back to uint8 is lossless and 4x smaller on the wire
+        pixels = np.round(np.asarray(batch) * 255.0).astype(np.uint8)
+        try:
+            response = self._session.post(f"{self.url}/predict", data=pixels.tobytes(), timeout=self.timeout)
+        except requests.RequestException as e:
+            raise InferenceError(f"Inference server unreachable: {e}")
+        if response.status_code == 503:
+            raise InferenceError("Inference server is busy, please try again")
+        if response.status_code != 200:
+            raise InferenceError(f"Inference server error {response.status_code}: {response.text[:200]}")
+        data = response.json()
+        return [np.asarray(data["class_probs"], dtype=np.float32), np.asarray(data["severity"], dtype=np.float32)]
+
+    def predict(self, batch, verbose=0):
+        return self.predict_on_batch(batch)
+
+
+def load_remote_model(url=INFERENCE_URL):
+    """Client for a running server; None (like a missing model file) if it is not reachable."""
+    model = RemoteDiseaseModel(url)
+    try:
+        model.health()
+    except InferenceError as e:
+        print(e)
+        return None
+    return model
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Paddy disease inference server")
+    parser.add_argument("--host", default=INFERENCE_HOST)
+    parser.add_argument("--port", type=int, default=INFERENCE_PORT)
+    parser.add_argument("--backend", choices=["keras", "tflite"], default=INFERENCE_BACKEND)
+    parser.add_argument("--max-batch", type=int, default=INFERENCE_MAX_BATCH)
+    parser.add_argument("--max-wait-ms", type=float, default=INFERENCE_MAX_WAIT_MS)
+    parser.add_argument("--queue-limit", type=int, default=INFERENCE_QUEUE_LIMIT)
+    args = parser.parse_args()
+    serve(args.host, args.port, args.backend,
+          max_batch=args.max_batch, max_wait_ms=args.max_wait_ms, queue_limit=args.queue_limit)
@@ -0,0 +1,162 @@
+# llm_client.py
+import os
+import time
+import random
+import email.utils
+from contextlib import contextmanager
+
+import httpx
+import streamlit as st
+
+# -----------------
+# Transport Settings
+# -----------------
+API_TOTAL_TIMEOUT = float(os.getenv("API_TOTAL_TIMEOUT", 60))      # whole call, all retries
+API_ATTEMPT_TIMEOUT = float(os.getenv("API_ATTEMPT_TIMEOUT", 40))  # single attempt
+API_CONNECT_TIMEOUT = float(os.getenv("API_CONNECT_TIMEOUT", 5))
+API_BACKOFF_BASE = float(os.getenv("API_BACKOFF_BASE", 0.5))
+API_BACKOFF_CAP = float(os.getenv("API_BACKOFF_CAP", 8))
+API_POOL_SIZE = int(os.getenv("API_POOL_SIZE", 20))
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+try:
+    import h2  # noqa: F401  (optional, enables HTTP/2 in httpx)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class APIError(RuntimeError):
+    """Raised when a request fails for good (non-retryable status or budget spent)."""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+# -----------------
+# Shared Client
+# -----------------
+@st.cache_resource
+def get_http_client():
+    """One pooled keep-alive client shared by every Streamlit session in this process."""
+    limits = httpx.Limits(
+        max_connections=API_POOL_SIZE,
+        max_keepalive_connections=API_POOL_SIZE,
+        keepalive_expiry=60,
+    )
+    timeout = httpx.Timeout(API_ATTEMPT_TIMEOUT, connect=API_CONNECT_TIMEOUT)
+    return httpx.Client(http2=HTTP2_AVAILABLE, limits=limits, timeout=timeout)
+
+
+# -----------------
+# Backoff Helpers
+# -----------------
+def parse_retry_after(value):
+    """Parses a Retry-After header (delta-seconds or HTTP-date) into seconds, or None."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at is None:
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+def backoff_delay(attempt, retry_after=None):
+    """Full-jitter exponential backoff; a server-sent Retry-After takes precedence."""
+    if retry_after is not None:
+        return retry_after
+    return random.uniform(0, min(API_BACKOFF_CAP, API_BACKOFF_BASE * (2 ** (attempt - 1))))
+
+
+def _attempt_timeout(deadline):
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        return None
+    return httpx.Timeout(min(API_ATTEMPT_TIMEOUT, remaining), connect=min(API_CONNECT_TIMEOUT, remaining))
+
+
+def _sleep_or_give_up(attempt, max_retries, deadline, retry_after=None):
+    """Sleeps before the next attempt; returns False when no attempt fits the budget."""
+    if attempt >= max_retries:
+        return False
+    delay = backoff_delay(attempt, retry_after)
+    if time.monotonic() + delay >= deadline:
+        return False
+    time.sleep(delay)
+    return True
+
+
+# -----------------
+# Requests
+# -----------------
+def post_json(url, headers, payload, max_retries=2, total_timeout=API_TOTAL_TIMEOUT):
+    """POSTs `payload` and returns the decoded JSON body, retrying 429/5xx and network errors."""
+    client = get_http_client()
+    deadline = time.monotonic() + total_timeout
+    last_error = None
+    for attempt in range(1, max_retries + 1):
+        timeout = _attempt_timeout(deadline)
+        if timeout is None:
+            break
+        retry_after = None
+        try:
+            resp = client.post(url, headers=headers, json=payload, timeout=timeout)
+            if resp.status_code == 200:
+                return resp.json()
+            last_error = f"HTTP {resp.status_code}: {resp.text[:200]}"
+            if resp.status_code not in RETRYABLE_STATUS:
+                raise APIError(last_error, resp.status_code)
+            retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+        except httpx.HTTPError as e:
+            last_error = str(e) or type(e).__name__
+        if not _sleep_or_give_up(attempt, max_retries, deadline, retry_after):
+            break
+    raise APIError(f"API failed: {last_error}")
+
+
+@contextmanager
+def stream_lines(url, headers, payload, max_retries=2, total_timeout=API_TOTAL_TIMEOUT):
+    """Opens a streaming POST and yields an iterator of response lines.
+
+    Retries only happen before the first byte is read; once the stream is
+    open, errors propagate to the caller.
+    """
+    client = get_http_client()
+    deadline = time.monotonic() + total_timeout
+    last_error = None
+    for attempt in range(1, max_retries + 1):
+        timeout = _attempt_timeout(deadline)
+        if timeout is None:
+            break
+        retry_after = None
+        try:
+            request = client.build_request("POST", url, headers=headers, json=payload, timeout=timeout)
+            resp = client.send(request, stream=True)
+        except httpx.HTTPError as e:
+            last_error = str(e) or type(e).__name__
+        else:
+            if resp.status_code == 200:
+                try:
+                    yield resp.iter_lines()
+                finally:
+                    resp.close()
+                return
+            resp.read()
+            resp.close()
+            last_error = f"HTTP {resp.status_code}: {resp.text[:200]}"
+            if resp.status_code not in RETRYABLE_STATUS:
+                raise APIError(last_error, resp.status_code)
+            retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+        if not _sleep_or_give_up(attempt, max_retries, deadline, retry_after):
+            break
+    raise APIError(f"API stream failed: {last_error}")
@@ -0,0 +1,106 @@
+# model_warmup.py
+"""
+Background loading and warm-up of the paddy disease model.
+
+The backend import (TensorFlow, a TFLite interpreter or the HTTP client),
+model load and the first traced forward pass take many seconds. ModelWarmup
+does all three in a daemon thread, started from the main script as soon as
+the server handles its first request, so the Disease Detector page can show
+a "warming" state instead of blocking. The cold-start
+timings (and the first real scan) are kept for the page and printed to the
+server log.
+"""
+import os
+import time
+import threading
+
+import streamlit as st
+
+# disease_model (cv2, and TensorFlow via the loader) is imported in the thread,
+# so starting the warm-up from the chat page adds nothing to its load time
+DISEASE_WARMUP = os.getenv("DISEASE_WARMUP", "1") == "1"
+WARMUP_TIMEOUT = float(os.getenv("DISEASE_WARMUP_TIMEOUT", 180))
+
+WARMING, READY, FAILED = "warming", "ready", "failed"
+
+
+class ModelWarmup:
+    def __init__(self, loader=None):
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._thread = None
+        self.model = None
+        self.error = None
+        self.timings = {}
+
+    @property
+    def state(self):
+        if not self._done.is_set():
+            return WARMING
+        return READY if self.model is not None else FAILED
+
+    def start(self):
+        """Starts the warm-up thread once; later calls are no-ops."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="model-warmup", daemon=True)
+                self._thread.start()
+        return self
+
+    def retry(self):
+        """Starts a new attempt after a failed one (e.g. the inference server came up later)."""
+        with self._lock:
+            if self.state != FAILED:
+                return self
+            self._thread, self.error, self.timings = None, None, {}
+            self._done.clear()
+        return self.start()
+
+    def _run(self):
+        started = time.perf_counter()
+        try:
+            from disease_model import DISEASE_BACKEND, import_backend, load_disease_model, warm_up
+            start = time.perf_counter()
+            import_backend()  # timed on its own: for keras, usually the largest share
+            self.timings["import_s"] = round(time.perf_counter() - start, 2)
+
+            start = time.perf_counter()
+            model = (self._loader or load_disease_model)()
+            self.timings["load_s"] = round(time.perf_counter() - start, 2)
+            if model is None:
+                self.error = "Inference server unreachable" if DISEASE_BACKEND == "remote" else "Model file not found"
+                return
+
+            start = time.perf_counter()
+            warm_up(model)
+            self.timings["warmup_s"] = round(time.perf_counter() - start, 2)
+            self.model = model
+        except Exception as e:
+            self.error = str(e)
+        finally:
+            self.timings["total_s"] = round(time.perf_counter() - started, 2)
+            self._done.set()
+            print(f"Disease model {self.state}: {self.timings}{' - ' + self.error if self.error else ''}")
+
+    def wait(self, timeout=WARMUP_TIMEOUT):
+        """Starts the warm-up if needed and blocks until it finishes; returns the model or None."""
+        self.start()
+        self._done.wait(timeout)
+        return self.model
+
+    def record_scan(self, seconds, images=1):
+        """Keeps the latency of the first real scan served by this process."""
+        if "first_scan_s" not in self.timings:
+            self.timings["first_scan_s"] = round(seconds, 3)
+            self.timings["first_scan_images"] = images
+            print(f"Disease model first scan: {seconds:.3f}s for {images} image(s)")
+
+
+@st.cache_resource
+def get_model_warmup():
+    """The process-wide warm-up; starts loading in the background when DISEASE_WARMUP=1."""
+    warmup = ModelWarmup()
+    if DISEASE_WARMUP:
+        warmup.start()
+    return warmup
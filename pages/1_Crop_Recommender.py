@@ -1,20 +1,21 @@
 # pages/1_Crop_Recommender.py
 import streamlit as st
-import requests
 import os
 from groq import Groq
 from datetime import datetime
-import folium
 import streamlit.components.v1 as components
-from folium.plugins import MarkerCluster
 from dotenv import load_dotenv
 import io
 
 # --- Import all required functions ---
 from project_bot import render_project_bot 
+from crop_suitability import feature_vector, rank_crops, explain, explain_async
+from guide_cache import get_guide_cache, get_market_cache, get_prefetcher, cache_key
+from weather import get_weather_service
+from crop_map import get_map, CROP_MAP_HEIGHT
 from utils import (
-    apply_custom_css, t, get_kannada_audio_bytes,
-    check_login, render_sidebar
+    apply_custom_css, t, translate_or_none, get_kannada_audio_bytes,
+    check_login, render_sidebar, render_weather_header
 )
 
 # -----------------------------
@@ -34,9 +35,13 @@ user_id = st.session_state.user_id
 user_token = st.session_state.user['idToken']
 
 load_dotenv()
-OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY")
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 client = Groq(api_key=GROQ_API_KEY) if GROQ_API_KEY else None
+# Ask the LLM to reword the local reasons in the background (0 = local reasons only)
+CROP_LLM_REASONS = os.getenv("CROP_LLM_REASONS", "1") == "1"
+guide_cache = get_guide_cache()
+market_cache = get_market_cache()
+prefetcher = get_prefetcher()
 
 # ----------------- Load/Save User Data -----------------
 def load_user_data():
@@ -72,56 +77,76 @@ if "user_data" not in st.session_state:
 # ----------------- Session State (Page Specific) -----------------
 if "selected_crop" not in st.session_state: st.session_state.selected_crop = None
 if "crops" not in st.session_state: st.session_state.crops = None
+if "crop_scores" not in st.session_state: st.session_state.crop_scores = None
+if "crop_reason_future" not in st.session_state: st.session_state.crop_reason_future = None
 if "lat" not in st.session_state: st.session_state.lat = 12.9716
 if "lon" not in st.session_state: st.session_state.lon = 77.5946
 if "market_prediction" not in st.session_state: st.session_state.market_prediction = None
 # Removed: if "stress_test_result" not in st.session_state: st.session_state.stress_test_result = None
 
-@st.cache_data(ttl=300)
-def get_weather(lat, lon):
-    if not OPENWEATHER_API_KEY: return {"temp": 25, "humidity": 60, "rainfall": 0, "desc": "Clear", "icon": "01d"}
-    try:
-        url = f"https://api.openweathermap.org/data/2.5/weather?lat={lat}&lon={lon}&units=metric&appid={OPENWEATHER_API_KEY}"
-        data = requests.get(url, timeout=10).json()
-        if data.get("cod") == 200:
-            return { "temp": round(data["main"]["temp"]), "humidity": data["main"]["humidity"], "rainfall": data.get("rain", {}).get("1h", 0), "desc": data["weather"][0]["description"].title(), "icon": data["weather"][0]["icon"] }
-    except: pass
-    return {"temp": 25, "humidity": 60, "rainfall": 0, "desc": "Clear", "icon": "01d"}
-
-def call_groq_api(prompt, max_tokens=300):
-    if not client: return t("LLM service not available.", lang)
-    try:
-        chat = client.chat.completions.create(
-            messages=[{"role": "user", "content": prompt}], 
-            model="llama-3.3-70b-versatile", # Using the fast Llama 3 on Groq
-            temperature=0.3, 
-            max_tokens=max_tokens
-        )
-        return chat.choices[0].message.content.strip()
-    except Exception as e:
-        return t(f"LLM Error: {e}", lang)
+def generate_text(prompt, max_tokens=300):
+    """Raw LLM call; raises on failure so error messages never end up in a cache."""
+    if not client: raise RuntimeError("LLM service not available.")
+    chat = client.chat.completions.create(
+        messages=[{"role": "user", "content": prompt}], 
+        model="llama-3.3-70b-versatile", # Using the fast Llama 3 on Groq
+        temperature=0.3, 
+        max_tokens=max_tokens
+    )
+    return chat.choices[0].message.content.strip()
 
 def get_crop_recommendations(n, p, k, ph, temp, hum, rain, state, district, month, lang):
-    prompt = f"Recommend 3 crops for Indian farmer. Soil: N={n}, P={p}, K={k}, pH={ph}. Weather: {temp} deg C, {hum}% humidity, {rain} mm rain. Location: {state}, {district}, {month}. Rank: 1=best, 2=good, 3=viable. Format:\n1. [CROP] - [short reason]\n2. [CROP] - [short reason]\n3. [CROP] - [short reason]"
-    if lang == "Kannada": prompt += " Answer in Kannada. Use 1. 2. 3."
-    response = call_groq_api(prompt)
-    if response:
-        crops = [line.strip() for line in response.split('\n') if line.strip().startswith(('1.', '2.', '3.'))]
-        while len(crops) < 3: crops.append(f"{len(crops)+1}. Unknown - Error")
-        if len(crops) >= 3:
-            audio_text = " ".join([c.split('-')[0].replace('1.', '').replace('2.', '').replace('3.', '').strip() for c in crops[:3]])
-            return crops[:3], audio_text
-    return ["1. Rice - Error", "2. Maize - Error", "3. Groundnut - Error"], "Rice Maize Groundnut"
-
-def get_crop_guide(crop, state, district, month, lang):
+    """Ranks the crop catalog locally; returns (top 3 [{crop, score, reason}], all [(crop, score)], reason future or None)."""
+    x = feature_vector(n, p, k, temp, hum, ph, rain)
+    ranked = rank_crops(x)
+    top = [{"crop": crop, "score": score, "reason": explain(crop, x, translate=lambda text: t(text, lang))} for crop, score in ranked[:3]]
+    future = None
+    if client and CROP_LLM_REASONS:
+        future = explain_async(client, [c["crop"] for c in top], x, f"{state}, {district}, {month}", lang)
+    return top, ranked, future
+
+def apply_llm_reasons():
+    """Swaps in the LLM-written reasons once they arrive; keeps the local ones if the call failed."""
+    future = st.session_state.crop_reason_future
+    if future is None or not future.done():
+        return
+    st.session_state.crop_reason_future = None
+    try:
+        reasons = future.result()
+    except Exception as e:
+        print(f"Crop reason LLM call failed: {e}")
+        return
+    for rec in st.session_state.crops or []:
+        if reasons.get(rec["crop"]):
+            rec["reason"] = reasons[rec["crop"]]
+            rec["llm"] = True
+
+@st.fragment(run_every=1)
+def wait_for_llm_reasons():
+    """Polls the background reason request and reruns the page when it finishes."""
+    future = st.session_state.crop_reason_future
+    if future is None or future.done():
+        st.rerun()
+    st.caption(f"✍️ {t('Writing detailed reasons...', lang)}")
+
+def guide_job(crop, state, district, month, lang):
+    """(cache, key, generate) for a crop's growing guide."""
     prompt = f"Complete growing guide for {crop} in {state}, {district} during {month}. Include: Soil preparation, Sowing time, Seed rate, Spacing, Irrigation, Fertilizer (NPK), Pest control, Harvesting, Yield per acre, Market tips. Use bullets."
     if lang == "Kannada": prompt += " Answer in Kannada."
-    return call_groq_api(prompt, max_tokens=800)
+    return guide_cache, cache_key("guide", crop, state, district, month, lang), lambda: generate_text(prompt, max_tokens=800)
+
+def get_crop_guide(crop, state, district, month, lang):
+    """Growing guide from the shared persistent cache; only a miss waits for the LLM."""
+    cache, key, generate = guide_job(crop, state, district, month, lang)
+    try:
+        return cache.get(key, generate)
+    except Exception as e:
+        return f"{t('LLM Error', lang)}: {e}"
 
 # --- NEW FEATURE FUNCTIONS ---
 
-def get_market_prediction(crop, state, district, month, lang):
-    """Generates market price and procurement advice."""
+def market_job(crop, state, district, month, lang):
+    """(cache, key, generate) for a crop's market price and procurement advice."""
     prompt = f"""
     You are a commodity market expert for Indian agriculture. 
     Your goal is to give a farmer a quick, actionable market and procurement forecast for {crop} in {district}, {state} for the upcoming harvest period in {month}. 
@@ -132,13 +157,26 @@ def get_market_prediction(crop, state, district, month, lang):
     3. [Selling Strategy Tip]
     """
     if lang == "Kannada": prompt += " Answer concisely in Kannada."
-    return call_groq_api(prompt, max_tokens=300)
+    return market_cache, cache_key("market", crop, state, district, month, lang), lambda: generate_text(prompt, max_tokens=300)
+
+def get_market_prediction(crop, state, district, month, lang):
+    """Market outlook from the shared cache (usually prefetched); only a miss waits for the LLM."""
+    if not client: return t("LLM service not available.", lang)
+    cache, key, generate = market_job(crop, state, district, month, lang)
+    try:
+        return cache.get(key, generate)
+    except Exception as e:
+        return f"{t('LLM Error', lang)}: {e}"
+
+def prefetch_crop_content(crops, state, district, month, lang):
+    """Starts generating guides and market outlooks for the recommended crops, best crop first."""
+    if not client: return
+    jobs = [make_job(crop, state, district, month, lang) for crop in crops for make_job in (guide_job, market_job)]
+    prefetcher.start(user_id, jobs)
 
 # Removed: run_farm_stress_test function as requested
 
 # --- STATIC DATA (Expanded) ---
-FAMOUS_CROPS = { "Punjab": "Wheat 🌾", "Haryana": "Rice 🌾", "Uttar Pradesh": "Sugarcane 🍬", "Bihar": "Maize 🌽", "West Bengal": "Rice 🌾", "Odisha": "Rice 🌾", "Maharashtra": "Cotton ☁️", "Gujarat": "Groundnut 🥜", "Kerala": "Coconut 🥥", "Tamil Nadu": "Rice 🌾", "Madhya Pradesh": "Soybean 🌱", "Andhra Pradesh": "Chillies 🌶️", "Telangana": "Cotton ☁️", "Rajasthan": "Bajra 🌾", "Assam": "Tea 🍃" }
-STATE_COORDS = { "Punjab": (31.15, 75.34), "Haryana": (29.06, 76.08), "Uttar Pradesh": (26.84, 80.94), "Bihar": (25.59, 85.13), "West Bengal": (22.57, 88.36), "Odisha": (20.27, 85.84), "Maharashtra": (19.07, 72.88), "Gujarat": (22.30, 70.80), "Karnataka": (14.52, 75.72), "Kerala": (10.85, 76.27), "Tamil Nadu": (13.08, 80.27), "Madhya Pradesh": (23.25, 77.41), "Andhra Pradesh": (15.91, 79.74), "Telangana": (17.39, 78.49), "Rajasthan": (26.91, 75.79), "Assam": (26.20, 92.93) }
 
 # EXPANDED INDIA_STATES_DISTRICTS list for Recommender Dropdown
 INDIA_STATES_DISTRICTS = { 
@@ -168,57 +206,19 @@ INDIA_STATES_DISTRICTS = {
 
 MONTHS_LIST = [ "January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December" ]
 
-# --- ENHANCED KARNATAKA DISTRICT CROP DATA FOR MAP (ALL DISTRICTS IN LIST) ---
-# This dictionary now contains all districts listed in INDIA_STATES_DISTRICTS["Karnataka"]
-KARNATAKA_DISTRICT_CROPS = {
-    # South/Cauvery Basin
-    "Mandya": {"coords": (12.53, 76.90), "crops": "Sugarcane, Paddy, Coconut"},
-    "Mysuru": {"coords": (12.30, 76.65), "crops": "Ragi, Turmeric, Paddy"},
-    "Chamarajanagara": {"coords": (11.93, 77.12), "crops": "Turmeric, Banana, Maize"},
-    "Bengaluru Urban": {"coords": (12.97, 77.59), "crops": "Ragi, Rice, Vegetables"},
-    "Bengaluru Rural": {"coords": (13.00, 77.40), "crops": "Ragi, Mango, Pulses"},
-    "Ramanagara": {"coords": (12.75, 77.26), "crops": "Sericulture, Ragi, Coconut"},
-    "Kolar": {"coords": (13.13, 78.13), "crops": "Tomato, Groundnut, Pulses"},
-    "Chikkaballapura": {"coords": (13.43, 77.72), "crops": "Groundnut, Grapes, Ragi"},
-    # Malnad/Coastal
-    "Kodagu": {"coords": (12.33, 75.74), "crops": "Coffee, Cardamom, Paddy"},
-    "Chikkamagaluru": {"coords": (13.31, 75.77), "crops": "Coffee, Arecanut, Paddy"},
-    "Hassan": {"coords": (13.01, 76.10), "crops": "Coffee, Potato, Paddy"},
-    "Shivamogga": {"coords": (13.92, 75.56), "crops": "Arecanut, Paddy, Maize"},
-    "Dakshina Kannada": {"coords": (12.91, 74.85), "crops": "Arecanut, Coconut, Rice"},
-    "Udupi": {"coords": (13.34, 74.74), "crops": "Coconut, Rice, Arecanut"},
-    "Uttara Kannada": {"coords": (14.65, 74.61), "crops": "Cashew, Paddy, Spice"},
-    # North/Central Karnataka
-    "Davanagere": {"coords": (14.46, 75.92), "crops": "Paddy, Maize, Cotton"},
-    "Chitradurga": {"coords": (14.22, 76.40), "crops": "Groundnut, Jowar, Maize"},
-    "Tumakuru": {"coords": (13.34, 77.10), "crops": "Coconut, Ragi, Groundnut"},
-    "Ballari": {"coords": (15.14, 76.92), "crops": "Paddy, Cotton, Jowar"},
-    "Koppal": {"coords": (15.35, 76.08), "crops": "Paddy, Cotton, Tur Dal"},
-    "Raichur": {"coords": (16.21, 77.34), "crops": "Paddy, Cotton, Jowar"},
-    # Hyderabad-Karnataka Region (Kalyana Karnataka)
-    "Kalaburagi": {"coords": (17.33, 76.83), "crops": "Red Gram (Tur), Jowar, Maize"},
-    "Yadgir": {"coords": (16.76, 77.13), "crops": "Red Gram (Tur), Cotton, Jowar"},
-    "Bidar": {"coords": (17.91, 77.51), "crops": "Red Gram (Tur), Jowar, Sugarcane"},
-    # Belagavi Region
-    "Belagavi": {"coords": (15.85, 74.50), "crops": "Sugarcane, Jowar, Groundnut"},
-    "Dharwad": {"coords": (15.46, 75.00), "crops": "Jowar, Wheat, Bengal Gram"},
-    "Haveri": {"coords": (14.79, 75.45), "crops": "Maize, Cotton, Paddy"},
-    "Gadag": {"coords": (15.35, 75.62), "crops": "Jowar, Cotton, Groundnut"},
-    "Bagalkote": {"coords": (16.18, 75.66), "crops": "Jowar, Bajra, Sugarcane"},
-    "Vijayapura": {"coords": (16.82, 75.71), "crops": "Jowar, Sunflower, Grapes"},
-}
-# --- END ENHANCED KARNATAKA DATA ---
 
 # ----------------- Weather Header -----------------
-lat, lon = st.session_state.lat, st.session_state.lon; weather = get_weather(lat, lon)
-temp, hum, rain = weather["temp"], weather["humidity"], weather["rainfall"]; desc, icon = weather["desc"], weather["icon"]
-icon_url = f"https://openweathermap.org/img/wn/{icon}@2x.png" 
-_, col_w = st.columns([1, 6]);
-with col_w:
-    st.markdown(f"**{temp}°C** | {t('Humidity', lang)}: {hum}% | {t('Rain', lang)}: {rain}mm | <img src='{icon_url}' alt='{desc}' width='25' height='25' style='vertical-align: middle; margin-bottom: 5px;'> {t(desc, lang)}", unsafe_allow_html=True)
+weather = get_weather_service().get(st.session_state.lat, st.session_state.lon)
+temp, hum = weather["temp"], weather["humidity"]
+render_weather_header(weather, lang)
 
 st.markdown(f"<h1 style='text-align:center;'>{t('AI Crop Recommender', lang)}</h1>", unsafe_allow_html=True)
-tab1, tab2 = st.tabs([ f"📍 {t('Recommend Crops', lang)}", f"🗺️ {t('Crop Map', lang)}" ]) 
+tab_labels = [ f"📍 {t('Recommend Crops', lang)}", f"🗺️ {t('Crop Map', lang)}" ]
+try:
+    # Stateful tabs rerun on switch and report .open, so the map is only sent when its tab is shown
+    tab1, tab2 = st.tabs(tab_labels, key=f"recommender_tabs_{lang}", on_change="rerun")
+except TypeError:
+    tab1, tab2 = st.tabs(tab_labels)
 
 with tab1:
     st.markdown(f"<h3 style='text-align:center;'>{t('Enter Soil & Location Data', lang)}</h3>", unsafe_allow_html=True)
@@ -285,24 +285,25 @@ with tab1:
             save_user_data(st.session_state.user_data)
             loc = st.session_state.user_data["location"]
             
-            with st.spinner(t("Calculating top crop recommendations...", lang)):
-                 crops, audio_text = get_crop_recommendations( n, p, k, ph, temp_in, hum_in, rainfall, loc["state"], loc["district"], loc["month"], lang )
-                 st.session_state.crops = crops
+            crops, ranked, future = get_crop_recommendations( n, p, k, ph, temp_in, hum_in, rainfall, loc["state"], loc["district"], loc["month"], lang )
+            st.session_state.crops, st.session_state.crop_scores, st.session_state.crop_reason_future = crops, ranked, future
+            # Replaces (cancels) this user's prefetch for the previous ranking
+            prefetch_crop_content([c["crop"] for c in crops], loc["state"], loc["district"], loc["month"], lang)
+            audio_text = " ".join(t(c["crop"], lang) for c in crops)
             
             if lang == "Kannada" and audio_text: 
                 audio_bytes = get_kannada_audio_bytes(audio_text)
                 if audio_bytes: st.audio(audio_bytes, autoplay=True, format="audio/mp3")
 
     if st.session_state.get("crops"):
+        apply_llm_reasons()
         st.markdown(f"### {t('Top 3 Recommended Crops', lang)}")
         rank_labels = [t("Highly Recommended", lang), t("Good Choice", lang), t("Viable Option", lang)]; colors = ["#2e7d32", "#f9a825", "#e65100"]
         recommendations = st.session_state.crops
-        while len(recommendations) < 3: recommendations.append("Error fetching recommendation")
         
-        for i, line in enumerate(recommendations[:3]):
-             parts = line.split('-', 1)
-             crop_name = parts[0].strip().lstrip('1234567890. ') if len(parts) > 0 else "Unknown"
-             reason = parts[1].strip() if len(parts) > 1 else "No reason provided"
+        for i, rec in enumerate(recommendations[:3]):
+             crop_name = rec["crop"]
+             reason = rec["reason"]  # already in the user's language, local or LLM-written
              
              col_a, col_b = st.columns([1, 4])
              with col_a:
@@ -312,9 +313,8 @@ with tab1:
                  </div>
                  """, unsafe_allow_html=True)
              with col_b:
-                 is_error = "error" in crop_name.lower() or "unknown" in crop_name.lower()
                  # Set selected_crop directly on button click and clear market prediction
-                 if st.button(crop_name, key=f"crop_{i}", use_container_width=True, disabled=is_error):
+                 if st.button(f"{t(crop_name, lang)} · {rec['score']:.0%}", key=f"crop_{i}", use_container_width=True):
                       st.session_state.selected_crop = crop_name
                       st.session_state.market_prediction = None # Clear previous market prediction
                       # Removed: st.session_state.stress_test_result = None # Clear previous stress test
@@ -322,6 +322,15 @@ with tab1:
 
              st.markdown(f"<small>{reason}</small>", unsafe_allow_html=True) 
 
+        if st.session_state.crop_reason_future is not None:
+            wait_for_llm_reasons()
+
+        with st.expander(t("Suitability scores for all crops", lang)):
+            st.dataframe(
+                [{t("Crop", lang): t(crop, lang), t("Suitability", lang): f"{score:.0%}"} for crop, score in st.session_state.crop_scores or []],
+                use_container_width=True, hide_index=True,
+            )
+
         # --- Selected Crop Action Panel ---
         if st.session_state.get("selected_crop"):
             st.markdown("---")
@@ -333,7 +342,7 @@ with tab1:
                 # --- MARKET PREDICTION TAB (NEW FEATURE) ---
                 st.markdown(f"### 📈 {t('Live Market Price & Procurement Prediction', lang)}")
                 
-                if st.button(t(f"Get Market Outlook for {st.session_state.selected_crop}", lang), key="get_market_btn"):
+                if st.button(f"{t('Get Market Outlook for', lang)} {st.session_state.selected_crop}", key="get_market_btn"):
                      with st.spinner(t("Running instant market forecast...", lang)):
                          st.session_state.market_prediction = get_market_prediction( 
                              st.session_state.selected_crop, loc["state"], loc["district"], loc["month"], lang
@@ -358,10 +367,15 @@ with tab1:
                 # --- GUIDE (Standard Feature) ---
                 st.markdown(f"### 📚 {t('Complete Guide for', lang)} **{st.session_state.selected_crop}**")
                 
-                with st.spinner(t(f"Fetching guide for {st.session_state.selected_crop}...", lang)):
+                with st.spinner(f"{t('Fetching guide for', lang)} {st.session_state.selected_crop}..."):
                     guide = get_crop_guide( st.session_state.selected_crop, loc["state"], loc["district"], loc["month"], lang )
                 
                 st.markdown(f"""<div class='info-box'>{guide.replace('•', '<br>•')}</div>""", unsafe_allow_html=True)
+                guide_stats = guide_cache.stats()
+                st.caption(
+                    f"{t('Guide cache', lang)}: {guide_stats['hit_rate']:.0%} {t('hit rate', lang)} · "
+                    f"{guide_stats['hits'] + guide_stats['stale_hits']} {t('hits', lang)} · {guide_stats['misses']} {t('misses', lang)}"
+                )
                 
                 if lang == "Kannada": 
                     audio_bytes = get_kannada_audio_bytes(guide[:500])
@@ -373,35 +387,12 @@ with tab2:
     st.markdown(f"<h3 style='text-align:center;'>{t('Major Crops by Region (India)', lang)}</h3>", unsafe_allow_html=True)
     st.markdown(f"<p style='text-align:center;'>{t('Markers show famous crops for states and detailed data for ALL major Karnataka districts.', lang)}</p>", unsafe_allow_html=True)
     
-    # Initialize Map centered roughly on India
-    m = folium.Map(location=[22.97, 78.65], zoom_start=5); 
-    marker_cluster = MarkerCluster().add_to(m)
-    
-    # 1. Add General State Markers (Existing Logic, non-Karnataka states)
-    for state, crop in FAMOUS_CROPS.items():
-        coords = STATE_COORDS.get(state)
-        if coords: 
-            popup = f"<b>{state}</b><br>{t('Famous Crop', lang)}: {t(crop, lang)}"
-            folium.Marker( 
-                location=coords, 
-                popup=popup, 
-                tooltip=f"{state}: {crop}", 
-                icon=folium.Icon(color='green', icon='leaf')
-            ).add_to(marker_cluster)
-            
-    # 2. Add Granular Karnataka District Markers (New Enhanced Logic)
-    for district, data in KARNATAKA_DISTRICT_CROPS.items():
-        coords = data["coords"]
-        crops = data["crops"]
-        popup = f"<b>Karnataka: {district}</b><br>{t('Major Crops', lang)}: {t(crops, lang)}"
-        folium.Marker(
-            location=coords,
-            popup=popup,
-            tooltip=f"Karnataka: {district} - {crops}",
-            icon=folium.Icon(color='blue', icon='map-pin') 
-        ).add_to(marker_cluster)
-
-    map_html = m._repr_html_()
-    components.html(map_html, height=600)
+    # None on Streamlit versions without stateful tabs: render as before
+    if getattr(tab2, "open", None) is not False:
+        crop_map = get_map(lang, translate_or_none)
+        if crop_map["url"]:
+            components.iframe(crop_map["url"], height=CROP_MAP_HEIGHT)
+        else:
+            components.html(crop_map["html"], height=CROP_MAP_HEIGHT)
 
 render_project_bot()
\ No newline at end of file
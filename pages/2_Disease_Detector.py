@@ -1,20 +1,26 @@
 # pages/2_Disease_Detector.py
 import streamlit as st
-import numpy as np
-import tensorflow as tf
-from PIL import Image
-import requests
 from dotenv import load_dotenv
 import os
 from groq import Groq
-import io
-import cv2  # <--- This import is needed for the validation
+import time
+
+# TensorFlow is imported by the warm-up thread, not at page load
+import disease_model
+from disease_model import (
+    MODEL_PATH, BATCH_SIZE, load_image, preview_jpeg,
+    is_crop_image, predict_batch, summarize_plot
+)
+from model_warmup import WARMING, FAILED, get_model_warmup
+from scan_cache import content_digest, perceptual_hash, get_scan_cache
+from treatment_store import format_treatment, get_treatment_store
+from weather import get_weather_service
 
 # --- Import all required functions ---
 from project_bot import render_project_bot
 from utils import (
     apply_custom_css, t, get_kannada_audio_bytes,
-    check_login, render_sidebar
+    check_login, render_sidebar, render_weather_header
 )
 
 # -----------------------------
@@ -28,182 +34,190 @@ render_sidebar()
 lang = st.session_state.lang
 
 load_dotenv()
-OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY")
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 client = Groq(api_key=GROQ_API_KEY) if GROQ_API_KEY else None
+treatments = get_treatment_store(client)
 
-@st.cache_resource
-def load_model():
-    model_path = "FinalTest_inceptionv3.h5" 
-    if not os.path.exists(model_path):
-        st.error(f"Model file not found at {model_path}.")
-        return None
-    custom_objects = {"mse": tf.keras.losses.MeanSquaredError()}
-    return tf.keras.models.load_model(model_path, custom_objects=custom_objects)
-
-model = load_model()
-class_labels = {0: "Brown Spot", 1: "Healthy Plant", 2: "Leaf Blast", 3: "Sheath Blight"}
-
-# ========================================
-# CROP VALIDATION FUNCTION (This is what you asked for)
-# ========================================
-
-def is_crop_image(img):
-    """
-    Simple check: Is this a crop/plant image or something else?
-    Returns: True if crop/plant, False if not
-    """
-    img_array = np.array(img)
-    img_hsv = cv2.cvtColor(img_array, cv2.COLOR_RGB2HSV)
-    
-    # Check 1: Does it have plant colors (green, yellow, brown)?
-    lower_green = np.array([20, 15, 15])
-    upper_green = np.array([95, 255, 255])
-    green_mask = cv2.inRange(img_hsv, lower_green, upper_green)
-    
-    lower_yellow = np.array([8, 15, 15])
-    upper_yellow = np.array([40, 255, 255])
-    yellow_mask = cv2.inRange(img_hsv, lower_yellow, upper_yellow)
-    
-    plant_mask = cv2.bitwise_or(green_mask, yellow_mask)
-    plant_ratio = np.sum(plant_mask > 0) / plant_mask.size
-    
-    # At least 8% of the image should be plant-colored
-    if plant_ratio < 0.08:
-        return False
-    
-    # Check 2: Is it too metallic/gray? (bikes, cars, buildings)
-    lower_gray = np.array([0, 0, 30])
-    upper_gray = np.array([180, 60, 230])
-    gray_mask = cv2.inRange(img_hsv, lower_gray, upper_gray)
-    gray_ratio = np.sum(gray_mask > 0) / gray_mask.size
-    
-    if gray_ratio > 0.40:
-        return False
-    
-    # Check 3: Is it a person? (skin tone detection)
-    lower_skin = np.array([0, 15, 60])
-    upper_skin = np.array([25, 180, 255])
-    skin_mask = cv2.inRange(img_hsv, lower_skin, upper_skin)
-    skin_ratio = np.sum(skin_mask > 0) / skin_mask.size
-    
-    if skin_ratio > 0.12:
-        return False
-    
-    # Check 4: Is it too bright? (paper, walls, sky)
-    brightness = img_hsv[:,:,2]
-    very_bright_ratio = np.sum(brightness > 235) / brightness.size
-    if very_bright_ratio > 0.45:
-        return False
-    
-    # Check 5: Is it too dark? (night photos, black objects)
-    very_dark_ratio = np.sum(brightness < 25) / brightness.size
-    if very_dark_ratio > 0.55:
-        return False
-    
-    return True
-
-# ========================================
-# END OF VALIDATION FUNCTION
-# ========================================
+warmup = get_model_warmup().start()
+scan_cache = get_scan_cache()
+# Near-duplicate scan matches (when enabled) stay within one user's uploads
+scan_owner = st.session_state.get("user_id")
 
-@st.cache_data(ttl=300)
-def get_weather(city="Bangalore"):
-    if not OPENWEATHER_API_KEY: 
-        return (25, 60, 0, "http://openweathermap.org/img/wn/01d@2x.png", "Clear")
-    try:
-        url = f"http://api.openweathermap.org/data/2.5/weather?q={city}&appid={OPENWEATHER_API_KEY}&units=metric"
-        response = requests.get(url, timeout=10)
-        data = response.json()
-        if data.get("cod") == 200:
-            temp = round(data["main"]["temp"])
-            icon = data["weather"][0]["icon"]
-            desc = data["weather"][0]["description"].title()
-            icon_url = f"http://openweathermap.org/img/wn/{icon}@2x.png"
-            return temp, data["main"]["humidity"], data.get("rain", {}).get("1h", 0), icon_url, desc
-    except: 
-        pass
-    return 25, 60, 0, "http://openweathermap.org/img/wn/01d@2x.png", "Clear"
+@st.fragment(run_every=2)
+def render_warmup_status():
+    """Polls the background warm-up and reruns the page once the model is ready."""
+    if warmup.state == WARMING:
+        st.info(f"⏳ {t('Model is warming up. You can upload images meanwhile.', lang)}")
+    else:
+        st.rerun()
 
-def get_treatment_from_llm(disease: str, lang: str):
-    if not client: 
-        return t("LLM not available.", lang), None
-    prompt = f"4 short, practical cure & prevention steps for paddy {disease}. Bullets only."
-    if lang == "Kannada": 
-        prompt += " Answer in Kannada. Use • for bullets."
+def get_treatment(disease: str, lang: str, scale: float):
+    """Advice from the pre-generated store; the LLM is only called for combinations it lacks."""
     try:
-        chat = client.chat.completions.create(
-            messages=[{"role": "user", "content": prompt}], 
-            model="llama-3.3-70b-versatile", # Corrected model name
-            temperature=0.3, 
-            max_tokens=250
-        )
-        response = chat.choices[0].message.content.strip()
-        lines = []
-        for line in response.split('\n'):
-            line = line.strip()
-            if line.startswith(('•', '-', '*')):
-                line = line.lstrip('•-* ').strip()
-                if line: 
-                    lines.append(f"• {line}")
-        clean_text = "<br>".join(lines[:4])
-        audio_text = " ".join([l.replace('•', '').strip() for l in lines[:4]])
-        return clean_text, audio_text
+        lines = treatments.get(disease, lang, scale)
     except Exception as e: 
-        return t(f"Error: {e}", lang), None
-
-def preprocess_image(img):
-    img = img.resize((224, 224))
-    img_array = np.array(img) / 255.0
-    img_array = np.expand_dims(img_array, axis=0)
-    return img_array
+        return f"{t('Error', lang)}: {e}", None
+    if not lines:
+        return t("LLM not available.", lang), None
+    return format_treatment(lines)
 
 def predict_image(model, img):
     try:
-        img_array = preprocess_image(img)
-        predictions = model.predict(img_array)
-        class_probs = predictions[0]
-        severity_output = predictions[1]
-        disease_idx = np.argmax(class_probs)
-        disease = class_labels.get(disease_idx, "Unknown")
-        scale = float(severity_output[0][0])
-        if disease == "Healthy Plant": 
-            scale = 0.0
-        return disease, round(scale, 2)
+        start = time.perf_counter()
+        result = disease_model.predict_image(model, img)
+        warmup.record_scan(time.perf_counter() - start)
+        return result
     except Exception as e:
         st.error(f"Prediction error: {e}")
         return "Unknown", 0.0
 
-weather_data = get_weather("Bangalore")
-if weather_data:
-    temp, hum, rain, icon_url, desc = weather_data
-    _, col_w = st.columns([1, 6])
-    with col_w:
-        st.markdown(
-            f"**{temp}°C** | {t('Humidity', lang)}: {hum}% | {t('Rain', lang)}: {rain}mm | "
-            f"<img src='{icon_url}' alt='{desc}' width='25' height='25' "
-            f"style='vertical-align: middle; margin-bottom: 5px;'> {t(desc, lang)}", 
-            unsafe_allow_html=True
-        )
+def ready_model():
+    """The loaded model, waiting for the warm-up if it is still running; None if loading failed."""
+    if warmup.state == WARMING:
+        with st.spinner(t("Model is warming up...", lang)):
+            warmup.wait()
+    return warmup.model
+
+def cached_scan(uploaded_file):
+    """
+    Scan cache lookup for one upload: by content digest, then by perceptual hash.
+    Returns (result or None, digest, phash, image); the image is decoded only on a digest miss.
+    """
+    data = uploaded_file.getvalue()
+    digest = content_digest(data)
+    result = scan_cache.get(digest)
+    if result is not None:
+        return result, digest, None, None
+    try:
+        img = load_image(data)
+    except Exception:
+        return None, digest, None, None
+    phash = perceptual_hash(img)
+    return scan_cache.get_similar(digest, phash, scan_owner), digest, phash, img
+
+def scan_upload(uploaded_file, preview_slot):
+    """
+    Validation verdict, disease and severity for one upload, with its preview shown in `preview_slot`.
+    Reruns only pay for the digest: the small preview JPEG is cached with the result.
+    """
+    result, digest, phash, img = cached_scan(uploaded_file)
+    if result is not None and "preview" not in result:
+        # Cached by a batch scan, which keeps no preview
+        img = load_image(uploaded_file.getvalue())
+        result = dict(result, preview=preview_jpeg(img))
+        scan_cache.put(digest, perceptual_hash(img), result, scan_owner)
+    if result is not None:
+        preview_slot.image(result["preview"], caption=t("Preview", lang), width=250)
+        return result
+    if img is None:
+        return {"valid": False}
+    preview = preview_jpeg(img)
+    preview_slot.image(preview, caption=t("Preview", lang), width=250)
+    with st.spinner(t("Validating image...", lang)):
+        if not is_crop_image(img):
+            result = {"valid": False, "preview": preview}
+            scan_cache.put(digest, phash, result, scan_owner)
+            return result
+    model = ready_model()
+    if model is None:
+        return None
+    with st.spinner(t("Analyzing...", lang)):
+        disease, scale = predict_image(model, img)
+    result = {"valid": True, "disease": disease, "severity": scale, "preview": preview}
+    if disease != "Unknown":  # prediction errors are retried on the next run
+        scan_cache.put(digest, phash, result, scan_owner)
+    return result
+
+def render_batch_scan(uploaded_files):
+    """Validates all uploads, classifies the uncached crop images in batched passes and shows a plot summary."""
+    rows, pending = [], []
+    with st.spinner(t("Validating image...", lang)):
+        for f in uploaded_files:
+            result, digest, phash, img = cached_scan(f)
+            if result is None and img is not None:
+                if is_crop_image(img):
+                    pending.append((len(rows), digest, phash, img))
+                else:
+                    result = {"valid": False}
+                    scan_cache.put(digest, phash, result, scan_owner)
+            rows.append({"file": f.name, **(result or {"valid": False})})
+
+    if pending:
+        model = ready_model()
+        if model is None:
+            return
+        imgs = [img for _, _, _, img in pending]
+        with st.spinner(t("Analyzing...", lang)):
+            start = time.perf_counter()
+            try:
+                predictions = predict_batch(model, imgs, batch_size=BATCH_SIZE)
+            except Exception as e:
+                st.error(f"Prediction error: {e}")
+                return
+            elapsed = time.perf_counter() - start
+            warmup.record_scan(elapsed, len(imgs))
+        st.caption(f"{len(imgs)} {t('images', lang)} · {elapsed:.2f}s · {len(imgs) / elapsed:.1f} {t('images/sec', lang)}")
+        for (row, digest, phash, _), (disease, scale) in zip(pending, predictions):
+            result = {"valid": True, "disease": disease, "severity": scale}
+            scan_cache.put(digest, phash, result, scan_owner)
+            rows[row].update(result)
+
+    results = [(row["disease"], row["severity"]) for row in rows if row["valid"]]
+    summary = summarize_plot(results)
+    col1, col2, col3 = st.columns(3)
+    col1.metric(t("Images Scanned", lang), f"{summary['images']}/{len(uploaded_files)}")
+    col2.metric(t("Infected", lang), f"{summary['infected_pct']}%")
+    col3.metric(t("Mean Severity", lang), f"{summary['mean_severity']}/9")
+    if summary["main_disease"]:
+        st.markdown(f"**{t('Main Disease in Plot', lang)}:** {t(summary['main_disease'], lang)}")
+
+    st.dataframe(
+        [{
+            t("File", lang): row["file"],
+            t("Disease", lang): t(row["disease"], lang) if row["valid"] else t("Not a crop image", lang),
+            t("Severity", lang): row.get("severity"),
+        } for row in rows],
+        use_container_width=True,
+    )
+
+# Same location as the Crop Recommender (Bengaluru until one is set)
+render_weather_header(get_weather_service().get(st.session_state.get("lat"), st.session_state.get("lon")), lang)
 
 st.markdown(
     f"<h1 style='text-align:center;'>{t('AgroScan - Paddy Disease Detector', lang)}</h1>", 
     unsafe_allow_html=True
 )
 
-uploaded_file = st.file_uploader(
+if warmup.state == WARMING:
+    render_warmup_status()
+
+uploaded_files = st.file_uploader(
     t("Upload Paddy Leaf Image", lang), 
-    type=["jpg", "jpeg", "png"]
+    type=["jpg", "jpeg", "png"],
+    accept_multiple_files=True
 )
 
-if uploaded_file and model:
-    img = Image.open(uploaded_file).convert("RGB")
-    st.image(img, caption=t("Preview", lang), width=250)
+if warmup.state == FAILED:
+    # One translated message; only the path or exception text is left as is
+    if warmup.error == "Model file not found":
+        st.error(f"{t('Model file not found at', lang)} {MODEL_PATH}")
+    elif warmup.error == "Inference server unreachable":
+        st.error(t("Inference server unreachable", lang))
+    else:
+        st.error(f"{t('Model load error', lang)}: {warmup.error}")
+    st.button(t("Retry loading model", lang), on_click=warmup.retry)
+
+if uploaded_files and len(uploaded_files) > 1:
+    render_batch_scan(uploaded_files)
+
+elif uploaded_files:
+    uploaded_file = uploaded_files[0]
+    scan = scan_upload(uploaded_file, st.empty())
     
     # --- THIS IS THE LOGIC YOU WANTED ---
     # Check if it's a crop image
-    with st.spinner(t("Validating image...", lang)):
-        if not is_crop_image(img):
+    if scan:
+        if not scan["valid"]:
             # NOT A CROP - Show error
             st.error(
                 f"❌ {t('Please upload only CROP images. This appears to be a non-crop image (bike, person, building, etc.).', lang)}"
@@ -216,8 +230,7 @@ if uploaded_file and model:
             )
         else:
             # IS A CROP - Proceed with prediction
-            with st.spinner(t("Analyzing...", lang)):
-                disease, scale = predict_image(model, img)
+            disease, scale = scan["disease"], scan["severity"]
 
             col1, col2 = st.columns(2)
             with col1:
@@ -256,7 +269,7 @@ if uploaded_file and model:
                 st.success(t("Your plant is healthy! No treatment needed.", lang))
             elif disease in ["Brown Spot", "Leaf Blast", "Sheath Blight"]:
                 with st.spinner(t("Getting cure advice...", lang)):
-                    treatment_html, audio_text = get_treatment_from_llm(disease, lang)
+                    treatment_html, audio_text = get_treatment(disease, lang, scale)
                 
                 st.markdown(
                     f"""<div class='info-box' style='margin:15px 0;'>
@@ -272,7 +285,13 @@ if uploaded_file and model:
             else:
                 st.error(t("An error occurred during prediction. Please try another image.", lang))
 
-elif not model:
-    st.error(t("Model not loaded. Please check file path.", lang))
+if warmup.timings:
+    timings = warmup.timings
+    st.caption(
+        f"{t('Cold start', lang)}: " + " · ".join(
+            f"{name.removesuffix('_s')} {timings[name]}s"
+            for name in ("import_s", "load_s", "warmup_s", "first_scan_s") if name in timings
+        )
+    )
 
 render_project_bot()
\ No newline at end of file
@@ -0,0 +1,105 @@
+# scan_cache.py
+"""
+Process-wide cache of Disease Detector scan results.
+
+Every widget interaction reruns the page with the same uploaded file, so a
+scan (validation verdict, disease, severity) is memoized by a SHA-256 of
+the uploaded bytes. Only identical bytes are shared between sessions.
+
+SCAN_CACHE_PHASH_DISTANCE > 0 adds a near-duplicate tier. On a digest miss,
+a 64-bit difference hash (dHash) of the decoded image is compared against
+entries cached by the same session, to catch one photo re-uploaded after
+recompression or resizing. It is off by default. Leaf photos look alike at
+the 9x8 thumbnail the hash is taken from: on synthetic leaf scenes, 1.3% of
+distinct pairs are within 4 bits, while recompression moves a hash by up to
+4 bits. Measure a distance on real photos
+(python -m benchmarks.bench_scan_phash --images DIR) before enabling it.
+"""
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image
+import streamlit as st
+
+SCAN_CACHE_SIZE = int(os.getenv("SCAN_CACHE_SIZE", 1024))
+SCAN_CACHE_PHASH_DISTANCE = int(os.getenv("SCAN_CACHE_PHASH_DISTANCE", 0))  # max differing bits of 64; 0 = off
+SCAN_CACHE_PHASH_MIN_CONTRAST = int(os.getenv("SCAN_CACHE_PHASH_MIN_CONTRAST", 16))  # gray levels
+
+
+def content_digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def perceptual_hash(img, size=8, min_contrast=SCAN_CACHE_PHASH_MIN_CONTRAST):
+    """
+    dHash: sign of horizontal gradients on a (size+1) x size grayscale thumbnail, as an int.
+    None for near-flat thumbnails, whose bits are noise and would match unrelated photos.
+    """
+    small = np.asarray(img.convert("L").resize((size + 1, size), Image.BILINEAR), dtype=np.int16)
+    if np.ptp(small) < min_contrast:
+        return None
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+class ScanCache:
+    def __init__(self, max_entries=SCAN_CACHE_SIZE, phash_distance=SCAN_CACHE_PHASH_DISTANCE):
+        self.max_entries = max_entries
+        self.phash_distance = phash_distance
+        self._entries = OrderedDict()  # digest -> (phash, owner, result)
+        self._lock = threading.Lock()
+        self.hits = self.phash_hits = self.misses = 0
+
+    def get(self, digest):
+        """Exact-bytes lookup; returns the cached result dict or None."""
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                return None
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            return entry[2]
+
+    def get_similar(self, digest, phash, owner=None):
+        """Near-duplicate lookup by perceptual hash among `owner`'s entries; a hit is also stored under `digest`."""
+        if phash is None or owner is None or self.phash_distance <= 0:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            best = None
+            for cached_phash, cached_owner, result in self._entries.values():
+                if cached_phash is None or cached_owner != owner:
+                    continue
+                distance = (cached_phash ^ phash).bit_count()
+                if distance <= self.phash_distance and (best is None or distance < best[0]):
+                    best = (distance, result)
+            if best is None:
+                self.misses += 1
+                return None
+            self.phash_hits += 1
+            self._store(digest, phash, owner, best[1])
+            return best[1]
+
+    def put(self, digest, phash, result, owner=None):
+        with self._lock:
+            self._store(digest, phash, owner, result)
+
+    def _store(self, digest, phash, owner, result):
+        self._entries[digest] = (phash, owner, dict(result))
+        self._entries.move_to_end(digest)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "phash_hits": self.phash_hits, "misses": self.misses}
+
+
+@st.cache_resource
+def get_scan_cache():
+    """The scan cache shared by every Streamlit session in this process."""
+    return ScanCache()
@@ -0,0 +1,209 @@
+# scan_survey.py
+"""
+Bulk disease scanning of survey imagery from the command line.
+
+    python scan_survey.py --dir surveys/mandya_2025 --out mandya.csv
+    python scan_survey.py --manifest survey.csv --out survey.jsonl     # rerun the same command to resume
+
+Images are decoded and validated (load_image, is_crop_image) in a thread
+pool, classified in batches (predict_batch) and written in input order,
+flushing after every batch. Only a fixed window of decoded images is in
+flight, so memory does not grow with the survey size. Because rows are
+written in input order, an interrupted run resumes by skipping as many
+inputs as the output file already has rows.
+
+A manifest is a CSV with a `path` column (relative paths are resolved
+against the manifest's folder); its other columns are copied to the output.
+"""
+import os
+import csv
+import sys
+import json
+import time
+import argparse
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from disease_model import BATCH_SIZE, DISEASE_BACKEND, load_disease_model, load_image, is_crop_image, predict_batch
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+RESULT_FIELDS = ["path", "status", "disease", "severity"]
+
+
+# -----------------
+# Inputs
+# -----------------
+def iter_directory(directory):
+    """Image paths under `directory` in a stable order (sorted walk), yielded lazily."""
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                yield os.path.join(root, name), {}
+
+
+def iter_manifest(manifest):
+    base = os.path.dirname(os.path.abspath(manifest))
+    with open(manifest, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            path = row.pop("path")
+            yield (path if os.path.isabs(path) else os.path.join(base, path)), row
+
+
+def manifest_fields(manifest):
+    with open(manifest, newline="", encoding="utf-8") as f:
+        header = next(csv.reader(f), [])
+    if "path" not in header:
+        raise SystemExit(f"{manifest} has no 'path' column")
+    return [name for name in header if name != "path"]
+
+
+# -----------------
+# Outputs
+# -----------------
+def _read_rows(out_path):
+    if out_path.endswith(".jsonl"):
+        with open(out_path, encoding="utf-8") as f:
+            for line in f:
+                yield json.loads(line)
+    else:
+        with open(out_path, newline="", encoding="utf-8") as f:
+            yield from csv.DictReader(f)
+
+
+def completed_rows(out_path):
+    """(rows already written, path of the last one), dropping a half-written last line first."""
+    if not os.path.exists(out_path) or os.path.getsize(out_path) == 0:
+        return 0, None
+    with open(out_path, "rb+") as f:
+        data = f.read()
+        if not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+    count, last = 0, None
+    for row in _read_rows(out_path):
+        count, last = count + 1, row["path"]
+    return count, last
+
+
+class ResultWriter:
+    def __init__(self, out_path, extra_fields, append):
+        self.jsonl = out_path.endswith(".jsonl")
+        self._file = open(out_path, "a" if append else "w", newline="", encoding="utf-8")
+        if not self.jsonl:
+            self._csv = csv.DictWriter(self._file, fieldnames=RESULT_FIELDS + extra_fields)
+            if not append:
+                self._csv.writeheader()
+
+    def write(self, rows):
+        for row in rows:
+            if self.jsonl:
+                self._file.write(json.dumps(row, ensure_ascii=False) + "\n")
+            else:
+                self._csv.writerow(row)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+# -----------------
+# Pipeline
+# -----------------
+def decode_and_validate(path):
+    """(image, "ok") for crop images, (None, status) otherwise."""
+    try:
+        img = load_image(path)
+    except Exception as e:
+        return None, f"error: {e}"
+    if not is_crop_image(img):
+        return None, "not_crop"
+    return img, "ok"
+
+
+def scan(inputs, model, writer, batch_size=BATCH_SIZE, workers=4, prefetch=2, progress_every=500):
+    """Streams (path, extra) inputs through decode/validate -> batched predict -> writer; returns disease counts."""
+    counts = Counter()
+    window = batch_size * (prefetch + 1)
+    inputs = iter(inputs)
+    pending = deque()
+    done = 0
+    started = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="decode") as pool:
+        def fill():
+            while len(pending) < window:
+                item = next(inputs, None)
+                if item is None:
+                    return
+                pending.append((item, pool.submit(decode_and_validate, item[0])))
+
+        fill()
+        while pending:
+            chunk = [pending.popleft() for _ in range(min(batch_size, len(pending)))]
+            fill()  # keep the decoders busy while this batch is classified
+            decoded = [(item, future.result()) for item, future in chunk]
+            imgs = [img for _, (img, _) in decoded if img is not None]
+            predictions = iter(predict_batch(model, imgs, batch_size=batch_size) if imgs else [])
+
+            rows = []
+            for (path, extra), (img, status) in decoded:
+                row = {"path": path, "status": status, "disease": "", "severity": "", **extra}
+                if img is not None:
+                    row["disease"], row["severity"] = next(predictions)
+                    counts[row["disease"]] += 1
+                else:
+                    counts[status.split(":")[0]] += 1
+                rows.append(row)
+            writer.write(rows)
+
+            previous, done = done, done + len(rows)
+            if done // progress_every > previous // progress_every:
+                rate = done / (time.perf_counter() - started)
+                print(f"{done} images, {rate:.1f} img/s", file=sys.stderr)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk paddy disease scanning for survey imagery")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--dir", help="folder of images (searched recursively)")
+    source.add_argument("--manifest", help="CSV with a 'path' column")
+    parser.add_argument("--out", required=True, help="results file (.csv or .jsonl); resumed if it exists")
+    parser.add_argument("--restart", action="store_true", help="overwrite --out instead of resuming")
+    parser.add_argument("--backend", choices=["keras", "tflite", "remote"], default=DISEASE_BACKEND)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=4, help="decode/validate threads")
+    parser.add_argument("--prefetch", type=int, default=2, help="batches decoded ahead of the model")
+    args = parser.parse_args()
+
+    extra_fields = manifest_fields(args.manifest) if args.manifest else []
+    inputs = iter_manifest(args.manifest) if args.manifest else iter_directory(args.dir)
+
+    skip, last_path = (0, None) if args.restart else completed_rows(args.out)
+    for i in range(skip):
+        path, _ = next(inputs, (None, None))
+        if path is None or (i == skip - 1 and path != last_path):
+            raise SystemExit(f"{args.out} does not match the inputs (changed since the last run?); use --restart")
+    if skip:
+        print(f"Resuming after {skip} already scanned images", file=sys.stderr)
+
+    model = load_disease_model(args.backend)
+    if model is None:
+        raise SystemExit("Model could not be loaded")
+
+    writer = ResultWriter(args.out, extra_fields, append=skip > 0)
+    started = time.perf_counter()
+    try:
+        counts = scan(inputs, model, writer, args.batch_size, args.workers, args.prefetch)
+    finally:
+        writer.close()
+    total = sum(counts.values())
+    elapsed = time.perf_counter() - started
+    print(f"Scanned {total} images in {elapsed:.1f}s ({total / elapsed if elapsed else 0:.1f} img/s)")
+    for label, count in counts.most_common():
+        print(f"  {label}: {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+# speech.py
+"""
+Pluggable speech recognition for voice input.
+
+Backends share one small interface (`transcribe(wav_bytes, language)`), are
+picked with ASR_BACKEND (comma-separated for fallbacks, e.g. "vosk,google"),
+and run in a bounded, process-wide thread pool so a slow recognition never
+blocks the Streamlit script thread of other users.
+"""
+import io
+import os
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+import streamlit as st
+import speech_recognition as sr
+
+ASR_BACKEND = os.getenv("ASR_BACKEND", "google")
+ASR_WORKERS = int(os.getenv("ASR_WORKERS", 4))
+ASR_MAX_PENDING = int(os.getenv("ASR_MAX_PENDING", 16))
+ASR_TIMEOUT = float(os.getenv("ASR_TIMEOUT", 20))
+VOSK_MODEL_PATH = os.getenv("VOSK_MODEL_PATH", "models/vosk-model-small-kn")
+
+try:
+    import vosk
+    VOSK_AVAILABLE = True
+except ImportError:
+    VOSK_AVAILABLE = False
+
+
+class ASRError(RuntimeError):
+    """Raised when no backend could transcribe the audio."""
+
+
+def _read_audio(wav_bytes):
+    with sr.AudioFile(io.BytesIO(wav_bytes)) as source:
+        return sr.Recognizer().record(source)
+
+
+# -----------------
+# Backends
+# -----------------
+class GoogleASR:
+    """Free Google Web Speech endpoint (network, no SLA)."""
+    name = "google"
+
+    def transcribe(self, wav_bytes, language="kn-IN"):
+        return sr.Recognizer().recognize_google(_read_audio(wav_bytes), language=language)
+
+
+class VoskASR:
+    """Offline Kaldi recognizer; needs `vosk` and a model directory (e.g. a Kannada model)."""
+    name = "vosk"
+    sample_rate = 16000
+
+    def __init__(self, model_path=VOSK_MODEL_PATH):
+        if not VOSK_AVAILABLE:
+            raise ASRError("vosk is not installed")
+        if not os.path.isdir(model_path):
+            raise ASRError(f"Vosk model not found at {model_path}")
+        self.model = vosk.Model(model_path)
+
+    def transcribe(self, wav_bytes, language="kn-IN"):
+        pcm = _read_audio(wav_bytes).get_raw_data(convert_rate=self.sample_rate, convert_width=2)
+        recognizer = vosk.KaldiRecognizer(self.model, self.sample_rate)
+        recognizer.AcceptWaveform(pcm)
+        text = json.loads(recognizer.FinalResult()).get("text", "").strip()
+        if not text:
+            raise ASRError("Vosk returned no text")
+        return text
+
+
+class StubASR:
+    """Returns a fixed transcript; for local testing without network or models."""
+    name = "stub"
+
+    def __init__(self, text=None):
+        self.text = text or os.getenv("ASR_STUB_TEXT", "ಭತ್ತಕ್ಕೆ ಯಾವ ಗೊಬ್ಬರ ಉತ್ತಮ")
+
+    def transcribe(self, wav_bytes, language="kn-IN"):
+        return self.text
+
+
+BACKENDS = {"google": GoogleASR, "vosk": VoskASR, "stub": StubASR}
+
+
+def create_backends(spec=ASR_BACKEND):
+    """Instantiates the backends named in `spec`, skipping ones that cannot load."""
+    backends = []
+    for name in [part.strip() for part in spec.split(",") if part.strip()]:
+        try:
+            backends.append(BACKENDS[name]())
+        except (KeyError, ASRError) as e:
+            print(f"ASR backend '{name}' unavailable: {e}")
+    if not backends:
+        backends.append(GoogleASR())
+    return backends
+
+
+# -----------------
+# Worker Pool
+# -----------------
+class SpeechRecognizer:
+    def __init__(self, backends, workers=ASR_WORKERS, max_pending=ASR_MAX_PENDING):
+        self.backends = backends
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="asr")
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def _run(self, wav_bytes, language):
+        errors = []
+        try:
+            for backend in self.backends:
+                try:
+                    return backend.transcribe(wav_bytes, language)
+                except Exception as e:
+                    errors.append(f"{backend.name}: {e}")
+            raise ASRError("; ".join(errors))
+        finally:
+            self._slots.release()
+
+    def transcribe(self, wav_bytes, language="kn-IN", timeout=ASR_TIMEOUT):
+        """Transcribes in the pool, trying backends in order; raises ASRError on failure."""
+        if not self._slots.acquire(blocking=False):
+            raise ASRError("Speech recognition is busy, please try again")
+        future = self._pool.submit(self._run, wav_bytes, language)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            raise ASRError(f"Speech recognition timed out after {timeout}s")
+
+
+@st.cache_resource
+def get_speech_recognizer():
+    """The recognizer (backends + pool) shared by every Streamlit session in this process."""
+    return SpeechRecognizer(create_backends())
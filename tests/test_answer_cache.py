@@ -0,0 +1,116 @@
+# tests/test_answer_cache.py
+import numpy as np
+import pytest
+
+from answer_cache import (
+    ANSWER_CACHE_THRESHOLD, SemanticAnswerCache, content_signature, embed, entity_signature, normalize_question,
+)
+
+# Same question, different wording: should be served from the cache
+PARAPHRASES = [
+    ("What is the best fertilizer for ragi?", "fertilizer for Ragi"),
+    ("How to control brown spot in paddy?", "brown spot control in paddy"),
+    ("What is the spacing for jowar?", "jowar spacing"),
+    ("How to treat leaf blast in rice", "treatment for leaf blast in rice"),
+    ("How do I control stem borer in paddy?", "stem borer control paddy"),
+    ("What is the seed rate for maize?", "maize seed rate"),
+    ("How to prevent sheath blight in paddy?", "prevention of sheath blight in paddy"),
+    ("What is the irrigation schedule for cotton?", "cotton irrigation schedule"),
+]
+
+# Same crop and topic words, different question: must not share an answer
+NEAR_MISSES = [
+    ("How much urea should I apply to paddy?", "When should I apply urea to paddy?"),
+    ("When should I sow ragi?", "When should I harvest ragi?"),
+    ("How to control brown spot in paddy?", "What causes brown spot in paddy?"),
+    ("How much water does sugarcane need?", "How much fertilizer does sugarcane need?"),
+    ("Best time to harvest coffee?", "Best time to prune coffee?"),
+    ("What is the irrigation schedule for cotton?", "What is the spray schedule for cotton?"),
+    ("How to manage aphids in cotton?", "How to manage aphids in cotton organically?"),
+]
+
+# Another crop, disease or quantity: a hit would hand out the wrong advice
+ENTITY_SWAPS = [
+    ("How much urea should I apply to paddy?", "How much urea should I apply to maize?"),
+    ("What is the urea dose for paddy?", "What is the urea dose for maize?"),
+    ("What is the spacing for ragi?", "What is the spacing for jowar?"),
+    ("How to control brown spot in paddy?", "How to control leaf blast in paddy?"),
+    ("urea dose for paddy 2 acres", "urea dose for paddy 5 acres"),
+    ("When should I sow ragi?", "When should I sow bajra?"),
+]
+
+# Kannada crop names with case endings (-ಕ್ಕೆ, -ಗೆ, -ಅನ್ನು, -ದಲ್ಲಿ)
+KANNADA_SWAPS = [
+    ("ಭತ್ತಕ್ಕೆ ಎಷ್ಟು ಯೂರಿಯಾ ಹಾಕಬೇಕು", "ರಾಗಿಗೆ ಎಷ್ಟು ಯೂರಿಯಾ ಹಾಕಬೇಕು"),
+    ("ರಾಗಿಗೆ ಯಾವ ಗೊಬ್ಬರ ಉತ್ತಮ", "ಜೋಳಕ್ಕೆ ಯಾವ ಗೊಬ್ಬರ ಉತ್ತಮ"),
+    ("ಕಬ್ಬಿಗೆ ನೀರು ಎಷ್ಟು ಬೇಕು", "ಭತ್ತಕ್ಕೆ ನೀರು ಎಷ್ಟು ಬೇಕು"),
+    ("ಟೊಮೆಟೊದಲ್ಲಿ ಎಲೆ ಸುರುಳಿ ರೋಗ ನಿಯಂತ್ರಣ", "ಮೆಣಸಿನಕಾಯಿಯಲ್ಲಿ ಎಲೆ ಸುರುಳಿ ರೋಗ ನಿಯಂತ್ರಣ"),
+]
+
+# Crops the entity list does not know: the content-word check alone must keep them apart
+UNLISTED_SWAPS = [
+    ("What is the fertilizer dose for brinjal?", "What is the fertilizer dose for okra?"),
+    ("Which pesticide for blackgram pod borer?", "Which pesticide for greengram pod borer?"),
+    ("How to control fruit borer in brinjal", "How to control fruit borer in bhendi"),
+]
+
+
+def _cache_with(question):
+    cache = SemanticAnswerCache()
+    cache.put(question, "en", f"answer to {question}")
+    return cache
+
+
+@pytest.mark.parametrize("stored, asked", PARAPHRASES)
+def test_paraphrase_hits(stored, asked):
+    assert _cache_with(stored).get(asked, "en") == f"answer to {stored}"
+
+
+@pytest.mark.parametrize("stored, asked", NEAR_MISSES + ENTITY_SWAPS + KANNADA_SWAPS + UNLISTED_SWAPS)
+def test_different_question_misses(stored, asked):
+    assert _cache_with(stored).get(asked, "en") is None
+
+
+@pytest.mark.parametrize("stored, asked", ENTITY_SWAPS + KANNADA_SWAPS + UNLISTED_SWAPS)
+def test_entity_swaps_miss_at_any_threshold(stored, asked):
+    cache = SemanticAnswerCache(threshold=0.0)
+    cache.put(stored, "en", "stored answer")
+    assert cache.get(asked, "en") is None
+
+
+def test_threshold_separates_labelled_pairs():
+    def score(a, b):
+        return float(embed(normalize_question(a)) @ embed(normalize_question(b)))
+
+    same_entity_misses = [
+        score(a, b) for a, b in NEAR_MISSES
+        if entity_signature(normalize_question(a)) == entity_signature(normalize_question(b))
+    ]
+    assert max(same_entity_misses) < ANSWER_CACHE_THRESHOLD <= min(score(a, b) for a, b in PARAPHRASES)
+
+
+def test_entity_signature_canonicalizes_synonyms():
+    assert entity_signature(normalize_question("urea for paddy")) == entity_signature(normalize_question("urea for rice"))
+    assert entity_signature(normalize_question("leaf blast in rice")) == frozenset({"leaf blast", "rice"})
+    assert "5" in entity_signature(normalize_question("dose for 5 acres"))
+
+
+def test_kannada_case_endings_match_by_stem():
+    assert entity_signature("ಭತ್ತಕ್ಕೆ ಯೂರಿಯಾ") == frozenset({"rice"})
+    assert entity_signature("ಕಬ್ಬಿಗೆ ನೀರು") == frozenset({"sugarcane"})
+    assert entity_signature("ಕಡಲೆಕಾಯಿಗೆ ಗೊಬ್ಬರ") == frozenset({"groundnut"})  # not chickpea (ಕಡಲೆ)
+
+
+def test_content_signature_ignores_filler_and_word_forms():
+    assert content_signature(normalize_question("How to treat leaf blast in rice")) == \
+        content_signature(normalize_question("treatment for leaf blast in paddy"))
+    assert content_signature(normalize_question("fertilizer for brinjal")) != \
+        content_signature(normalize_question("fertilizer for okra"))
+
+
+def test_best_match_skips_other_entities():
+    cache = SemanticAnswerCache(threshold=0.5)
+    cache.put("urea dose for maize", "en", "maize answer")
+    cache.put("what is the dose of urea for paddy", "en", "paddy answer")
+    assert cache.get("urea dose for paddy", "en") == "paddy answer"
+    assert np.isclose(cache.stats()["hit_rate"], 1.0)
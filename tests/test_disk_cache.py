@@ -0,0 +1,52 @@
+# tests/test_disk_cache.py
+import os
+import threading
+
+from disk_cache import DiskLRU, atomic_write
+
+
+def test_atomic_write_replaces_and_leaves_no_temp_files(tmp_path):
+    path = tmp_path / "sub" / "file.json"
+    atomic_write(str(path), "first")
+    atomic_write(str(path), b"second")
+    assert path.read_bytes() == b"second"
+    assert os.listdir(path.parent) == ["file.json"]
+
+
+def test_concurrent_writers_never_tear_a_file(tmp_path):
+    path = str(tmp_path / "shared.txt")
+    payloads = [str(i) * 10000 for i in range(8)]
+    threads = [threading.Thread(target=atomic_write, args=(path, p)) for p in payloads]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    with open(path, encoding="utf-8") as f:
+        assert f.read() in payloads
+    assert os.listdir(tmp_path) == ["shared.txt"]
+
+
+def _age(store, key, seconds):
+    path = store.path(key)
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime - seconds, stat.st_mtime - seconds))
+
+
+def test_evicts_least_recently_read_by_count(tmp_path):
+    store = DiskLRU(str(tmp_path), ".json", max_entries=2)
+    store.write("aa1", b"1")
+    store.write("bb2", b"2")
+    _age(store, "aa1", 20)
+    _age(store, "bb2", 10)
+    assert store.read("aa1") == b"1"  # now the most recently used
+    store.write("cc3", b"3")
+    assert store.read("bb2") is None
+    assert store.read("aa1") == b"1" and store.read("cc3") == b"3"
+
+
+def test_evicts_by_total_size(tmp_path):
+    store = DiskLRU(str(tmp_path), ".mp3", max_bytes=250)
+    for i, key in enumerate(["aa", "bb", "cc"]):
+        store.write(key, b"x" * 100)
+        _age(store, key, 30 - 10 * i)
+    assert [store.read(key) is not None for key in ["aa", "bb", "cc"]] == [False, True, True]
@@ -0,0 +1,62 @@
+# tests/test_i18n.py
+from collections import OrderedDict
+
+import pytest
+
+import i18n
+
+
+@pytest.fixture
+def runtime(tmp_path, monkeypatch):
+    path = tmp_path / "runtime.jsonl"
+    monkeypatch.setattr(i18n, "RUNTIME_CACHE_PATH", str(path))
+    monkeypatch.setattr(i18n, "I18N_RUNTIME_MAX_ENTRIES", 3)
+    monkeypatch.setattr(i18n, "_catalog", {"Submit": "ಸಲ್ಲಿಸು"})
+    monkeypatch.setattr(i18n, "_runtime", OrderedDict())
+    monkeypatch.setattr(i18n, "_failed", {})
+    monkeypatch.setattr(i18n, "_log_lines", 0)
+    return path
+
+
+def test_catalog_hit_skips_translator(runtime):
+    assert i18n.lookup_kannada("Submit", lambda text: pytest.fail("translator called")) == "ಸಲ್ಲಿಸು"
+
+
+def test_fallback_is_not_cached_and_retried_later(runtime, monkeypatch):
+    calls = []
+
+    def failing(text):
+        calls.append(text)
+        return None
+
+    assert i18n.lookup_kannada("Rice", failing) == "Rice"
+    assert i18n.lookup_kannada("Rice", failing) == "Rice"
+    assert calls == ["Rice"]  # not retried within I18N_RETRY_SECONDS
+    assert "Rice" not in i18n._runtime and not runtime.exists()
+
+    monkeypatch.setattr(i18n, "I18N_RETRY_SECONDS", 0)
+    assert i18n.lookup_kannada("Rice", lambda text: "ಅಕ್ಕಿ") == "ಅಕ್ಕಿ"
+    assert i18n._runtime["Rice"] == "ಅಕ್ಕಿ"
+
+
+def test_runtime_cache_is_bounded_and_persisted(runtime):
+    for word in ["a", "b", "c", "d"]:
+        i18n.lookup_kannada(word, lambda text: text.upper())
+    assert list(i18n._runtime) == ["b", "c", "d"]
+    entries, _ = i18n.load_runtime(str(runtime), max_entries=3)
+    assert dict(entries) == {"b": "B", "c": "C", "d": "D"}
+
+
+def test_log_is_appended_then_compacted(runtime):
+    for i in range(6):
+        i18n.lookup_kannada(f"s{i}", lambda text: text.upper())
+    assert len(runtime.read_text(encoding="utf-8").splitlines()) == 6  # one appended line per new string
+    i18n.lookup_kannada("s6", lambda text: text.upper())
+    assert len(runtime.read_text(encoding="utf-8").splitlines()) == 3  # compacted to the live entries
+
+
+def test_torn_line_is_skipped(tmp_path):
+    path = tmp_path / "runtime.jsonl"
+    path.write_text('["Rice", "ಅಕ್ಕಿ"]\n["Whe', encoding="utf-8")
+    entries, lines = i18n.load_runtime(str(path))
+    assert dict(entries) == {"Rice": "ಅಕ್ಕಿ"} and lines == 1
@@ -0,0 +1,82 @@
+# tests/test_scan_cache.py
+import io
+import itertools
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw, ImageFilter
+
+from scan_cache import SCAN_CACHE_PHASH_DISTANCE, ScanCache, content_digest, perceptual_hash
+
+
+def leaf_scene(rng, size=(320, 240)):
+    """A blurred green blade with brown lesions on a soil-coloured background: distinct photos that look alike."""
+    w, h = size
+    img = Image.new("RGB", size, tuple(int(v) for v in rng.integers([60, 60, 40], [140, 120, 90])))
+    draw = ImageDraw.Draw(img)
+    center, slope, width = h / 2 + rng.normal(0, 20), np.tan(rng.normal(0, 0.3)), rng.uniform(40, 90)
+    midline = lambda x: center + slope * (x - w / 2)
+    edge = [(x, midline(x) - width / 2 * np.sin(np.pi * x / w)) for x in range(0, w + 1, 8)]
+    edge += [(x, midline(x) + width / 2 * np.sin(np.pi * x / w)) for x in range(w, -1, -8)]
+    draw.polygon(edge, fill=tuple(int(v) for v in rng.integers([30, 110, 20], [70, 170, 60])))
+    for _ in range(rng.integers(2, 12)):
+        x, r = rng.uniform(0, w), rng.uniform(3, 12)
+        y = midline(x) + rng.normal(0, width / 5)
+        draw.ellipse([x - 1.8 * r, y - r, x + 1.8 * r, y + r], fill=tuple(int(v) for v in rng.integers([110, 70, 20], [160, 110, 50])))
+    return img.filter(ImageFilter.GaussianBlur(1))
+
+
+def jpeg_bytes(img, quality=90, scale=1.0):
+    buf = io.BytesIO()
+    img.resize((int(img.width * scale), int(img.height * scale))).save(buf, "JPEG", quality=quality)
+    return buf.getvalue()
+
+
+@pytest.fixture(scope="module")
+def scenes():
+    rng = np.random.default_rng(0)
+    return [leaf_scene(rng) for _ in range(200)]
+
+
+def false_match_rate(cache, images, owner_of):
+    """Share of lookups for new, distinct photos that return another photo's cached result."""
+    false_matches = 0
+    for i, img in enumerate(images):
+        data = jpeg_bytes(img)
+        phash = perceptual_hash(img)
+        if cache.get(content_digest(data)) or cache.get_similar(content_digest(data), phash, owner_of(i)):
+            false_matches += 1
+        cache.put(content_digest(data), phash, {"valid": True, "disease": f"scene {i}"}, owner_of(i))
+    return false_matches / len(images)
+
+
+def test_default_is_exact_digest_only(scenes):
+    assert SCAN_CACHE_PHASH_DISTANCE == 0
+    assert false_match_rate(ScanCache(), scenes, owner_of=lambda i: "farmer") == 0.0
+
+
+def test_near_matching_never_crosses_sessions(scenes):
+    cache = ScanCache(phash_distance=8)
+    assert false_match_rate(cache, scenes, owner_of=lambda i: f"farmer {i}") == 0.0
+    assert cache.stats()["phash_hits"] == 0
+
+
+def test_dhash_collides_on_distinct_leaves(scenes):
+    # Why near-matching is opt-in: distinct leaf photos fall within recompression distance of each other
+    hashes = [h for h in map(perceptual_hash, scenes) if h is not None]
+    close = sum((a ^ b).bit_count() <= 4 for a, b in itertools.combinations(hashes, 2))
+    assert close > 0
+
+
+def test_same_session_recompressed_upload_matches_when_enabled(scenes):
+    cache = ScanCache(phash_distance=4)
+    img = next(img for img in scenes if perceptual_hash(img) is not None)
+    original = jpeg_bytes(img)
+    cache.put(content_digest(original), perceptual_hash(img), {"valid": True, "disease": "Leaf Blast"}, "farmer")
+
+    resized = Image.open(io.BytesIO(jpeg_bytes(img, quality=60, scale=0.7)))
+    digest = content_digest(jpeg_bytes(resized))
+    assert cache.get(digest) is None
+    assert cache.get_similar(digest, perceptual_hash(resized), "someone else") is None
+    assert cache.get_similar(digest, perceptual_hash(resized), "farmer")["disease"] == "Leaf Blast"
+    assert cache.get(digest)["disease"] == "Leaf Blast"  # stored under the new digest
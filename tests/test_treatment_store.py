@@ -0,0 +1,79 @@
+# tests/test_treatment_store.py
+import time
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from treatment_store import TreatmentStore
+
+
+class SlowLLM:
+    """Stands in for the Groq client: one bulleted answer after `latency` seconds."""
+
+    def __init__(self, latency=0.2, fail=False):
+        self.latency = latency
+        self.fail = fail
+        self.calls = 0
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        if self.fail:
+            raise RuntimeError("upstream down")
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="• step one\n• step two"))])
+
+
+@pytest.fixture
+def store_for(tmp_path):
+    def make(client):
+        return TreatmentStore(client, reviewed_path=str(tmp_path / "none.json"), runtime_path=str(tmp_path / "runtime.json"))
+    return make
+
+
+def _concurrently(fn, n=8):
+    results, errors = [], []
+
+    def run():
+        try:
+            results.append(fn())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+def test_concurrent_misses_share_one_generation(store_for):
+    llm = SlowLLM()
+    store = store_for(llm)
+    results, errors = _concurrently(lambda: store.get("Leaf Blast", "English", 5))
+    assert not errors
+    assert results == [["step one", "step two"]] * 8
+    assert llm.calls == 1
+    assert store.get("Leaf Blast", "English", 5) == ["step one", "step two"] and llm.calls == 1
+
+
+def test_other_keys_are_not_blocked(store_for):
+    llm = SlowLLM()
+    store = store_for(llm)
+    _concurrently(lambda: store.get("Leaf Blast", "English", 2), n=3)
+    _concurrently(lambda: store.get("Leaf Blast", "English", 8), n=3)
+    assert llm.calls == 2
+
+
+def test_failure_reaches_every_waiter_and_is_retried(store_for):
+    llm = SlowLLM(fail=True)
+    store = store_for(llm)
+    results, errors = _concurrently(lambda: store.get("Brown Spot", "Kannada", 5), n=4)
+    assert not results and len(errors) == 4 and llm.calls == 1
+    llm.fail = False
+    assert store.get("Brown Spot", "Kannada", 5) == ["step one", "step two"]
+    assert llm.calls == 2
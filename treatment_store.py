@@ -0,0 +1,208 @@
+# treatment_store.py
+"""
+Pre-generated treatment advice per disease, language and severity band.
+
+`locales/treatments.json` is built with `python build_treatments.py`. It is
+authoritative only once an agronomist has signed it off ("reviewed_by",
+set with `build_treatments.py --sign-off NAME`); reviewed entries are never
+overwritten at runtime. Until then its entries only seed the runtime cache,
+where they are served but regenerated like any LLM answer. Combinations
+missing from both are generated by the LLM once (concurrent requests for
+the same combination wait for that one call), kept in the runtime cache
+and regenerated in the background after TREATMENT_REFRESH_HOURS. Stale
+advice is served while the refresh runs. Kannada advice has its TTS audio
+pre-rendered into the shared TTS disk cache, so playing it is a cache hit.
+"""
+import os
+import json
+import time
+import threading
+from concurrent.futures import Future
+
+import streamlit as st
+
+from disk_cache import atomic_write
+
+TREATMENTS_PATH = os.getenv("TREATMENTS_PATH", os.path.join("locales", "treatments.json"))
+TREATMENTS_RUNTIME_PATH = os.getenv("TREATMENTS_RUNTIME_PATH", os.path.join(".cache", "treatments_runtime.json"))
+TREATMENT_REFRESH_HOURS = float(os.getenv("TREATMENT_REFRESH_HOURS", 24 * 7))
+TREATMENT_MODEL = os.getenv("TREATMENT_MODEL", "llama-3.3-70b-versatile")
+
+DISEASES = ("Brown Spot", "Leaf Blast", "Sheath Blight")
+LANGUAGES = ("English", "Kannada")
+BANDS = (("mild", 3.0), ("moderate", 6.0), ("severe", 9.0))  # upper bounds on the 0-9 scale
+
+_lock = threading.Lock()
+
+
+def severity_band(scale):
+    for band, upper in BANDS:
+        if scale <= upper:
+            return band
+    return BANDS[-1][0]
+
+
+def entry_key(disease, lang, band):
+    return f"{disease}|{lang}|{band}"
+
+
+def all_keys():
+    return [(d, l, b) for d in DISEASES for l in LANGUAGES for b, _ in BANDS]
+
+
+def _load_json(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def load_treatments(path=TREATMENTS_PATH):
+    """Returns (reviewed_by or None, {key: lines}) from the file's {disease: {lang: {band: [lines]}}}."""
+    data = _load_json(path)
+    entries = {
+        entry_key(disease, lang, band): lines
+        for disease, by_lang in data.get("treatments", {}).items()
+        for lang, by_band in by_lang.items()
+        for band, lines in by_band.items()
+    }
+    return data.get("reviewed_by"), entries
+
+
+def parse_bullets(response, limit=4):
+    lines = []
+    for line in response.split("\n"):
+        line = line.strip()
+        if line.startswith(("•", "-", "*")):
+            line = line.lstrip("•-* ").strip()
+            if line:
+                lines.append(line)
+    return lines[:limit]
+
+
+def generate_treatment(client, disease, lang, band):
+    """Asks the LLM for four bullet-point steps; returns the list of lines."""
+    prompt = f"4 short, practical cure & prevention steps for paddy {disease} at {band} severity. Bullets only."
+    if lang == "Kannada":
+        prompt += " Answer in Kannada. Use • for bullets."
+    chat = client.chat.completions.create(
+        messages=[{"role": "user", "content": prompt}],
+        model=TREATMENT_MODEL,
+        temperature=0.3,
+        max_tokens=250,
+    )
+    return parse_bullets(chat.choices[0].message.content.strip())
+
+
+def format_treatment(lines):
+    """(html for the info box, plain text for TTS)."""
+    return "<br>".join(f"• {line}" for line in lines), " ".join(lines)
+
+
+def prerender_audio(lang, lines):
+    if lang != "Kannada" or not lines:
+        return
+    from tts_cache import synthesize
+    try:
+        synthesize(format_treatment(lines)[1], lang="kn", slow=False)
+    except Exception as e:
+        print(f"Treatment audio pre-render failed: {e}")
+
+
+class TreatmentStore:
+    def __init__(self, client, reviewed_path=TREATMENTS_PATH, runtime_path=TREATMENTS_RUNTIME_PATH,
+                 refresh_hours=TREATMENT_REFRESH_HOURS):
+        self.client = client
+        reviewed_by, entries = load_treatments(reviewed_path)
+        self.reviewed = entries if reviewed_by else {}
+        self.runtime_path = runtime_path
+        self.runtime = _load_json(runtime_path)  # {key: {"lines": [...], "updated": epoch}}
+        if not reviewed_by:
+            # Not signed off: serve the generated entries, but as stale runtime answers
+            for key, lines in entries.items():
+                self.runtime.setdefault(key, {"lines": lines, "updated": 0})
+        self.max_age = refresh_hours * 3600
+        self._inflight = {}   # key -> Future of the generation running for it
+        self._refresh_thread = None
+
+    def _is_stale(self, key):
+        entry = self.runtime.get(key)
+        return entry is None or time.time() - entry.get("updated", 0) > self.max_age
+
+    def _generate(self, disease, lang, band):
+        """Generates and stores advice for the key, or waits for the generation already running for it."""
+        key = entry_key(disease, lang, band)
+        with _lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+        if not owner:
+            return future.result()
+        try:
+            lines = generate_treatment(self.client, disease, lang, band) or None
+            if lines:
+                with _lock:
+                    self.runtime[key] = {"lines": lines, "updated": time.time()}
+                    try:
+                        atomic_write(self.runtime_path, json.dumps(self.runtime, ensure_ascii=False, indent=2))
+                    except OSError as e:
+                        print(f"Treatment cache write failed: {e}")
+            future.set_result(lines)
+            return lines
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with _lock:
+                del self._inflight[key]
+
+    def get(self, disease, lang, scale):
+        """Advice lines for a scan: reviewed, then runtime cache, then the LLM. None if unavailable."""
+        band = severity_band(scale)
+        key = entry_key(disease, lang, band)
+        if key in self.reviewed:
+            return self.reviewed[key]
+        entry = self.runtime.get(key)
+        if entry is not None:
+            if self._is_stale(key):
+                self.start_refresh()
+            return entry["lines"]
+        if self.client is None:
+            return None
+        return self._generate(disease, lang, band)
+
+    def refresh(self):
+        """Generates missing or stale non-reviewed entries and pre-renders their audio."""
+        for disease, lang, band in all_keys():
+            key = entry_key(disease, lang, band)
+            if key in self.reviewed:
+                prerender_audio(lang, self.reviewed[key])
+                continue
+            if not self._is_stale(key) or self.client is None:
+                prerender_audio(lang, self.runtime.get(key, {}).get("lines"))
+                continue
+            try:
+                prerender_audio(lang, self._generate(disease, lang, band))
+            except Exception as e:
+                print(f"Treatment refresh failed for {key}: {e}")
+
+    def _refresh_loop(self):
+        while True:
+            self.refresh()
+            time.sleep(min(self.max_age, 3600))
+
+    def start_refresh(self):
+        """Starts the scheduled background refresh once per process."""
+        with _lock:
+            if self._refresh_thread is None:
+                self._refresh_thread = threading.Thread(target=self._refresh_loop, name="treatment-refresh", daemon=True)
+                self._refresh_thread.start()
+        return self
+
+
+@st.cache_resource
+def get_treatment_store(_client):
+    """The advice store shared by every session; starts the background refresh."""
+    return TreatmentStore(_client).start_refresh()
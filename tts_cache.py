@@ -0,0 +1,151 @@
+# tts_cache.py
+"""
+Cached text-to-speech.
+
+Audio is stored under a hash of (normalized text, lang, speed) in a small
+in-memory LRU that spills to a size-bounded disk store (also evicted
+least-recently-used first), so a repeat play costs no network calls. Callers
+that keep audio around (e.g. per chat message) hold only the key and reload
+or regenerate the bytes on demand. Long texts are split at sentence
+boundaries and the chunks are synthesized in parallel, then the MP3 streams
+are concatenated.
+"""
+import os
+import re
+import hashlib
+import threading
+from io import BytesIO
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from gtts import gTTS
+
+from disk_cache import DiskLRU
+
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join(".cache", "tts"))
+TTS_CACHE_MAX_MB = float(os.getenv("TTS_CACHE_MAX_MB", 200))
+TTS_MEMORY_MAX_MB = float(os.getenv("TTS_MEMORY_MAX_MB", 32))
+TTS_CHUNK_CHARS = int(os.getenv("TTS_CHUNK_CHARS", 200))
+TTS_WORKERS = int(os.getenv("TTS_WORKERS", 4))
+
+_SENTENCE_END = re.compile(r"(?<=[.!?।॥])\s+")
+_memory_lock = threading.Lock()
+_memory = OrderedDict()   # key -> mp3 bytes, most recently used last
+_memory_bytes = 0
+_pool = ThreadPoolExecutor(max_workers=TTS_WORKERS, thread_name_prefix="tts")
+
+
+def normalize_tts_text(text):
+    """Drops bullet/markdown symbols and collapses whitespace (what gets spoken)."""
+    text = re.sub(r"[\*\-•#]", "", text or "")
+    return " ".join(text.split())
+
+
+def cache_key(text, lang, slow=False):
+    return hashlib.sha256(f"{lang}|{int(slow)}|{text}".encode("utf-8")).hexdigest()
+
+
+def split_sentences(text, max_chars=TTS_CHUNK_CHARS):
+    """Groups sentences into chunks of at most `max_chars` (a longer sentence stays whole)."""
+    chunks, current = [], ""
+    for sentence in _SENTENCE_END.split(text):
+        if current and len(current) + len(sentence) + 1 > max_chars:
+            chunks.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}".strip()
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+# -----------------
+# Disk Store
+# -----------------
+_disk = DiskLRU(TTS_CACHE_DIR, ".mp3", max_bytes=int(TTS_CACHE_MAX_MB * 1024 * 1024))
+
+
+def read_cached(key):
+    return _disk.read(key)
+
+
+def write_cached(key, data):
+    _disk.write(key, data)
+
+
+# -----------------
+# Memory Tier
+# -----------------
+def _remember(key, data):
+    global _memory_bytes
+    max_bytes = int(TTS_MEMORY_MAX_MB * 1024 * 1024)
+    if len(data) > max_bytes:
+        return
+    with _memory_lock:
+        if key in _memory:
+            _memory_bytes -= len(_memory.pop(key))
+        _memory[key] = data
+        _memory_bytes += len(data)
+        while _memory_bytes > max_bytes:
+            _, evicted = _memory.popitem(last=False)
+            _memory_bytes -= len(evicted)
+
+
+def get_audio(key):
+    """Returns cached MP3 bytes for `key` from memory, then disk; None on a miss."""
+    with _memory_lock:
+        data = _memory.get(key)
+        if data is not None:
+            _memory.move_to_end(key)
+            return data
+    data = read_cached(key)
+    if data is not None:
+        _remember(key, data)
+    return data
+
+
+# -----------------
+# Synthesis
+# -----------------
+def _synthesize_chunk(text, lang, slow):
+    buf = BytesIO()
+    gTTS(text=text, lang=lang, slow=slow).write_to_fp(buf)
+    return buf.getvalue()
+
+
+def synthesize(text, lang="kn", slow=False):
+    """Returns MP3 bytes for `text`, from the memory/disk cache when possible."""
+    text = normalize_tts_text(text)
+    if not text:
+        return None
+    key = cache_key(text, lang, slow)
+    cached = get_audio(key)
+    if cached is not None:
+        return cached
+
+    chunks = split_sentences(text)
+    if len(chunks) == 1:
+        audio = _synthesize_chunk(chunks[0], lang, slow)
+    else:
+        audio = b"".join(_pool.map(lambda chunk: _synthesize_chunk(chunk, lang, slow), chunks))
+    _remember(key, audio)
+    try:
+        write_cached(key, audio)
+    except OSError as e:
+        print(f"TTS cache write failed: {e}")
+    return audio
+
+
+def synthesize_key(text, lang="kn", slow=False):
+    """Synthesizes (or finds) audio for `text` and returns its cache key instead of the bytes."""
+    if synthesize(text, lang, slow) is None:
+        return None
+    return cache_key(normalize_tts_text(text), lang, slow)
+
+
+def load_audio(key, text, lang="kn", slow=False):
+    """Bytes for `key`; regenerated from `text` if the entry was evicted."""
+    data = get_audio(key)
+    if data is None:
+        data = synthesize(text, lang, slow)
+    return data
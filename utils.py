@@ -1,11 +1,10 @@
 # utils.py
 import streamlit as st
 from deep_translator import GoogleTranslator
-from gtts import gTTS
-from io import BytesIO
-import time
+from tts_cache import synthesize, synthesize_key, load_audio
+from i18n import lookup_kannada, translate_kannada
+from weather import ICON_URL, format_age
 from langdetect import detect
-import re
 from auth import initialize_firebase, render_login_signup  # Import auth functions
 
 # ----------------- Session State Init -----------------
@@ -112,15 +111,25 @@ def apply_custom_css():
         """, unsafe_allow_html=True)
 
 # ----------------- Translator -----------------
-@st.cache_data
+def _live_translate_kn(text):
+    try:
+        return GoogleTranslator(source='en', target='kn').translate(text)
+    except:
+        return None
+
 def t(text, lang="en"):
     if lang == "English":
         return text
     if lang == "Kannada":
-        try:
-            return GoogleTranslator(source='en', target='kn').translate(text)
-        except:
-            return text
+        # Precompiled catalog first; live translation only for bounded data (crop, policy, weather names).
+        # Text with interpolated values (errors, numbers, LLM output) must not go through t().
+        return lookup_kannada(text, _live_translate_kn)
+    return text
+
+def translate_or_none(text, lang="en"):
+    """Like t(), but None when the Kannada translation is unavailable, so callers can avoid caching the fallback."""
+    if lang == "Kannada":
+        return translate_kannada(text, _live_translate_kn)
     return text
 
 # ----------------- Language Toggle -----------------
@@ -142,19 +151,25 @@ def language_toggle():
 def get_kannada_audio_bytes(text: str):
     if not text:
         return None
+    try:
+        return synthesize(text, lang='kn', slow=False)
+    except Exception as e:
+        print(f"gTTS Error: {e}")
+        return None
 
-    cleaned_text = re.sub(r'[\*\-•]', '', text)
-    cleaned_text = cleaned_text.replace('\n', ' ')
-    
-    if not cleaned_text.strip():
+def get_kannada_audio_key(text: str):
+    """Like get_kannada_audio_bytes, but returns a key into the shared audio store."""
+    if not text:
         return None
-        
     try:
-        tts = gTTS(text=cleaned_text, lang='kn', slow=False)
-        audio_bytes_io = BytesIO()
-        tts.write_to_fp(audio_bytes_io)
-        audio_bytes_io.seek(0)
-        return audio_bytes_io.read()
+        return synthesize_key(text, lang='kn', slow=False)
+    except Exception as e:
+        print(f"gTTS Error: {e}")
+        return None
+
+def load_kannada_audio(key: str, text: str):
+    try:
+        return load_audio(key, text, lang='kn', slow=False)
     except Exception as e:
         print(f"gTTS Error: {e}")
         return None
@@ -177,6 +192,29 @@ def translate_back(text, target_lang):
     except:
         return text
 
+# ----------------- Weather Header -----------------
+def render_weather_header(weather, lang):
+    """One-line weather strip with the reading's age (from weather.WeatherService.get)."""
+    icon_url = ICON_URL.format(icon=weather["icon"])
+    if weather["source"] == "unavailable":
+        freshness = t("weather unavailable", lang)
+    else:
+        count, unit = format_age(weather["age"])
+        if unit == "now":
+            age = t("just now", lang)
+        else:
+            age = f"{count} {t('min ago', lang) if unit == 'min' else t('h ago', lang)}"
+        freshness = f"{t('updated', lang)} {age}"
+    _, col_w = st.columns([1, 6])
+    with col_w:
+        st.markdown(
+            f"**{weather['temp']}°C** | {t('Humidity', lang)}: {weather['humidity']}% | {t('Rain', lang)}: {weather['rainfall']}mm | "
+            f"<img src='{icon_url}' alt='{weather['desc']}' width='25' height='25' "
+            f"style='vertical-align: middle; margin-bottom: 5px;'> {t(weather['desc'], lang)} "
+            f"<small style='opacity:0.7;'>· {freshness}</small>",
+            unsafe_allow_html=True
+        )
+
 # ----------------- Login Check -----------------
 def check_login():
     initialize_firebase()
@@ -196,15 +234,24 @@ def render_sidebar():
         st.markdown("---")
         st.markdown(f"**{t('Model', lang)}:** `llama-3.3-70b-versatile`")
         st.markdown(f"**{t('Provider', lang)}:** `GROQ`")
-        
+        latency = st.session_state.get("chat_latency")
+        if latency:
+            st.markdown(f"**{t('First token', lang)}:** `{latency['ttft']}s` · **{t('Total', lang)}:** `{latency['total']}s`")
+            if latency.get("prompt_tokens"):
+                st.markdown(f"**{t('Prompt tokens', lang)}:** `~{latency['prompt_tokens']}`")
+
         if st.button(t("Clear Chat History", lang)):
             user_id = st.session_state.user_id
             user_token = st.session_state.user['idToken']
             db = st.session_state.db
             st.session_state.messages = []
-            st.session_state.audio_bytes_for_message = {}
+            st.session_state.chat_first_index = 0
+            st.session_state.chat_next_index = 0
+            st.session_state.chat_summary = None
+            st.session_state.audio_keys_for_message = {}
             try:
                 db.child("user_chats").child(user_id).set([], token=user_token)
+                db.child("user_chat_summary").child(user_id).remove(token=user_token)
             except Exception as e:
                 st.error(f"Error clearing history: {e}")
             st.rerun()
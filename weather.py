@@ -0,0 +1,265 @@
+# weather.py
+"""
+Current weather for the page headers, shared by every session.
+
+Coordinates are snapped to a WEATHER_GRID_DEG grid (0.1° is about 11 km),
+so nearby users share one cache entry and one upstream call. A reading is
+fresh for WEATHER_TTL seconds. After that it is still served, for up to
+WEATHER_MAX_STALE seconds, while one background refresh per cell runs. A
+refresh thread also renews the popular cells (WEATHER_POPULAR_HITS lookups
+since their last fetch) shortly before they expire, one pass every
+WEATHER_REFRESH_INTERVAL seconds. Users in busy cells then never wait.
+
+After WEATHER_BREAKER_FAILURES consecutive upstream failures, the circuit
+breaker opens. For WEATHER_BREAKER_COOLDOWN seconds no calls are made and
+the last known reading is served, however old. After that, one trial call
+decides whether to close it again. Readings carry their fetch time and
+source ("live", "stale" or "unavailable"), so the UI can show their age
+rather than a made-up value.
+
+Point WEATHER_API_URL at a local server (benchmarks/bench_weather.py --serve)
+to run against a stub.
+"""
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import streamlit as st
+
+WEATHER_API_URL = os.getenv("WEATHER_API_URL", "https://api.openweathermap.org/data/2.5")
+WEATHER_GRID_DEG = float(os.getenv("WEATHER_GRID_DEG", 0.1))
+WEATHER_TTL = float(os.getenv("WEATHER_TTL", 600))
+WEATHER_MAX_STALE = float(os.getenv("WEATHER_MAX_STALE", 3 * 3600))
+WEATHER_TIMEOUT = float(os.getenv("WEATHER_TIMEOUT", 5))
+WEATHER_BREAKER_FAILURES = int(os.getenv("WEATHER_BREAKER_FAILURES", 3))
+WEATHER_BREAKER_COOLDOWN = float(os.getenv("WEATHER_BREAKER_COOLDOWN", 60))
+WEATHER_REFRESH_INTERVAL = float(os.getenv("WEATHER_REFRESH_INTERVAL", 60))
+WEATHER_POPULAR_HITS = int(os.getenv("WEATHER_POPULAR_HITS", 3))
+WEATHER_MAX_CELLS = int(os.getenv("WEATHER_MAX_CELLS", 5000))
+
+DEFAULT_LOCATION = (12.9716, 77.5946)  # Bengaluru
+ICON_URL = "https://openweathermap.org/img/wn/{icon}@2x.png"
+# Shown (flagged "unavailable") when no reading has ever been fetched for a cell
+PLACEHOLDER = {"temp": 25, "humidity": 60, "rainfall": 0, "desc": "Clear", "icon": "01d"}
+
+
+class WeatherUnavailable(RuntimeError):
+    """Raised by a fetch when the upstream fails or the breaker is open."""
+
+
+def snap(lat, lon, grid=WEATHER_GRID_DEG):
+    """Center of the grid cell containing (lat, lon)."""
+    return round(round(lat / grid) * grid, 4), round(round(lon / grid) * grid, 4)
+
+
+def format_age(seconds):
+    """(count, unit) for a reading's age: (None, "now"), (5, "min") or (2, "h"); None if never fetched.
+
+    The number is kept apart from the words so callers translate only fixed text.
+    """
+    if seconds is None:
+        return None
+    if seconds < 60:
+        return None, "now"
+    if seconds < 3600:
+        return int(seconds // 60), "min"
+    return int(seconds // 3600), "h"
+
+
+# -----------------
+# Circuit Breaker
+# -----------------
+class CircuitBreaker:
+    def __init__(self, failures=WEATHER_BREAKER_FAILURES, cooldown=WEATHER_BREAKER_COOLDOWN):
+        self.max_failures = failures
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.trips = 0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self.opened_at >= self.cooldown else "open"
+
+    def allow(self):
+        """True if a call may go upstream now; half-open lets exactly one trial call through."""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_running or self.failures >= self.max_failures:
+                if self.opened_at is None or self._trial_running:
+                    self.trips += 1
+                self.opened_at = time.monotonic()
+            self._trial_running = False
+
+
+# -----------------
+# Upstream
+# -----------------
+def parse_reading(data):
+    return {
+        "temp": round(data["main"]["temp"]),
+        "humidity": data["main"]["humidity"],
+        "rainfall": data.get("rain", {}).get("1h", 0),
+        "desc": data["weather"][0]["description"].title(),
+        "icon": data["weather"][0]["icon"],
+    }
+
+
+class WeatherService:
+    def __init__(self, api_key=None, api_url=WEATHER_API_URL, ttl=WEATHER_TTL,
+                 max_stale=WEATHER_MAX_STALE, grid=WEATHER_GRID_DEG, timeout=WEATHER_TIMEOUT, breaker=None):
+        # Read here, not at import: pages call load_dotenv() after their imports
+        self.api_key = api_key if api_key is not None else os.getenv("OPENWEATHER_API_KEY")
+        self.api_url = api_url.rstrip("/")
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.grid = grid
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker()
+        self._session = requests.Session()
+        self._cells = {}      # cell -> {"reading", "fetched", "hits"}
+        self._inflight = set()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="weather")
+        self._refresh_thread = None
+        self.counters = {"hits": 0, "stale": 0, "misses": 0, "fetches": 0, "failures": 0, "short_circuited": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def stats(self):
+        return {**self.counters, "cells": len(self._cells), "breaker": self.breaker.state, "trips": self.breaker.trips}
+
+    def fetch(self, cell):
+        """One upstream call for `cell`; stores and returns the reading."""
+        if not self.breaker.allow():
+            self._count("short_circuited")
+            raise WeatherUnavailable("weather upstream circuit is open")
+        self._count("fetches")
+        lat, lon = cell
+        try:
+            resp = self._session.get(
+                f"{self.api_url}/weather",
+                params={"lat": lat, "lon": lon, "units": "metric", "appid": self.api_key},
+                timeout=self.timeout,
+            )
+            resp.raise_for_status()
+            reading = parse_reading(resp.json())
+        except (requests.RequestException, ValueError, KeyError, IndexError) as e:
+            self.breaker.record_failure()
+            self._count("failures")
+            print(f"Weather fetch for {cell} failed: {e}")
+            raise WeatherUnavailable(f"weather fetch failed: {e}")
+        self.breaker.record_success()
+        with self._lock:
+            entry = self._cells.setdefault(cell, {"hits": 0})
+            entry.update(reading=reading, fetched=time.time(), hits=0)
+            if len(self._cells) > WEATHER_MAX_CELLS:
+                oldest = min(self._cells, key=lambda c: self._cells[c].get("fetched", 0))
+                del self._cells[oldest]
+        return reading
+
+    def _refresh(self, cell):
+        try:
+            self.fetch(cell)
+        except WeatherUnavailable:
+            pass  # already logged by fetch; the stale reading stays
+        finally:
+            with self._lock:
+                self._inflight.discard(cell)
+
+    def refresh_async(self, cell):
+        with self._lock:
+            if cell in self._inflight:
+                return
+            self._inflight.add(cell)
+        self._pool.submit(self._refresh, cell)
+
+    def get(self, lat=None, lon=None):
+        """Reading for the cell around (lat, lon) plus "age" (seconds, None if never fetched) and "source"."""
+        if lat is None or lon is None:
+            lat, lon = DEFAULT_LOCATION
+        cell = snap(lat, lon, self.grid)
+        with self._lock:
+            entry = self._cells.get(cell)
+            if entry is not None:
+                entry["hits"] += 1
+        age = time.time() - entry["fetched"] if entry and "fetched" in entry else None
+
+        if age is not None and age <= self.ttl:
+            self._count("hits")
+            return {**entry["reading"], "age": age, "source": "live", "cell": cell}
+        if age is not None and (age <= self.ttl + self.max_stale or self.breaker.state != "closed"):
+            self._count("stale")
+            if self.api_key:
+                self.refresh_async(cell)
+            return {**entry["reading"], "age": age, "source": "stale", "cell": cell}
+
+        self._count("misses")
+        if self.api_key:
+            try:
+                return {**self.fetch(cell), "age": 0.0, "source": "live", "cell": cell}
+            except WeatherUnavailable:
+                pass
+        if entry is not None and "reading" in entry:
+            return {**entry["reading"], "age": age, "source": "stale", "cell": cell}
+        return {**PLACEHOLDER, "age": None, "source": "unavailable", "cell": cell}
+
+    # -----------------
+    # Popular Cells
+    # -----------------
+    def refresh_popular(self, horizon=None):
+        """Refreshes cells with WEATHER_POPULAR_HITS lookups that expire within `horizon` seconds."""
+        horizon = WEATHER_REFRESH_INTERVAL if horizon is None else horizon
+        now = time.time()
+        with self._lock:
+            due = [
+                cell for cell, entry in self._cells.items()
+                if entry["hits"] >= WEATHER_POPULAR_HITS and now - entry.get("fetched", 0) >= self.ttl - horizon
+            ]
+        for cell in due:
+            if self.breaker.state == "open":
+                break
+            self.refresh_async(cell)
+        return due
+
+    def _refresh_loop(self):
+        while True:
+            time.sleep(WEATHER_REFRESH_INTERVAL)
+            self.refresh_popular()
+
+    def start_refresh(self):
+        with self._lock:
+            if self._refresh_thread is None and self.api_key:
+                self._refresh_thread = threading.Thread(target=self._refresh_loop, name="weather-refresh", daemon=True)
+                self._refresh_thread.start()
+        return self
+
+
+@st.cache_resource
+def get_weather_service():
+    """The weather cache shared by every Streamlit session; starts the popular-cell refresh."""
+    return WeatherService().start_refresh()